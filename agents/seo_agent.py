@@ -1,16 +1,75 @@
 # agents/seo_agent.py
 import re
-import textstat
+import asyncio
 from rich.console import Console
+from utils.background_loop import run_sync
+from utils.text_analytics import analyze_text
+from utils.tag_index import get_tag_index, rank_tags
 
 console = Console()
 
-def generate_seo_metadata(topic: str, content: str, research_data: dict, gemini_client):
+# Extra readability indices stored under metadata['readability']
+READABILITY_INDICES = ('flesch_reading_ease', 'flesch_kincaid_grade', 'smog_index', 'coleman_liau_index', 'automated_readability_index')
+
+def generate_title_and_description(topic: str, content_preview: str, gemini_client) -> dict:
+    """Blocking wrapper around generate_title_and_description_async."""
+    return run_sync(generate_title_and_description_async(topic, content_preview, gemini_client))
+
+async def generate_title_and_description_async(topic: str, content_preview: str, gemini_client) -> dict:
+    """
+    Asks Gemini for an SEO title and meta description.
+    Only needs the opening of the post, so it can run as soon as the introduction exists.
+    Returns a dict with whichever of 'title' / 'meta_description' could be parsed.
+    """
+    generated = {}
+    if not gemini_client:
+        return generated
+    content_preview = content_preview[:800] # Use first 800 chars for context
+    seo_prompt = f"""
+    Analyze the following blog post topic and content preview to generate SEO metadata:
+    Topic: "{topic}"
+    Content Preview: "{content_preview}..."
+
+    Generate the following, keeping SEO best practices in mind:
+    1.  **Title:** An engaging, SEO-friendly title (around 50-60 characters).
+    2.  **Meta Description:** A compelling summary (max 160 characters) to encourage clicks.
+
+    Provide the output clearly labeled:
+    Title: [Generated Title]
+    Meta Description: [Generated Meta Description]
+    """
+    try:
+        response = await gemini_client.generate_content_async(seo_prompt)
+        text = response.text
+        for line in text.splitlines():
+            if line.startswith("Title:"):
+                generated['title'] = line.split(":", 1)[1].strip()
+            elif line.startswith("Meta Description:"):
+                generated['meta_description'] = line.split(":", 1)[1].strip()[:160] # Ensure max length
+    except Exception as e:
+        console.print(f"[bold red]Error generating Title/Description with Gemini: {e}[/bold red]")
+        # Keep defaults if Gemini fails
+    return generated
+
+def generate_seo_metadata(topic: str, content: str, research_data: dict, gemini_client, title_and_description: dict = None, output_dir: str = None):
+    """Blocking wrapper around generate_seo_metadata_async."""
+    return run_sync(generate_seo_metadata_async(topic, content, research_data, gemini_client, title_and_description, output_dir))
+
+async def generate_seo_metadata_async(topic: str, content: str, research_data: dict, gemini_client, title_and_description: dict = None, output_dir: str = None):
     """
     Generates SEO metadata (title, description, tags, slug, reading time, readability).
+    Pass title_and_description (from generate_title_and_description) to skip the Gemini call.
+    Pass output_dir to rank tags against the index of posts already exported there.
+    The local work (tag ranking, readability) runs in a worker thread.
     """
     console.print("[cyan]Generating SEO metadata...[/cyan]")
+    # --- Generate Title & Meta Description with Gemini ---
+    if title_and_description is None:
+        title_and_description = await generate_title_and_description_async(topic, content, gemini_client)
+    return await asyncio.to_thread(_build_seo_metadata, topic, content, research_data, title_and_description, output_dir)
 
+def _build_seo_metadata(topic: str, content: str, research_data: dict, title_and_description: dict, output_dir: str = None) -> dict:
+    """Everything but the Gemini call: tags, slug, reading time and readability."""
     metadata = {
         'title': f"Generated Blog Post on {topic}", # Default title
         'meta_description': "Read this blog post to learn about " + topic, # Default description
@@ -19,42 +78,20 @@ def generate_seo_metadata(topic: str, content: str, research_data: dict, gemini_
         'reading_time_minutes': 0,
         'readability_score': None # Default to None
     }
-
-    # --- Generate Title & Meta Description with Gemini ---
-    if gemini_client:
-        content_preview = content[:800] # Use first 800 chars for context
-        seo_prompt = f"""
-        Analyze the following blog post topic and content preview to generate SEO metadata:
-        Topic: "{topic}"
-        Content Preview: "{content_preview}..."
-
-        Generate the following, keeping SEO best practices in mind:
-        1.  **Title:** An engaging, SEO-friendly title (around 50-60 characters).
-        2.  **Meta Description:** A compelling summary (max 160 characters) to encourage clicks.
-
-        Provide the output clearly labeled:
-        Title: [Generated Title]
-        Meta Description: [Generated Meta Description]
-        """
-        try:
-            response = gemini_client.generate_content(seo_prompt)
-            text = response.text
-            for line in text.splitlines():
-                if line.startswith("Title:"):
-                    metadata['title'] = line.split(":", 1)[1].strip()
-                elif line.startswith("Meta Description:"):
-                    metadata['meta_description'] = line.split(":", 1)[1].strip()[:160] # Ensure max length
-        except Exception as e:
-            console.print(f"[bold red]Error generating Title/Description with Gemini: {e}[/bold red]")
-            # Keep defaults if Gemini fails
+    metadata.update(title_and_description)
 
     # --- Generate Tags ---
-    # Combine research keywords and potentially extract more (simple approach here)
-    tags = set(research_data.get('keywords', []))
-    # Add topic words as tags
-    tags.update(re.findall(r'\b\w+\b', topic.lower()))
-    # Basic filtering (remove short words, could be improved)
-    metadata['tags'] = sorted([tag for tag in tags if len(tag) > 3])[:15] # Limit to 15 tags
+    # Candidates: research keywords (in relevance order) plus topic words
+    candidates = list(dict.fromkeys(research_data.get('keywords', []) + re.findall(r'\b\w+\b', topic.lower())))
+    # Basic filtering (remove short words), then keep the 15 with the highest
+    # TF-IDF in this post relative to previously exported posts
+    candidates = [tag for tag in candidates if len(tag) > 3]
+    try:
+        tag_index = get_tag_index(output_dir) if output_dir else None
+    except Exception as e:
+        console.print(f"[yellow]Could not open tag index, ranking tags by term frequency only: {e}[/yellow]")
+        tag_index = None
+    metadata['tags'] = rank_tags(candidates, f"{topic}\n{content}", tag_index, limit=15)
 
     # --- Create Slug ---
     # Basic slugification: lowercase, replace spaces/special chars with hyphens
@@ -65,13 +102,14 @@ def generate_seo_metadata(topic: str, content: str, research_data: dict, gemini_
     slug = slug.strip('-') # Remove leading/trailing hyphens
     metadata['slug'] = slug if slug else "blog-post" # Fallback slug
 
-    # --- Estimate Reading Time ---
-    word_count = len(re.findall(r'\w+', content))
-    metadata['reading_time_minutes'] = round(word_count / 200) # Avg reading speed 200 WPM
-
-    # --- Calculate Readability Score (Bonus) ---
+    # --- Reading Time & Readability (Bonus) ---
+    # One tokenization yields word count, reading time (200 WPM) and every readability index
     try:
-        metadata['readability_score'] = textstat.flesch_kincaid_grade(content)
+        stats = analyze_text(content)
+        metadata['word_count'] = stats['word_count']
+        metadata['reading_time_minutes'] = stats['reading_time_minutes']
+        metadata['readability_score'] = stats['flesch_kincaid_grade']
+        metadata['readability'] = {index: stats[index] for index in READABILITY_INDICES}
     except Exception as e:
         console.print(f"[yellow]Could not calculate readability score: {e}[/yellow]")
         metadata['readability_score'] = "N/A" # Indicate failure
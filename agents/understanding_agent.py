@@ -1,11 +1,19 @@
 # agents/understanding_agent.py
 from rich.console import Console
+from utils.background_loop import run_sync
 
 console = Console()
 
 def analyze_topic(topic: str, tone: str, gemini_client):
     """
     Uses Gemini to break down the topic into subtopics and confirm tone.
+    Blocking wrapper around analyze_topic_async.
+    """
+    return run_sync(analyze_topic_async(topic, tone, gemini_client))
+
+async def analyze_topic_async(topic: str, tone: str, gemini_client):
+    """
+    Uses Gemini to break down the topic into subtopics and confirm tone, without blocking the event loop.
     """
     console.print(f"[cyan]Analyzing topic: '{topic}' with tone: '{tone}'...[/cyan]")
     if not gemini_client:
@@ -31,7 +39,7 @@ def analyze_topic(topic: str, tone: str, gemini_client):
     Tone: Confirmed Tone
     """
     try:
-        response = gemini_client.generate_content(prompt)
+        response = await gemini_client.generate_content_async(prompt)
         text = response.text
 
         # Basic parsing (can be improved with regex or more robust parsing)
@@ -62,8 +70,11 @@ def analyze_topic(topic: str, tone: str, gemini_client):
         }
     except Exception as e:
         console.print(f"[bold red]Error during topic analysis with Gemini: {e}[/bold red]")
-        # Fallback structure
-        return {
-            'subtopics': ["Introduction", f"Understanding {topic}", "Key Considerations", "Examples", "Conclusion"],
-            'tone': tone or "informative"
-        }
\ No newline at end of file
+        return fallback_analysis(topic, tone)
+
+def fallback_analysis(topic: str, tone: str) -> dict:
+    """Generic subtopics used when the analysis fails (or runs out of time)."""
+    return {
+        'subtopics': ["Introduction", f"Understanding {topic}", "Key Considerations", "Examples", "Conclusion"],
+        'tone': tone or "informative"
+    }
\ No newline at end of file
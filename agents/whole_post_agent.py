@@ -0,0 +1,123 @@
+# agents/whole_post_agent.py
+import json
+from rich.console import Console
+from utils.background_loop import run_sync
+
+console = Console()
+
+# Gemini structured-output schema for the whole post: outline, sections, title and meta description in one response
+WHOLE_POST_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'tone': {'type': 'string'},
+        'title': {'type': 'string'},
+        'meta_description': {'type': 'string'},
+        'introduction': {'type': 'string'},
+        'sections': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {'heading': {'type': 'string'}, 'content': {'type': 'string'}},
+                'required': ['heading', 'content'],
+            },
+        },
+        'conclusion': {'type': 'string'},
+    },
+    'required': ['tone', 'title', 'meta_description', 'introduction', 'sections', 'conclusion'],
+}
+
+WHOLE_POST_GENERATION_CONFIG = {'response_mime_type': 'application/json', 'response_schema': WHOLE_POST_SCHEMA}
+
+
+def _build_research_context(research_data: dict) -> str:
+    """The research hints the per-section prompts spread across sections, given once for the whole post."""
+    context = ""
+    if research_data.get('news'):
+        news_titles = [n.get('title', 'related news') for n in research_data['news']]
+        context += f"Consider mentioning recent developments like: {', '.join(news_titles[:3])}. "
+    if research_data.get('keywords'):
+        context += f"Relevant keywords to work in: {', '.join(research_data['keywords'][:10])}. "
+    if research_data.get('quotes'):
+        context += f"You could include one or two of these quotes: {' | '.join(str(quote) for quote in research_data['quotes'][:3])}. "
+    return context
+
+def generate_whole_post(topic: str, tone: str, research_data: dict, gemini_client) -> dict:
+    """Blocking wrapper around generate_whole_post_async."""
+    return run_sync(generate_whole_post_async(topic, tone, research_data, gemini_client))
+
+async def generate_whole_post_async(topic: str, tone: str, research_data: dict, gemini_client) -> dict:
+    """
+    Asks Gemini for the complete post in one structured (JSON-schema) response.
+
+    Returns the parsed draft: {'tone', 'title', 'meta_description',
+    'introduction', 'sections': [{'heading', 'content'}], 'conclusion'}.
+    Raises ValueError if the response is missing or doesn't match the schema.
+    """
+    console.print(f"[cyan]Generating the whole post for '{topic}' in one request...[/cyan]")
+    if not gemini_client:
+        raise ValueError("Gemini client not available.")
+    prompt = f"""
+    You are planning and writing a complete blog post about "{topic}".
+    The suggested tone is '{tone}'; keep it if suitable, otherwise pick a better one
+    (informative, educational, technical, creative, formal, beginner-friendly) and report it as "tone".
+
+    Produce:
+    1.  "title": an engaging, SEO-friendly title (around 50-60 characters).
+    2.  "meta_description": a compelling summary (max 160 characters) to encourage clicks.
+    3.  "introduction": an engaging introduction (around 100-150 words) that states what the reader will learn.
+    4.  "sections": 5-7 logical sections, in order. Each has a "heading" (used as the H2) and
+        "content" of around 200-300 words, using Markdown (bullet points *if appropriate*) but no heading of its own.
+        Sections should flow logically from one to the next.
+    5.  "conclusion": a strong concluding paragraph (around 100 words) summarizing the key takeaways,
+        with a call-to-action. No "Conclusion:" title.
+    {_build_research_context(research_data)}
+    """
+    response = await gemini_client.generate_content_async(prompt, generation_config=WHOLE_POST_GENERATION_CONFIG)
+    return parse_whole_post(response.text)
+
+def parse_whole_post(text: str) -> dict:
+    """Validates a whole-post JSON response; raises ValueError naming the first problem."""
+    try:
+        draft = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Whole-post response is not valid JSON: {e}")
+    if not isinstance(draft, dict):
+        raise ValueError("Whole-post response is not a JSON object.")
+    for field in ('title', 'introduction', 'conclusion'):
+        if not isinstance(draft.get(field), str) or not draft[field].strip():
+            raise ValueError(f"Whole-post response has no '{field}'.")
+    sections = [
+        {'heading': section['heading'].strip(), 'content': section['content'].strip()}
+        for section in draft.get('sections') or []
+        if isinstance(section, dict) and str(section.get('heading', '')).strip() and str(section.get('content', '')).strip()
+    ]
+    if not sections:
+        raise ValueError("Whole-post response has no sections.")
+    return {
+        'tone': str(draft.get('tone') or "").strip(),
+        'title': draft['title'].strip(),
+        'meta_description': str(draft.get('meta_description') or "").strip()[:160], # Ensure max length
+        'introduction': draft['introduction'].strip(),
+        'sections': sections,
+        'conclusion': draft['conclusion'].strip(),
+    }
+
+# --- Adapters to the shapes the multi-call agents produce ---
+def draft_analysis(draft: dict, tone: str) -> dict:
+    """The analyze_topic shape: {'subtopics', 'tone'}."""
+    return {'subtopics': [section['heading'] for section in draft['sections']], 'tone': draft['tone'] or tone}
+
+def draft_title_and_description(draft: dict) -> dict:
+    """The generate_title_and_description shape."""
+    generated = {'title': draft['title']}
+    if draft['meta_description']:
+        generated['meta_description'] = draft['meta_description']
+    return generated
+
+def draft_markdown(draft: dict) -> str:
+    """Assembles the post exactly as generate_blog_post lays out its parts."""
+    parts = [draft['introduction'], "\n"]
+    for section in draft['sections']:
+        parts += [f"## {section['heading']}\n", section['content'], "\n"]
+    parts += ["## Conclusion\n", draft['conclusion']]
+    return "\n".join(parts)
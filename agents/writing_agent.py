@@ -1,21 +1,65 @@
 # agents/writing_agent.py
+import time
+import asyncio
 from rich.console import Console
 import random
+from utils.tracing import span
+from utils.background_loop import run_sync
 
 console = Console()
 
-def generate_blog_post(topic: str, subtopics: list, tone: str, research_data: dict, gemini_client):
+ERROR_PLACEHOLDER = "*[Error generating" # Prefix of the inline placeholder written when a part fails
+DEFAULT_MAX_CONCURRENCY = 4 # Gemini calls in flight per post when writing its parts (1 = sequential)
+
+def has_error_placeholder(parts: list) -> bool:
+    """True if a generated part contains a failure placeholder instead of real content."""
+    return any(ERROR_PLACEHOLDER in chunk for chunk in parts)
+
+def section_part_name(subtopic: str) -> str:
+    """Checkpoint name of the body section written for `subtopic`."""
+    return f"section:{subtopic}"
+
+async def _request_text(gemini_client, prompt: str, on_text=None, **request_options) -> str:
     """
-    Generates the full blog post content using Gemini.
+    Returns the stripped response text. With on_text, the request is streamed
+    and on_text receives each new piece of the stripped text as it arrives.
+    request_options go to generate_content_async (e.g. hedge=True).
     """
-    console.print("[cyan]Starting content generation...[/cyan]")
-    if not gemini_client:
-        console.print("[bold red]Gemini client not available. Cannot generate content.[/bold red]")
-        return "# Blog Post Generation Failed\n\nCould not connect to the generative AI service."
+    if on_text is None:
+        return (await gemini_client.generate_content_async(prompt, **request_options)).text.strip()
+    received, emitted = "", 0
+    async for chunk in await gemini_client.generate_content_async(prompt, stream=True, **request_options):
+        received += chunk.text
+        visible = received.strip() # Grows by appending: leading whitespace is dropped, trailing is held back
+        if len(visible) > emitted:
+            on_text(visible[emitted:])
+            emitted = len(visible)
+    return received.strip()
 
-    full_content = []
+def _build_section_context(research_data: dict, index: int, seed: str = "") -> str:
+    """Builds the optional research context snippet for one body section."""
+    # Seeded per section so a re-run sends the same prompt (and hits the LLM cache)
+    rng = random.Random(seed)
+    context = ""
+    if research_data.get('news'):
+        news_titles = [n.get('title', 'related news') for n in research_data['news']]
+        context += f"Consider mentioning recent developments like: {', '.join(news_titles[:2])}. " # Max 2 news titles
+    if research_data.get('keywords'):
+         context += f"Relevant keywords to consider: {', '.join(rng.sample(research_data['keywords'], min(3, len(research_data['keywords']))))}. " # Max 3 random keywords
+    if research_data.get('quotes') and index % 2 == 0: # Add a quote to every other section maybe
+         if research_data['quotes']:
+             context += f"You could potentially include a quote like: {rng.choice(research_data['quotes'])}. "
+    return context
 
-    # --- Introduction ---
+def generate_introduction(topic: str, tone: str, gemini_client, on_text=None) -> list:
+    """Blocking wrapper around generate_introduction_async."""
+    return run_sync(generate_introduction_async(topic, tone, gemini_client, on_text))
+
+async def generate_introduction_async(topic: str, tone: str, gemini_client, on_text=None) -> list:
+    """
+    Generates the introduction on its own; returns the Markdown chunks generate_blog_post expects as intro_parts.
+    Pass on_text to stream the text as it is written.
+    """
     console.print("[cyan]Generating introduction...[/cyan]")
     intro_prompt = f"""
     Write an engaging introduction (around 100-150 words) for a blog post about "{topic}".
@@ -24,53 +68,42 @@ def generate_blog_post(topic: str, subtopics: list, tone: str, research_data: di
     Do NOT include a title like "Introduction:". Just write the paragraph.
     """
     try:
-        intro_response = gemini_client.generate_content(intro_prompt)
-        full_content.append(intro_response.text.strip())
-        full_content.append("\n") # Add space after intro
+        return [await _request_text(gemini_client, intro_prompt, on_text), "\n"] # Add space after intro
     except Exception as e:
         console.print(f"[bold red]Error generating introduction: {e}[/bold red]")
-        full_content.append(f"*[Error generating introduction: {e}]*")
+        return [f"*[Error generating introduction: {e}]*"]
 
+async def _generate_section(topic: str, subtopic: str, index: int, total: int, tone: str, research_data: dict, gemini_client, on_text=None) -> list:
+    console.print(f"  - Generating section for: '{subtopic}' ({index+1}/{total})")
+    # Prepare context from research (optional, keep it concise)
+    context = _build_section_context(research_data, index, seed=f"{topic}:{subtopic}")
 
-    # --- Body Sections (Subtopics) ---
-    console.print(f"[cyan]Generating content for {len(subtopics)} subtopics...[/cyan]")
-    for i, subtopic in enumerate(subtopics):
-        console.print(f"  - Generating section for: '{subtopic}' ({i+1}/{len(subtopics)})")
-        # Prepare context from research (optional, keep it concise)
-        context = ""
-        if research_data.get('news'):
-            news_titles = [n.get('title', 'related news') for n in research_data['news']]
-            context += f"Consider mentioning recent developments like: {', '.join(news_titles[:2])}. " # Max 2 news titles
-        if research_data.get('keywords'):
-             context += f"Relevant keywords to consider: {', '.join(random.sample(research_data['keywords'], min(3, len(research_data['keywords']))))}. " # Max 3 random keywords
-        if research_data.get('quotes') and i % 2 == 0: # Add a quote to every other section maybe
-             if research_data['quotes']:
-                 context += f"You could potentially include a quote like: {random.choice(research_data['quotes'])}. "
-
-        section_prompt = f"""
-        Write a section for a blog post on the topic "{topic}".
-        This section's heading (H2) is: "{subtopic}".
-        The overall blog post tone is {tone}.
-
-        Write around 200-300 words for this section.
-        Focus on explaining "{subtopic}" clearly and engagingly.
-        Use Markdown formatting for structure (like bullet points *if appropriate*).
-        {context}
-
-        Do NOT include the H2 heading itself in your response. Just write the content for this section.
-        Ensure the content flows logically from a potential previous section and leads into the next.
-        """
-        try:
-            section_response = gemini_client.generate_content(section_prompt)
-            full_content.append(f"## {subtopic}\n") # Add H2 heading
-            full_content.append(section_response.text.strip())
-            full_content.append("\n") # Add space between sections
-        except Exception as e:
-            console.print(f"[bold red]Error generating section '{subtopic}': {e}[/bold red]")
-            full_content.append(f"## {subtopic}\n\n*[Error generating content for this section: {e}]*\n")
-
-
-    # --- Conclusion ---
+    section_prompt = f"""
+    Write a section for a blog post on the topic "{topic}".
+    This section's heading (H2) is: "{subtopic}".
+    The overall blog post tone is {tone}.
+
+    Write around 200-300 words for this section.
+    Focus on explaining "{subtopic}" clearly and engagingly.
+    Use Markdown formatting for structure (like bullet points *if appropriate*).
+    {context}
+
+    Do NOT include the H2 heading itself in your response. Just write the content for this section.
+    Ensure the content flows logically from a potential previous section and leads into the next.
+    """
+    try:
+        heading = f"## {subtopic}\n"
+        if on_text:
+            on_text(heading + "\n")
+        # H2 heading, section body, then space between sections. Sections and the
+        # conclusion run side by side and the slowest one holds up the post, so a
+        # straggler is hedged with a duplicate request.
+        return [heading, await _request_text(gemini_client, section_prompt, on_text, hedge=True), "\n"]
+    except Exception as e:
+        console.print(f"[bold red]Error generating section '{subtopic}': {e}[/bold red]")
+        return [f"## {subtopic}\n\n*[Error generating content for this section: {e}]*\n"]
+
+async def _generate_conclusion(topic: str, tone: str, gemini_client, on_text=None) -> list:
     console.print("[cyan]Generating conclusion...[/cyan]")
     conclusion_prompt = f"""
     Write a strong concluding paragraph (around 100 words) for the blog post about "{topic}".
@@ -80,12 +113,125 @@ def generate_blog_post(topic: str, subtopics: list, tone: str, research_data: di
     Do NOT include a title like "Conclusion:". Just write the paragraph.
     """
     try:
-        conclusion_response = gemini_client.generate_content(conclusion_prompt)
-        full_content.append("## Conclusion\n") # Add H2 heading for conclusion
-        full_content.append(conclusion_response.text.strip())
+        if on_text:
+            on_text("## Conclusion\n\n")
+        return ["## Conclusion\n", await _request_text(gemini_client, conclusion_prompt, on_text, hedge=True)] # Add H2 heading for conclusion
     except Exception as e:
         console.print(f"[bold red]Error generating conclusion: {e}[/bold red]")
-        full_content.append("\n## Conclusion\n\n*[Error generating conclusion: {e}]*")
+        return [f"\n## Conclusion\n\n*[Error generating conclusion: {e}]*"]
+
+def generate_blog_post(topic: str, subtopics: list, tone: str, research_data: dict, gemini_client, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, intro_parts: list = None, checkpoint=None, stream=None, intro_client=None, time_budget: float = None, on_timeout=None):
+    """Blocking wrapper around generate_blog_post_async."""
+    return run_sync(generate_blog_post_async(
+        topic, subtopics, tone, research_data, gemini_client,
+        max_concurrency=max_concurrency, intro_parts=intro_parts, checkpoint=checkpoint, stream=stream, intro_client=intro_client,
+        time_budget=time_budget, on_timeout=on_timeout
+    ))
+
+async def generate_blog_post_async(topic: str, subtopics: list, tone: str, research_data: dict, gemini_client, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, intro_parts: list = None, checkpoint=None, stream=None, intro_client=None, time_budget: float = None, on_timeout=None):
+    """
+    Generates the full blog post content using Gemini.
+
+    With max_concurrency > 1 the introduction, body sections and conclusion are
+    requested concurrently (at most max_concurrency calls in flight); the parts
+    are still assembled in their original order. Pass intro_parts (from
+    generate_introduction) to reuse an introduction written ahead of time.
+    With a checkpoint (utils.checkpoint.RunCheckpoint), parts saved by an
+    earlier attempt are reused and each newly written part is saved unless it
+    failed, so a resumed run only regenerates missing or errored parts.
+    With a stream (utils.streaming.PostStream over 1 + len(subtopics) + 1
+    parts), every part is requested with streaming and its text is passed to
+    the stream as it arrives; restored and pre-written parts are passed whole.
+    Pass intro_client to write the introduction and conclusion with a
+    different model than the body sections.
+    With time_budget (seconds), parts still unwritten when it runs out get the
+    usual error placeholder, the parts already written are kept, and
+    on_timeout(part_name) is called for each part that was cut off.
+    """
+    console.print("[cyan]Starting content generation...[/cyan]")
+    intro_client = intro_client or gemini_client
+    if not gemini_client:
+        console.print("[bold red]Gemini client not available. Cannot generate content.[/bold red]")
+        return "# Blog Post Generation Failed\n\nCould not connect to the generative AI service."
+
+    # One coroutine function per part of the post, in final document order
+    def traced(span_name, generate, **attributes):
+        async def run():
+            with span(span_name, **attributes):
+                return await generate()
+        return run
+
+    def checkpointed(part_name, generate):
+        if checkpoint is None:
+            return generate
+        async def run():
+            saved = checkpoint.load_part(part_name)
+            if saved is not None:
+                return saved
+            parts = await generate()
+            if not has_error_placeholder(parts):
+                checkpoint.save_part(part_name, parts)
+            return parts
+        return run
+
+    budget_ends = time.monotonic() + time_budget if time_budget is not None else None
+    def timed(part_name, placeholder, generate):
+        if budget_ends is None:
+            return generate
+        async def run():
+            try:
+                return await asyncio.wait_for(generate(), max(0.0, budget_ends - time.monotonic()))
+            except asyncio.TimeoutError:
+                console.print(f"[yellow]Ran out of time for '{part_name}'; leaving a placeholder.[/yellow]")
+                if on_timeout:
+                    on_timeout(part_name)
+                return placeholder
+        return run
+
+    def streamed(index, generate):
+        if stream is None:
+            return generate
+        async def run():
+            parts = await generate()
+            stream.finish(index, "\n".join(parts))
+            return parts
+        return run
+
+    def on_text(index):
+        return (lambda text: stream.append(index, text)) if stream is not None else None
+
+    async def pre_written():
+        return intro_parts
+
+    if intro_parts is not None:
+        part_generators = [pre_written]
+    else:
+        part_generators = [timed("introduction", [f"{ERROR_PLACEHOLDER} introduction: timed out]*"], checkpointed(
+            "introduction", traced("write:introduction", lambda: generate_introduction_async(topic, tone, intro_client, on_text(0)))
+        ))]
+    for i, subtopic in enumerate(subtopics):
+        part_generators.append(timed(section_part_name(subtopic), [f"## {subtopic}\n\n{ERROR_PLACEHOLDER} content for this section: timed out]*\n"], checkpointed(
+            section_part_name(subtopic), traced(
+                "write:section",
+                lambda i=i, subtopic=subtopic: _generate_section(topic, subtopic, i, len(subtopics), tone, research_data, gemini_client, on_text(i + 1)),
+                subtopic=subtopic
+            )
+        )))
+    part_generators.append(timed("conclusion", [f"\n## Conclusion\n\n{ERROR_PLACEHOLDER} conclusion: timed out]*"], checkpointed(
+        "conclusion", traced("write:conclusion", lambda: _generate_conclusion(topic, tone, intro_client, on_text(len(subtopics) + 1)))
+    )))
+    part_generators = [streamed(index, generate) for index, generate in enumerate(part_generators)]
+
+    console.print(f"[cyan]Generating content for {len(subtopics)} subtopics...[/cyan]")
+    # Each part is its own task (tasks copy the caller's context, so tracing
+    # spans nest under it); gather returns them in document order.
+    limit = asyncio.Semaphore(max(1, max_concurrency or 1))
+    async def limited(generate):
+        async with limit:
+            return await generate()
+    parts = await asyncio.gather(*(limited(generate) for generate in part_generators))
+
+    full_content = [chunk for part in parts for chunk in part]
 
     console.print("[green]Content generation complete.[/green]")
-    return "\n".join(full_content)
\ No newline at end of file
+    return "\n".join(full_content)
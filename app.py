@@ -1,14 +1,19 @@
 # app.py
 import streamlit as st
-import asyncio
 import os
+import json
+import time
 import datetime
 from pathlib import Path
 
 # Import the modified agent runner function
 # Ensure VS Code/Python can find 'main' (running streamlit from root folder helps)
 try:
-    from main import run_blog_agent
+    from main import run_blog_agent_coalesced, build_blog_pipeline, GENERATION_MODES
+    from utils.api_clients import get_model_router, get_http_session
+    from utils.background_loop import BackgroundEventLoop
+    from utils.jobs import JobQueue, QueueFullError
+    from utils.catalog import get_catalog
 except ImportError as e:
     st.error(f"Error importing agent function: {e}. Make sure you run streamlit from the project root directory.")
     st.stop() # Stop execution if import fails
@@ -31,88 +36,159 @@ st.set_page_config(
 st.sidebar.title("✍️ AI Blog Agent")
 
 
+# --- Shared Agent Runtime ---
+# Created once per server process and shared by every session: one background
+# event loop (which owns the pooled keep-alive HTTP session), the Gemini clients
+# for each stage's model, and a bounded job queue whose workers run the pipelines, so
+# script runs never block on generation.
+@st.cache_resource(show_spinner=False)
+def get_agent_runtime():
+    runtime_loop = BackgroundEventLoop().start()
+    runtime_loop.run(get_http_session()) # Open the connection pool up front
+    gemini_client = get_model_router() # Each stage on its configured model (GEMINI_MODEL_<STAGE>)
+
+    async def run_job(topic, tone, output_dir, progress_callback, **options):
+        # Pass run_mode='streamlit' to suppress CLI output; identical requests
+        # from other sessions share one run and its cached result
+        return await run_blog_agent_coalesced(topic, tone, output_dir, run_mode='streamlit',
+                                              progress_callback=progress_callback, gemini_client=gemini_client, **options)
+
+    jobs = runtime_loop.run(JobQueue(run_job).start())
+    return {'loop': runtime_loop, 'gemini_client': gemini_client, 'jobs': jobs}
+
+OUTPUT_DIR = "output" # Or make this configurable in UI
+HISTORY_LIMIT = 50 # Catalog entries listed in the sidebar
+
+# Stage names in pipeline order per generation mode, for the progress display
+PIPELINE_STAGES = {
+    mode: [stage['name'] for stage in build_blog_pipeline("", "", "", None, None, generation_mode=mode).describe()]
+    for mode in GENERATION_MODES
+}
+GENERATION_MODE_LABELS = {'multi': "Section by section (parallel requests)", 'single': "Whole post in one request"}
+
+
 # --- Session State Initialization ---
-if 'history' not in st.session_state:
-    st.session_state.history = [] # List to store {'topic': str, 'tone': str, 'timestamp': str, 'slug': str}
 if 'current_topic' not in st.session_state:
     st.session_state.current_topic = ""
 if 'current_tone' not in st.session_state:
     st.session_state.current_tone = "informative"
+if 'generation_mode' not in st.session_state:
+    st.session_state.generation_mode = "multi"
+if 'reuse_similar' not in st.session_state:
+    st.session_state.reuse_similar = True
 if 'generated_content' not in st.session_state:
     st.session_state.generated_content = None
 if 'metadata' not in st.session_state:
     st.session_state.metadata = None
-if 'is_running' not in st.session_state:
-    st.session_state.is_running = False
+if 'current_job_id' not in st.session_state:
+    st.session_state.current_job_id = None # Job this session is waiting on
 if 'last_run_topic' not in st.session_state:
     st.session_state.last_run_topic = ""
 
 
-# --- Helper Function to Run Agent ---
+# --- Helper Functions to Run Agent ---
+def get_current_job():
+    job_id = st.session_state.current_job_id
+    return get_agent_runtime()['jobs'].get(job_id) if job_id else None
+
+def is_running():
+    job = get_current_job()
+    return job is not None and not job.is_finished
+
 # This function will be called when the button is pressed
 def trigger_agent_run():
     topic = st.session_state.current_topic
     tone = st.session_state.current_tone
-    output_dir = "output" # Or make this configurable in UI
+    output_dir = OUTPUT_DIR
 
     if not topic:
         st.error("Please enter a topic.")
         return
 
-    if st.session_state.is_running:
+    if is_running():
         st.warning("Agent is already running. Please wait.")
         return
 
+    # Hand the run to the shared worker pool; the page polls the job instead of blocking
+    try:
+        # Streamed, so the post shows up section by section while it is written
+        job = get_agent_runtime()['jobs'].submit(
+            topic, tone, output_dir, generation_mode=st.session_state.generation_mode, stream=True,
+            reuse_similar=st.session_state.reuse_similar
+        )
+    except QueueFullError as e:
+        st.warning(str(e))
+        return
+    except Exception as e:
+        st.error(f"An unexpected error occurred: {e}")
+        print(f"Streamlit App Error: {e}") # Print to console where streamlit runs
+        return
+
     # Clear previous results before starting
     st.session_state.generated_content = None
     st.session_state.metadata = None
-    st.session_state.is_running = True
+    st.session_state.current_job_id = job.id
     st.session_state.last_run_topic = topic # Store the topic being run
 
-    # Use st.spinner for visual feedback
-    with st.spinner(f"Generating blog post for '{topic}' with tone '{tone}'... Please wait."):
-        try:
-            # Run the async function using asyncio.run()
-            # Pass run_mode='streamlit' to suppress CLI output and enable potential st messages
-            markdown_content, metadata = asyncio.run(
-                run_blog_agent(topic, tone, output_dir, run_mode='streamlit')
-            )
-
-            # Store results in session state
-            st.session_state.generated_content = markdown_content
-            st.session_state.metadata = metadata
-
-            # Add to history if successful and topic is new
-            if markdown_content and metadata:
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                slug = metadata.get('slug', 'unknown-slug')
-                # Avoid adding duplicates immediately
-                if not any(h['topic'] == topic and h['tone'] == tone for h in st.session_state.history):
-                     st.session_state.history.insert(0, { # Add to beginning
-                         "topic": topic,
-                         "tone": tone,
-                         "timestamp": timestamp,
-                         "slug": slug
-                     })
-                     # Limit history size (e.g., keep last 10)
-                     st.session_state.history = st.session_state.history[:10]
-
-                st.success("Blog post generated successfully!")
-            else:
-                # Error messages should be handled within run_blog_agent using st.error
-                # But add a generic one here if it returns None without specific error
-                if not st.session_state.generated_content and not st.session_state.metadata:
-                     st.error("Blog post generation failed. Check logs or API keys.")
-
-
-        except Exception as e:
-            st.error(f"An unexpected error occurred: {e}")
-            # Log the full error for debugging if needed
-            print(f"Streamlit App Error: {e}") # Print to console where streamlit runs
-        finally:
-            # Ensure the running flag is reset
-            st.session_state.is_running = False
-            # Rerun to update the UI elements based on the new state
+def collect_finished_job(job):
+    """Moves a finished job's results into this session (once); the export stage has already catalogued the post."""
+    st.session_state.current_job_id = None
+    st.session_state.generated_content = job.markdown_content
+    st.session_state.metadata = job.metadata
+
+    if job.status == 'done':
+        reused = job.metadata.get('reused_from')
+        if reused:
+            st.session_state.last_run_message = ('success', f"Reused the existing post on '{reused['topic']}' (similarity {reused['similarity']}).")
+        else:
+            st.session_state.last_run_message = ('success', "Blog post generated successfully!")
+    else:
+        st.session_state.last_run_message = ('error', job.error or "Blog post generation failed. Check logs or API keys.")
+
+def load_catalog_post():
+    """Reloads the post picked in the History sidebar: its topic and tone, plus the exported content if still on disk."""
+    slug = st.session_state.history_selector
+    if not slug:
+        return
+    st.session_state.history_selector = "" # Safe here: callbacks run before the widget is created again
+    post = get_catalog(OUTPUT_DIR).get(slug)
+    if post is None:
+        st.session_state.last_run_message = ('warning', f"'{slug}' is no longer in the catalog.")
+        return
+    st.session_state.current_topic = post['topic']
+    if post['tone'] in tone_options:
+        st.session_state.current_tone = post['tone']
+        st.session_state.tone_selector = post['tone']
+    try:
+        st.session_state.generated_content = Path(post['md_path']).read_text(encoding='utf-8')
+        st.session_state.metadata = json.loads(Path(post['json_path']).read_text(encoding='utf-8'))
+    except (OSError, TypeError, ValueError) as e:
+        st.session_state.last_run_message = ('warning', f"Could not load the exported files for '{slug}': {e}")
+
+def render_job_progress():
+    """Shows queued/running state and per-stage progress of this session's job; reruns the page when it finishes."""
+    job = get_current_job()
+    if job is None:
+        return
+    if job.is_finished:
+        collect_finished_job(job)
+        st.rerun() # Full rerun so the results and the catalog history render
+    if job.status == 'queued':
+        st.info(f"Queued: '{job.topic}' ({get_agent_runtime()['jobs'].queued_count()} job(s) waiting)...")
+        return
+    stages = PIPELINE_STAGES[job.options.get('generation_mode', 'multi')]
+    completed = [name for name in stages if job.stages.get(name) == 'completed']
+    running = [name for name in stages if job.stages.get(name) == 'started']
+    st.info(f"Processing topic: '{job.topic}'...") # Show which topic is running
+    st.progress(min(1.0, len(completed) / len(stages)), text=f"Running: {', '.join(running) or 'starting'}")
+    partial_markdown = job.partial_markdown
+    if partial_markdown:
+        with st.container(border=True):
+            st.markdown(partial_markdown)
+
+# Poll the job without re-running the whole script, where supported
+if hasattr(st, 'fragment'):
+    render_job_progress = st.fragment(run_every=1)(render_job_progress)
 
 
 # --- Sidebar Controls ---
@@ -120,40 +196,59 @@ st.sidebar.header("Configuration")
 
 # Tone Selection
 tone_options = ["informative", "educational", "creative", "formal", "technical", "beginner-friendly"]
+if 'tone_selector' not in st.session_state:
+    # Seeded through session state (not index=) so reloading a past post can switch it
+    st.session_state.tone_selector = st.session_state.current_tone if st.session_state.current_tone in tone_options else tone_options[0]
 st.session_state.current_tone = st.sidebar.selectbox(
     "Select Writing Tone:",
     options=tone_options,
-    index=tone_options.index(st.session_state.current_tone) if st.session_state.current_tone in tone_options else 0,
     key='tone_selector' # Assign key for stability
 )
 
+st.sidebar.radio(
+    "Generation Mode:",
+    options=list(GENERATION_MODES),
+    format_func=GENERATION_MODE_LABELS.get,
+    key='generation_mode',
+    help="One request is cheaper in tokens; parallel sections usually finish sooner."
+)
+
+st.sidebar.checkbox(
+    "Reuse posts on near-identical topics",
+    key='reuse_similar',
+    help="Untick to always generate a new post, even if one on a near-identical topic (same tone) already exists."
+)
+
 st.sidebar.header("History")
-if not st.session_state.history:
-    st.sidebar.caption("No past topics yet.")
+# Listed from the post catalog, so it covers every exported post (from any
+# session, the CLI or the service), not just this session's runs
+history_query = st.sidebar.text_input("Search by topic or tag:", key='history_query')
+try:
+    catalog = get_catalog(OUTPUT_DIR)
+    if history_query.strip():
+        history_posts = catalog.search(history_query, limit=HISTORY_LIMIT)
+    else:
+        history_posts = catalog.list_posts(limit=HISTORY_LIMIT)
+except Exception as e:
+    history_posts = []
+    st.sidebar.caption(f"Post catalog unavailable: {e}")
+
+if not history_posts:
+    st.sidebar.caption("No matching posts." if history_query.strip() else "No past topics yet.")
 else:
-    # Allow selecting a past topic to re-populate the input field
-    history_topics = [f"{h['topic']} ({h['tone']}) - {h['timestamp']}" for h in st.session_state.history]
-    selected_history = st.sidebar.radio(
+    history_labels = {
+        post['slug']: f"{post['topic']} ({post['tone']}) - {datetime.datetime.fromtimestamp(post['created_at']).strftime('%Y-%m-%d %H:%M')}"
+        for post in history_posts
+    }
+    st.sidebar.radio(
         "Select a past topic to reload:",
-        options=[""] + history_topics, # Add empty option to deselect
+        options=[""] + list(history_labels), # Add empty option to deselect
+        format_func=lambda slug: history_labels.get(slug, "—"),
         index=0,
-        key='history_selector'
+        key='history_selector',
+        on_change=load_catalog_post
     )
 
-    if selected_history:
-        # Find the corresponding history entry
-        selected_index = history_topics.index(selected_history)
-        history_entry = st.session_state.history[selected_index]
-        # Update current topic and tone in session state
-        st.session_state.current_topic = history_entry['topic']
-        st.session_state.current_tone = history_entry['tone']
-        # Clear the radio selection so it can be clicked again if needed
-        # Setting the key directly might be more reliable for radio buttons
-        st.session_state.history_selector = "" # Attempt to clear selection state
-
-        # Use rerun to update the main input field immediately
-        st.experimental_rerun() # OLD LINE
-
 
 
 # --- Main Area ---
@@ -172,7 +267,7 @@ st.text_input(
 st.button(
     "Generate Blog Post",
     on_click=trigger_agent_run,
-    disabled=st.session_state.is_running, # Disable button while running
+    disabled=is_running(), # Disable button while this session's job runs
     type="primary" # Make button more prominent
 )
 
@@ -180,8 +275,20 @@ st.button(
 st.markdown("---") # Separator
 st.header("Generated Output")
 
-if st.session_state.is_running and not st.session_state.generated_content:
-     st.info(f"Processing topic: '{st.session_state.last_run_topic}'...") # Show which topic is running
+# Pick up a job that finished between polls
+finished_job = get_current_job()
+if finished_job is not None and finished_job.is_finished:
+    collect_finished_job(finished_job)
+
+if 'last_run_message' in st.session_state:
+    level, message = st.session_state.pop('last_run_message')
+    getattr(st, level)(message)
+
+if is_running():
+    render_job_progress()
+    if not hasattr(st, 'fragment'): # Older Streamlit: poll by rerunning the whole script
+        time.sleep(1)
+        st.rerun()
 
 elif st.session_state.generated_content:
     st.subheader("Blog Post Content (Markdown)")
@@ -0,0 +1,99 @@
+# benchmarks/check_circuit_breaker.py
+"""
+Circuit breaker accounting check for utils.rate_limiter.
+
+Drives call_with_retry and call_with_retry_async with scripted outcomes and
+fails (exit 1) unless only *consecutive* outages (5xx, timeouts, dropped
+connections) open a provider's circuit: a 429 or other 4xx in between means
+the provider answered and must reset the count, and a success must close a
+half-open circuit. No network is used.
+
+    python -m benchmarks.check_circuit_breaker
+"""
+import sys
+import asyncio
+
+from utils import rate_limiter
+from utils.circuit_breaker import get_circuit_breaker, reset_circuit_breakers, CircuitOpenError, CLOSED, OPEN
+
+PROVIDER = 'circuit-check'
+FAILURE_THRESHOLD = 3
+
+
+class ScriptedError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def _raise_for(outcome):
+    if outcome == 'ok':
+        return 'ok'
+    if outcome == 'timeout':
+        raise TimeoutError("scripted timeout")
+    raise ScriptedError(outcome)
+
+def run_sync(outcomes):
+    for outcome in outcomes:
+        try:
+            rate_limiter.call_with_retry(PROVIDER, _raise_for, outcome, max_attempts=1)
+        except (ScriptedError, TimeoutError, CircuitOpenError):
+            pass
+
+def run_async(outcomes):
+    async def go():
+        for outcome in outcomes:
+            async def attempt(outcome=outcome):
+                return _raise_for(outcome)
+            try:
+                await rate_limiter.call_with_retry_async(PROVIDER, attempt, max_attempts=1)
+            except (ScriptedError, TimeoutError, CircuitOpenError):
+                pass
+    asyncio.run(go())
+
+
+# (name, outcomes, expected state afterwards)
+SCENARIOS = [
+    ("outages split by a 400 stay closed", [503, 503, 400, 503, 503], CLOSED),
+    ("outages split by a 429 stay closed", ['timeout', 502, 429, 'timeout', 502], CLOSED),
+    ("outages split by a success stay closed", [500, 500, 'ok', 500, 500], CLOSED),
+    ("consecutive outages open the circuit", [404, 503, 'timeout', 500], OPEN),
+    ("4xx errors alone never open it", [400, 401, 404, 422, 429, 400], CLOSED),
+]
+
+
+def main_cli():
+    rate_limiter.PROVIDER_LIMITS[PROVIDER] = (60000.0, 1000) # The token bucket must not slow the check down
+    failures = []
+    try:
+        for runner_name, runner in (("sync", run_sync), ("async", run_async)):
+            for name, outcomes, expected in SCENARIOS:
+                reset_circuit_breakers(failure_threshold=FAILURE_THRESHOLD, reset_timeout=60)
+                runner(outcomes)
+                state = get_circuit_breaker(PROVIDER).state
+                status = "ok" if state == expected else "FAIL"
+                print(f"{runner_name:5s} {name}: {state} (expected {expected}) {status}")
+                if state != expected:
+                    failures.append(f"{runner_name}: {name}")
+
+            # A half-open probe answered with a 4xx closes the circuit again
+            reset_circuit_breakers(failure_threshold=FAILURE_THRESHOLD, reset_timeout=0)
+            runner([503] * FAILURE_THRESHOLD + [400])
+            state = get_circuit_breaker(PROVIDER).state
+            print(f"{runner_name:5s} half-open probe answered with a 400 closes it: {state} (expected {CLOSED}) "
+                  f"{'ok' if state == CLOSED else 'FAIL'}")
+            if state != CLOSED:
+                failures.append(f"{runner_name}: half-open probe answered with a 400")
+    finally:
+        reset_circuit_breakers()
+        rate_limiter.PROVIDER_LIMITS.pop(PROVIDER, None)
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,74 @@
+# benchmarks/check_import_time.py
+"""
+Import-time budget guard for the CLI path.
+
+Imports `main` in a fresh interpreter with `-X importtime` and fails (exit 1)
+if it pulls in Streamlit, the Gemini SDK or the syllable dictionaries, or if the cumulative
+import time exceeds the budget.
+
+    python -m benchmarks.check_import_time [--budget-ms 800] [--repeat 3]
+"""
+import re
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy modules that must only load on first use, never on `import main`
+FORBIDDEN_MODULES = ('streamlit', 'google.generativeai', 'textstat', 'cmudict', 'pyphen')
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def measure(module: str = "main") -> tuple:
+    """Returns (cumulative_import_microseconds, set_of_imported_module_names) for a cold import of `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    imported = set()
+    cumulative = None
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(3)
+        imported.add(name)
+        if name == module:
+            cumulative = int(match.group(2))
+    return cumulative, imported
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Fail if importing the CLI entry point is too slow or loads heavy optional modules.")
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="Max cumulative import time of `main` (best of --repeat runs).")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold imports to run; the fastest one is compared to the budget.")
+    args = parser.parse_args()
+
+    timings = []
+    imported = set()
+    for _ in range(max(1, args.repeat)):
+        cumulative, modules = measure("main")
+        timings.append(cumulative / 1000.0)
+        imported |= modules
+
+    failures = []
+    leaked = sorted(name for name in imported if any(name == m or name.startswith(m + ".") for m in FORBIDDEN_MODULES))
+    if leaked:
+        failures.append(f"heavy modules imported by `import main`: {', '.join(leaked[:10])}")
+    best = min(timings)
+    if best > args.budget_ms:
+        failures.append(f"`import main` took {best:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    print(f"import main: best {best:.0f} ms over {len(timings)} runs (budget {args.budget_ms:.0f} ms)")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,255 @@
+# benchmarks/fake_services.py
+import json
+import random
+import asyncio
+import weakref
+import threading
+from types import SimpleNamespace
+import requests
+import aiohttp
+from aiohttp import web
+
+# Per-service behaviour. latency: mean seconds, jitter: +/- seconds,
+# tail_probability/tail_multiplier: occasional slow outliers,
+# error_rate: share of requests answered with 429 (Retry-After: 0) or 500,
+# size: words per Gemini response / items per list response,
+# seconds_per_word: extra Gemini generation time per response word (long responses take longer),
+# unavailable: every request is answered with 503 after the latency (an upstream outage).
+DEFAULT_SERVICE_CONFIG = {
+    'latency': 0.05,
+    'seconds_per_word': 0.0,
+    'jitter': 0.0,
+    'tail_probability': 0.0,
+    'tail_multiplier': 1.0,
+    'error_rate': 0.0,
+    'unavailable': False,
+    'size': 10,
+}
+STREAM_CHUNK_WORDS = 8 # Words per chunk of a streamed Gemini response
+# Fake model names the Gemini endpoint answers faster than the configured latency
+# (a smaller, cheaper model); used to measure per-stage model routing.
+FAKE_MODEL_LATENCY_FACTORS = {'models/fake-gemini-lite': 0.35}
+
+
+class FakeServices:
+    """
+    Local stand-ins for Gemini, NewsData, Datamuse and Quotable served by one
+    aiohttp app on a background thread, each with its own latency/error/size
+    settings. Request counts per service are kept in `self.requests`.
+
+        /gemini/generate       POST {"prompt": ..., "response_mime_type": ..., "stream": bool} -> {"text": ..., "usage": {...}}
+                               (streamed: one such JSON object per line, "usage" on the last)
+        /newsdata/news         GET  -> {"results": [...]}
+        /datamuse/words        GET  -> [{"word": ...}, ...]
+        /quotable/quotes/random GET -> [{"content": ..., "author": ...}, ...]
+    """
+
+    def __init__(self, config: dict = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = {
+            name: {**DEFAULT_SERVICE_CONFIG, **(config or {}).get(name, {})}
+            for name in ('gemini', 'newsdata', 'datamuse', 'quotable')
+        }
+        self.host = host
+        self.port = port
+        self.requests = {name: 0 for name in self.config}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _simulate(self, name: str, latency_factor: float = 1.0):
+        """Sleeps for the configured latency (times latency_factor); returns an error response or None."""
+        self.requests[name] += 1
+        cfg = self.config[name]
+        delay = max(0.0, cfg['latency'] + random.uniform(-cfg['jitter'], cfg['jitter'])) * latency_factor
+        if random.random() < cfg['tail_probability']:
+            delay *= cfg['tail_multiplier']
+        await asyncio.sleep(delay)
+        if cfg['unavailable']:
+            return web.json_response({'error': 'service unavailable'}, status=503)
+        if random.random() < cfg['error_rate']:
+            if random.random() < 0.5:
+                return web.json_response({'error': 'rate limited'}, status=429, headers={'Retry-After': '0'})
+            return web.json_response({'error': 'internal error'}, status=500)
+        return None
+
+    async def _gemini(self, request):
+        payload = await request.json()
+        latency_factor = FAKE_MODEL_LATENCY_FACTORS.get(payload.get('model'), 1.0)
+        error = await self._simulate('gemini', latency_factor)
+        if error:
+            return error
+        prompt = payload.get('prompt', "")
+        size = self.config['gemini']['size']
+        def words(count=size):
+            return " ".join(random.choice(("lorem", "ipsum", "dolor", "amet", "energy", "future")) for _ in range(count))
+        if payload.get('response_mime_type') == 'application/json':
+            # Structured whole-post request (agents/whole_post_agent.py)
+            text = json.dumps({
+                'tone': "informative",
+                'title': "A Benchmark Blog Post",
+                'meta_description': "A synthetic post generated against local stand-in services.",
+                'introduction': f"{words(size // 2).capitalize()}.",
+                'sections': [{'heading': f"Subtopic {i + 1}", 'content': f"{words().capitalize()}. {words()}."} for i in range(6)],
+                'conclusion': f"{words(size // 2).capitalize()}.",
+            })
+        elif "Subtopics:" in prompt:
+            text = "Subtopics:\n" + "\n".join(f"- Subtopic {i + 1}" for i in range(6)) + "\nTone: informative"
+        elif "Meta Description:" in prompt:
+            text = "Title: A Benchmark Blog Post\nMeta Description: A synthetic post generated against local stand-in services."
+        else:
+            text = f"{words().capitalize()}. {words()}."
+        # Rough token estimate (~4 characters per token), reported like Gemini's usage_metadata
+        usage = {'prompt_token_count': len(prompt) // 4 + 1, 'candidates_token_count': len(text) // 4 + 1}
+        seconds_per_word = self.config['gemini']['seconds_per_word'] * latency_factor
+        if not payload.get('stream'):
+            await asyncio.sleep(len(text.split()) * seconds_per_word)
+            return web.json_response({'text': text, 'usage': usage})
+        # Streamed: the configured latency was the time to the first chunk, then words arrive at the generation rate
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        pieces = text.split(" ")
+        for start in range(0, len(pieces), STREAM_CHUNK_WORDS):
+            chunk = " ".join(pieces[start:start + STREAM_CHUNK_WORDS]) + (" " if start + STREAM_CHUNK_WORDS < len(pieces) else "")
+            last = start + STREAM_CHUNK_WORDS >= len(pieces)
+            await response.write((json.dumps({'text': chunk, 'usage': usage if last else None}) + "\n").encode("utf-8"))
+            if not last:
+                await asyncio.sleep(STREAM_CHUNK_WORDS * seconds_per_word)
+        await response.write_eof()
+        return response
+
+    async def _newsdata(self, request):
+        error = await self._simulate('newsdata')
+        if error:
+            return error
+        return web.json_response({'results': [{'title': f"News item {i}"} for i in range(self.config['newsdata']['size'])]})
+
+    async def _datamuse(self, request):
+        error = await self._simulate('datamuse')
+        if error:
+            return error
+        prefix = 'ml' if 'ml' in request.query else 'trg'
+        return web.json_response([{'word': f"{prefix}word{i}"} for i in range(self.config['datamuse']['size'])])
+
+    async def _quotable(self, request):
+        error = await self._simulate('quotable')
+        if error:
+            return error
+        return web.json_response([{'content': f"Quote {i}", 'author': "Anon"} for i in range(self.config['quotable']['size'])])
+
+    def _make_app(self):
+        app = web.Application()
+        app.router.add_post('/gemini/generate', self._gemini)
+        app.router.add_get('/newsdata/news', self._newsdata)
+        app.router.add_get('/datamuse/words', self._datamuse)
+        app.router.add_get('/quotable/quotes/random', self._quotable)
+        return app
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self._make_app())
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        # Pick up the real port when port=0 asked for an ephemeral one
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name="fake-services", daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=10)
+        return self
+
+    def stop(self):
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeGeminiResponse:
+    def __init__(self, text: str, usage: dict = None):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(**usage) if usage else None
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel that calls the local /gemini/generate endpoint:
+    generate_content blocks like the SDK's, generate_content_async doesn't.
+    """
+
+    def __init__(self, base_url: str, model_name: str = "models/fake-gemini"):
+        self.url = f"{base_url}/gemini/generate"
+        self.model_name = model_name
+        self._local = threading.local() # One keep-alive session per worker thread
+        self._async_sessions = weakref.WeakKeyDictionary() # One aiohttp session per event loop
+
+    def _request_body(self, prompt, kwargs: dict) -> str:
+        generation_config = kwargs.get('generation_config') or {}
+        return json.dumps({'prompt': prompt, 'model': self.model_name, 'response_mime_type': generation_config.get('response_mime_type'), 'stream': bool(kwargs.get('stream'))})
+
+    def generate_content(self, prompt, **kwargs):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        stream = bool(kwargs.get('stream'))
+        response = session.post(self.url, data=self._request_body(prompt, kwargs), headers={'Content-Type': 'application/json'}, timeout=60, stream=stream)
+        response.raise_for_status()
+        if stream:
+            return self._iter_chunks(response)
+        payload = response.json()
+        return FakeGeminiResponse(payload['text'], payload.get('usage'))
+
+    @staticmethod
+    def _iter_chunks(response):
+        with response:
+            for line in response.iter_lines():
+                if line:
+                    payload = json.loads(line)
+                    yield FakeGeminiResponse(payload['text'], payload.get('usage'))
+
+    async def generate_content_async(self, prompt, **kwargs):
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is None or session.closed:
+            # Its own unlimited pool, like the SDK's client, so research requests don't compete for connections
+            session = self._async_sessions[loop] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        response = await session.post(self.url, data=self._request_body(prompt, kwargs), headers={'Content-Type': 'application/json'},
+                                      timeout=aiohttp.ClientTimeout(total=60))
+        if kwargs.get('stream'):
+            response.raise_for_status() # Releases the connection on an error status
+            return self._iter_chunks_async(response)
+        async with response:
+            response.raise_for_status()
+            payload = await response.json()
+        return FakeGeminiResponse(payload['text'], payload.get('usage'))
+
+    @staticmethod
+    async def _iter_chunks_async(response):
+        async with response:
+            async for line in response.content:
+                if line.strip():
+                    payload = json.loads(line)
+                    yield FakeGeminiResponse(payload['text'], payload.get('usage'))
+
+    async def close(self):
+        """Closes the running loop's session (call before the loop shuts down)."""
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
@@ -0,0 +1,371 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline benchmark for the blog pipeline.
+
+Starts local stand-ins for every external service (benchmarks/fake_services.py),
+runs run_blog_agent and run_batch under each load profile and writes p50/p95/p99
+per stage, end-to-end latency and batch throughput as JSON.
+
+    python -m benchmarks.run_benchmarks [--profiles fast,realistic] [--runs 5]
+        [--batch-size 20] [--batch-concurrency 8] [--output results.json]
+        [--baseline previous.json --max-regression 0.2] [--compare-modes] [--compare-routing]
+        [--deadline SECONDS] [--compare-hedging] [--compare-breakers]
+
+With --compare-modes, single-post runs are repeated in every generation mode
+(main.GENERATION_MODES) and their latency, Gemini calls and prompt/response
+tokens per post are reported side by side under 'generation_modes'.
+
+With --compare-routing, the single-post and batch runs are repeated with the
+cheap stages (ROUTED_STAGES) sent to a faster, cheaper fake model; latency,
+throughput and per-model calls/latency/cost are reported under 'model_routing'.
+
+With --deadline, every post gets that time budget (main.run_blog_agent's
+deadline_seconds); posts that had to leave parts out are counted as 'degraded'.
+
+With --compare-hedging, the single-post and batch runs are repeated with
+hedged section requests turned off, so the tail latency (p95/p99) with and
+without hedging is reported side by side under 'hedging'.
+
+With --compare-breakers, the runs are repeated with the per-provider circuit
+breakers unable to open; latency and throughput are reported under
+'circuit_breakers'. Use it with the 'outage' profile (NewsData and Quotable
+down).
+
+Exits with status 1 if --baseline is given and any profile's end-to-end p95
+or batch throughput is more than --max-regression worse than the baseline.
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import datetime
+import tempfile
+from pathlib import Path
+
+# Generous quotas so the shared rate limiter doesn't dominate the measurement.
+# Must be set before the project modules are imported (they read them at import).
+for _provider in ('GEMINI', 'NEWSDATA', 'DATAMUSE', 'QUOTABLE'):
+    os.environ.setdefault(f"{_provider}_RATE_LIMIT_RPM", "1000000")
+    os.environ.setdefault(f"{_provider}_RATE_LIMIT_BURST", "1000")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+os.environ.setdefault("NEWSDATA_API_KEY", "benchmark-key")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+
+import main
+import utils.api_clients as api_clients
+from utils.rate_limiter import RateLimitedGeminiModel
+from utils.model_routing import ModelRouter, MODEL_PRICES
+from utils.hedging import reset_hedgers, hedging_stats
+from utils.circuit_breaker import reset_circuit_breakers, circuit_breaker_stats
+from agents.writing_agent import DEFAULT_MAX_CONCURRENCY
+from benchmarks.fake_services import FakeServices, FakeGeminiModel
+
+# The fake models are priced like the real models they stand in for
+MODEL_PRICES.setdefault('fake-gemini', MODEL_PRICES['gemini-2.0-flash'])
+MODEL_PRICES.setdefault('fake-gemini-lite', MODEL_PRICES['gemini-2.0-flash-lite'])
+# Short structural stages moved to the lite model by --compare-routing
+ROUTED_STAGES = ('analysis', 'seo')
+
+console = Console()
+
+# Latencies are seconds per request; see DEFAULT_SERVICE_CONFIG for the fields.
+PROFILES = {
+    'fast': {
+        'gemini': {'latency': 0.02},
+        'newsdata': {'latency': 0.02},
+        'datamuse': {'latency': 0.01},
+        'quotable': {'latency': 0.01},
+    },
+    'realistic': {
+        'gemini': {'latency': 1.2, 'jitter': 0.4, 'size': 250, 'seconds_per_word': 0.005},
+        'newsdata': {'latency': 0.6, 'jitter': 0.2, 'size': 3},
+        'datamuse': {'latency': 0.15, 'jitter': 0.05},
+        'quotable': {'latency': 0.2, 'jitter': 0.05, 'size': 2},
+    },
+    'flaky': {
+        'gemini': {'latency': 1.2, 'jitter': 0.4, 'size': 250, 'seconds_per_word': 0.005, 'error_rate': 0.1},
+        'newsdata': {'latency': 0.6, 'jitter': 0.2, 'size': 3, 'error_rate': 0.2},
+        'datamuse': {'latency': 0.15, 'jitter': 0.05, 'error_rate': 0.1},
+        'quotable': {'latency': 0.2, 'jitter': 0.05, 'size': 2, 'error_rate': 0.3},
+    },
+    # NewsData and Quotable down (503 on every request)
+    'outage': {
+        'gemini': {'latency': 1.2, 'jitter': 0.4, 'size': 250, 'seconds_per_word': 0.005},
+        'newsdata': {'latency': 0.6, 'unavailable': True},
+        'datamuse': {'latency': 0.15, 'jitter': 0.05},
+        'quotable': {'latency': 0.2, 'unavailable': True},
+    },
+    'slow-tail': {
+        'gemini': {'latency': 1.0, 'jitter': 0.3, 'size': 250, 'seconds_per_word': 0.005, 'tail_probability': 0.05, 'tail_multiplier': 8},
+        'newsdata': {'latency': 0.6, 'jitter': 0.2, 'size': 3, 'tail_probability': 0.1, 'tail_multiplier': 5},
+        'datamuse': {'latency': 0.15},
+        'quotable': {'latency': 0.2, 'size': 2},
+    },
+}
+
+
+def percentiles(values: list) -> dict:
+    """Nearest-rank p50/p95/p99 plus mean, rounded to milliseconds."""
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None, 'count': 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 3)
+
+    return {'p50': rank(50), 'p95': rank(95), 'p99': rank(99), 'mean': round(sum(ordered) / len(ordered), 3), 'count': len(ordered)}
+
+
+def scale_profile(profile: dict, scale: float) -> dict:
+    return {service: {**cfg, 'latency': cfg.get('latency', 0.05) * scale, 'jitter': cfg.get('jitter', 0.0) * scale,
+                      'seconds_per_word': cfg.get('seconds_per_word', 0.0) * scale}
+            for service, cfg in profile.items()}
+
+
+def point_clients_at(services: FakeServices):
+    api_clients.NEWSDATA_BASE_URL = f"{services.base_url}/newsdata"
+    api_clients.DATAMUSE_BASE_URL = f"{services.base_url}/datamuse"
+    api_clients.QUOTABLE_BASE_URL = f"{services.base_url}/quotable"
+    # Fresh keyword cache so every run hits the (fake) network
+    api_clients._datamuse_async_cache.clear()
+
+
+async def benchmark_single(gemini_client, runs: int, output_dir: str, max_concurrency: int, generation_mode: str = 'multi', deadline_seconds: float = None) -> dict:
+    stage_durations = {}
+    end_to_end = []
+    failures = 0
+    degraded = 0
+    llm_totals = {'calls': 0, 'prompt_tokens': 0, 'response_tokens': 0}
+    model_totals = {}
+
+    def record(stage, status, info):
+        if status == 'completed':
+            stage_durations.setdefault(stage, []).append(info)
+
+    for i in range(runs):
+        api_clients._datamuse_async_cache.clear()
+        start = time.perf_counter()
+        markdown_content, metadata = await main.run_blog_agent(
+            f"Benchmark topic {i}", "informative", output_dir, run_mode='batch',
+            max_concurrency=max_concurrency, use_cache=False,
+            progress_callback=record, gemini_client=gemini_client, reuse_similar=False,
+            generation_mode=generation_mode, deadline_seconds=deadline_seconds
+        )
+        end_to_end.append(time.perf_counter() - start)
+        if not (markdown_content and metadata):
+            failures += 1
+            continue
+        degraded += bool(metadata.get('degraded'))
+        llm = metadata.get('timings', {}).get('llm', {})
+        for key in llm_totals:
+            llm_totals[key] += llm.get(key, 0)
+        for model_name, usage in metadata['timings'].get('models', {}).items():
+            totals = model_totals.setdefault(model_name, {'calls': 0, 'total_seconds': 0.0, 'cost_usd': 0.0})
+            totals['calls'] += usage['calls']
+            totals['total_seconds'] += usage['total_seconds']
+            totals['cost_usd'] += usage['cost_usd'] or 0.0
+
+    posts = max(1, runs - failures)
+    return {
+        'runs': runs,
+        'failures': failures,
+        'degraded': degraded,
+        'end_to_end': percentiles(end_to_end),
+        'stages': {stage: percentiles(values) for stage, values in stage_durations.items()},
+        'llm_per_post': {key: round(total / posts, 1) for key, total in llm_totals.items()},
+        'models': {
+            model_name: {
+                'calls_per_post': round(totals['calls'] / posts, 1),
+                'mean_seconds': round(totals['total_seconds'] / max(1, totals['calls']), 3),
+                'cost_per_post_usd': round(totals['cost_usd'] / posts, 6),
+            }
+            for model_name, totals in model_totals.items()
+        },
+    }
+
+
+async def benchmark_batch(gemini_client, size: int, concurrency: int, output_dir: str, max_concurrency: int, deadline_seconds: float = None) -> dict:
+    topics = [{'topic': f"Batch topic {i}", 'tone': "informative"} for i in range(size)]
+    start = time.perf_counter()
+    results, summary_file = await main.run_batch(
+        topics, output_dir, concurrency=concurrency, max_concurrency=max_concurrency,
+        use_cache=False, gemini_client=gemini_client, reuse_similar=False, deadline_seconds=deadline_seconds
+    )
+    wall_time = time.perf_counter() - start
+    succeeded = sum(1 for r in results if r['status'] == 'success')
+    return {
+        'posts': size,
+        'concurrency': concurrency,
+        'succeeded': succeeded,
+        'failed': size - succeeded,
+        'wall_time_seconds': round(wall_time, 3),
+        'throughput_posts_per_minute': round(succeeded / wall_time * 60, 2) if wall_time else None,
+        'latency': percentiles([r['latency_seconds'] for r in results]),
+    }
+
+
+async def run_profile(name: str, profile: dict, args) -> dict:
+    with FakeServices(profile) as services, tempfile.TemporaryDirectory() as output_dir:
+        point_clients_at(services)
+        gemini_client = RateLimitedGeminiModel(FakeGeminiModel(services.base_url))
+        lite_client = RateLimitedGeminiModel(FakeGeminiModel(services.base_url, model_name="models/fake-gemini-lite"))
+        reset_hedgers() # Latencies seen under another profile would skew the hedge delay
+        reset_circuit_breakers()
+        try:
+            single = await benchmark_single(gemini_client, args.runs, output_dir, args.max_concurrency, deadline_seconds=args.deadline)
+            batch = await benchmark_batch(gemini_client, args.batch_size, args.batch_concurrency, output_dir, args.max_concurrency, deadline_seconds=args.deadline)
+            hedging = None
+            if args.compare_hedging:
+                hedging = {'hedged': hedging_stats()}
+                reset_hedgers(percentile=0)
+                hedging['unhedged'] = {
+                    'single': await benchmark_single(gemini_client, args.runs, output_dir, args.max_concurrency, deadline_seconds=args.deadline),
+                    'batch': await benchmark_batch(gemini_client, args.batch_size, args.batch_concurrency, output_dir, args.max_concurrency, deadline_seconds=args.deadline),
+                }
+                reset_hedgers()
+            breakers = None
+            if args.compare_breakers:
+                breakers = {'circuits': circuit_breaker_stats()}
+                reset_circuit_breakers(failure_threshold=10 ** 9) # Never opens
+                breakers['without_breakers'] = {
+                    'single': await benchmark_single(gemini_client, args.runs, output_dir, args.max_concurrency, deadline_seconds=args.deadline),
+                    'batch': await benchmark_batch(gemini_client, args.batch_size, args.batch_concurrency, output_dir, args.max_concurrency, deadline_seconds=args.deadline),
+                }
+                reset_circuit_breakers()
+            modes = {}
+            if args.compare_modes:
+                for mode in main.GENERATION_MODES:
+                    # Same single-post workload in every mode; 'multi' is re-measured so the rows are comparable
+                    modes[mode] = await benchmark_single(gemini_client, args.runs, output_dir, args.max_concurrency, generation_mode=mode)
+            routing = None
+            if args.compare_routing:
+                router = ModelRouter(gemini_client, {stage: lite_client for stage in ROUTED_STAGES})
+                routing = {
+                    'routed_stages': {stage: lite_client.model_name for stage in ROUTED_STAGES},
+                    'single': await benchmark_single(router, args.runs, output_dir, args.max_concurrency),
+                    'batch': await benchmark_batch(router, args.batch_size, args.batch_concurrency, output_dir, args.max_concurrency),
+                }
+        finally:
+            await gemini_client.close()
+            await lite_client.close()
+            await api_clients.close_http_session()
+        result = {'config': services.config, 'requests': dict(services.requests), 'single': single, 'batch': batch}
+        if modes:
+            result['generation_modes'] = modes
+        if routing:
+            result['model_routing'] = routing
+        if hedging:
+            result['hedging'] = hedging
+        if breakers:
+            result['circuit_breakers'] = breakers
+        return result
+
+
+def compare_to_baseline(report: dict, baseline: dict, max_regression: float) -> list:
+    """Returns human-readable regressions of end-to-end p95 and batch throughput."""
+    regressions = []
+    for name, result in report['profiles'].items():
+        previous = baseline.get('profiles', {}).get(name)
+        if not previous:
+            continue
+        old_p95, new_p95 = previous['single']['end_to_end']['p95'], result['single']['end_to_end']['p95']
+        if old_p95 and new_p95 and new_p95 > old_p95 * (1 + max_regression):
+            regressions.append(f"{name}: end-to-end p95 {old_p95}s -> {new_p95}s")
+        old_tp, new_tp = previous['batch']['throughput_posts_per_minute'], result['batch']['throughput_posts_per_minute']
+        if old_tp and new_tp is not None and new_tp < old_tp * (1 - max_regression):
+            regressions.append(f"{name}: batch throughput {old_tp} -> {new_tp} posts/min")
+    return regressions
+
+
+def silence_agent_output():
+    """Mutes the per-module rich consoles so the benchmark prints only its own summary."""
+    for module in list(sys.modules.values()):
+        module_console = getattr(module, 'console', None)
+        if isinstance(module_console, Console) and module_console is not console:
+            module_console.quiet = True
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the blog pipeline against local fake services.")
+    parser.add_argument("--profiles", type=str, default="fast,realistic,flaky,slow-tail", help=f"Comma-separated profiles ({', '.join(PROFILES)}).")
+    parser.add_argument("--runs", type=int, default=5, help="Sequential single-post runs per profile.")
+    parser.add_argument("--batch-size", type=int, default=20, help="Posts per batch run.")
+    parser.add_argument("--batch-concurrency", type=int, default=8, help="Pipelines in flight during the batch run.")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Section concurrency inside each post.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every simulated latency (e.g. 0.1 for a quick smoke run).")
+    parser.add_argument("--output", type=str, default=None, help="Where to write the JSON report (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--baseline", type=str, default=None, help="Previous JSON report to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown vs. the baseline (0.2 = 20%%).")
+    parser.add_argument("--compare-modes", action="store_true", help="Also run the single-post benchmark in every generation mode (multi-call vs. one structured request).")
+    parser.add_argument("--compare-routing", action="store_true", help=f"Also run with {', '.join(ROUTED_STAGES)} routed to a faster, cheaper model and report the throughput and cost difference.")
+    parser.add_argument("--deadline", type=float, default=None, help="Time budget per post, in (scaled) seconds; over-budget stages degrade instead of delaying the post.")
+    parser.add_argument("--compare-hedging", action="store_true", help="Also run with hedged section requests turned off and report the tail latency difference. Use --runs 20+ for a meaningful p99.")
+    parser.add_argument("--compare-breakers", action="store_true", help="Also run with the circuit breakers unable to open (most telling with --profiles outage).")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agents' console output.")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        silence_agent_output()
+
+    report = {
+        'generated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'verbose')},
+        'profiles': {},
+    }
+    for name in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        if name not in PROFILES:
+            parser.error(f"Unknown profile '{name}'")
+        console.print(f"[cyan]Running profile '{name}'...[/cyan]")
+        result = asyncio.run(run_profile(name, scale_profile(PROFILES[name], args.scale), args))
+        report['profiles'][name] = result
+        e2e, batch = result['single']['end_to_end'], result['batch']
+        console.print(f"  end-to-end p50/p95/p99: {e2e['p50']}/{e2e['p95']}/{e2e['p99']}s | "
+                      f"batch: {batch['throughput_posts_per_minute']} posts/min ({batch['failed']} failed)"
+                      + (f" | {result['single']['degraded']}/{result['single']['runs']} posts degraded" if args.deadline else ""))
+        if 'hedging' in result:
+            for label, stats in (('unhedged', result['hedging']['unhedged']), ('hedged', result)):
+                single_e2e, batch_latency = stats['single']['end_to_end'], stats['batch']['latency']
+                console.print(f"  {label:>8}: single p95/p99 {single_e2e['p95']}/{single_e2e['p99']}s | "
+                              f"batch p95/p99 {batch_latency['p95']}/{batch_latency['p99']}s, {stats['batch']['throughput_posts_per_minute']} posts/min")
+            for key, stats in result['hedging']['hedged'].items():
+                console.print(f"  {key}: {stats['hedges']} hedges for {stats['requests']} requests, {stats['hedge_wins']} won")
+        if 'circuit_breakers' in result:
+            for label, stats in (('without breakers', result['circuit_breakers']['without_breakers']), ('with breakers', result)):
+                console.print(f"  {label:>16}: single p50/p95 {stats['single']['end_to_end']['p50']}/{stats['single']['end_to_end']['p95']}s | "
+                              f"batch {stats['batch']['throughput_posts_per_minute']} posts/min")
+            for provider, stats in result['circuit_breakers']['circuits'].items():
+                console.print(f"  {provider} circuit: {stats['state']}, opened {stats['opened']}x, {stats['short_circuited']} calls short-circuited")
+        for mode, stats in result.get('generation_modes', {}).items():
+            llm = stats['llm_per_post']
+            console.print(f"  {mode:>6}: p50 {stats['end_to_end']['p50']}s | {llm['calls']} Gemini calls, "
+                          f"{llm['prompt_tokens']} prompt + {llm['response_tokens']} response tokens per post")
+        if 'model_routing' in result:
+            for label, stats in (('one model', result), ('routed', result['model_routing'])):
+                cost = sum(usage['cost_per_post_usd'] for usage in stats['single']['models'].values())
+                console.print(f"  {label:>9}: p50 {stats['single']['end_to_end']['p50']}s | batch {stats['batch']['throughput_posts_per_minute']} posts/min | "
+                              f"${cost:.6f}/post | " + ", ".join(f"{model_name} mean {usage['mean_seconds']}s" for model_name, usage in stats['single']['models'].items()))
+
+    output = Path(args.output or Path(__file__).parent / "results" / f"benchmark_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    console.print(f"[green]Report written to {output}[/green]")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_to_baseline(report, json.load(f), args.max_regression)
+        if regressions:
+            for line in regressions:
+                console.print(f"[bold red]Regression: {line}[/bold red]")
+            sys.exit(1)
+        console.print("[green]No regressions against baseline.[/green]")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -2,26 +2,338 @@
 import argparse
 import os
 import asyncio
-from dotenv import load_dotenv
+import time
+import json
+import sqlite3
+import datetime
 from rich.console import Console
 from rich.panel import Panel
-import streamlit as st 
 
 # Import agent functions
-from agents.understanding_agent import analyze_topic
+from agents.understanding_agent import analyze_topic_async, fallback_analysis
 from agents.research_agent import gather_research
-from agents.writing_agent import generate_blog_post
-from agents.seo_agent import generate_seo_metadata
+from agents.writing_agent import generate_blog_post_async, generate_introduction_async, has_error_placeholder, section_part_name, ERROR_PLACEHOLDER, DEFAULT_MAX_CONCURRENCY
+from agents.seo_agent import generate_seo_metadata_async, generate_title_and_description_async
 from agents.export_agent import export_results
+from agents.whole_post_agent import generate_whole_post_async, draft_analysis, draft_title_and_description, draft_markdown
 
 # Import utility functions
-from utils.api_clients import get_gemini_client
+from utils.api_clients import get_model_router, close_http_session
+from utils.config import get_secret, show_streamlit_error
+from utils.batch import load_batch_topics, write_batch_summary
+from utils.pipeline import StageGraph, StageError
+from utils.tracing import trace, current_trace, configure_metrics_export
+from utils.coalesce import get_request_coalescer, request_key
+from utils.checkpoint import RunCheckpoint
+from utils.tag_index import get_tag_index
+from utils.near_duplicates import get_near_duplicate_index
+from utils.catalog import get_catalog
+from utils.export_sinks import open_export_sink, EXPORT_FORMATS
+from utils.streaming import PostStream, FileWriter, ConsoleWriter, partial_markdown_path
+from utils.model_routing import ModelRouter, MODEL_STAGES, parse_stage_models
+from utils.deadline import RunDeadline
 
 # Initialize Rich Console (for CLI mode)
 console = Console()
 
-# MODIFIED FUNCTION SIGNATURE AND LOGIC
-async def run_blog_agent(topic: str, tone: str, output_dir: str, run_mode: str = 'cli'):
+# 'multi': one Gemini call for the outline, one per part of the post and one for the title (parts run in parallel).
+# 'single': the whole post, title and meta description in one structured (JSON-schema) response.
+GENERATION_MODES = ('multi', 'single')
+
+def build_blog_pipeline(topic: str, tone: str, output_dir: str, newsdata_api_key: str, gemini_client, print_cli=console.print, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, checkpoint: RunCheckpoint = None, export_sink=None, generation_mode: str = 'multi', make_stream=None, deadline: RunDeadline = None) -> StageGraph:
+    """
+    Builds the stage graph for one blog post. Call .describe() on the result to inspect it.
+
+        analysis ──┬──> intro ──> seo_title ─────┐
+                   │      │                      v
+        research ──┴──────┴──> content ──────> seo ──> export
+
+    With a checkpoint, stages whose output was saved by an earlier attempt are
+    restored instead of re-run, and content reuses every saved section.
+    export_sink (utils.export_sinks) replaces the default per-post directory.
+    make_stream(part_count) -> utils.streaming.PostStream turns on streaming:
+    the introduction and every section are passed to the stream as they are
+    written (in single-request mode, the whole post once the draft arrives).
+    gemini_client may be a utils.model_routing.ModelRouter to give each stage
+    its own model; a plain client is used for every stage.
+    With a deadline (utils.deadline.RunDeadline), a stage that runs past its
+    share of the budget degrades instead of holding up the post: analysis falls
+    back to generic subtopics, research to none, the intro and unfinished
+    sections to placeholders and the SEO title to the default metadata. What
+    was degraded is listed under metadata['degraded'].
+
+    generation_mode='single' replaces the Gemini stages with one structured
+    request; the same result names and shapes are produced from its draft:
+
+        research ──> draft ──┬──> analysis
+                             ├──> content ──┐
+                             └──> seo_title ┴──> seo ──> export
+    """
+    router = gemini_client if isinstance(gemini_client, ModelRouter) else ModelRouter(gemini_client)
+    degraded = [] # Stages and parts that ran out of time
+
+    def budgeted(stage_name, stage_func, fallback=None):
+        if deadline is None:
+            return stage_func
+        async def run(results):
+            try:
+                return await asyncio.wait_for(stage_func(results), deadline.stage_timeout(stage_name))
+            except asyncio.TimeoutError:
+                if fallback is None:
+                    raise StageError(f"'{stage_name}' ran out of its time budget.")
+                print_cli(f"[yellow]   - '{stage_name}' ran out of its time budget; using the fallback.[/yellow]")
+                degraded.append(stage_name)
+                return fallback(results)
+        return run
+
+    def checkpointed(stage_name, stage_func, is_complete=bool):
+        if checkpoint is None:
+            return stage_func
+        async def run(results):
+            saved = checkpoint.load(stage_name)
+            if saved is not None:
+                print_cli(f"   - Restored '{stage_name}' from checkpoint")
+                return saved
+            value = await stage_func(results)
+            if is_complete(value): # Degraded outputs are redone on resume
+                checkpoint.save(stage_name, value)
+            return value
+        return run
+
+    # Agents await Gemini without blocking, so other stages and pipelines sharing
+    # this event loop keep making progress; only file/SQLite work uses threads.
+    async def analysis_stage(results):
+        print_cli("[cyan]Step 1: Analyzing Topic...[/cyan]")
+        analysis = await analyze_topic_async(topic, tone, router.for_stage('analysis'))
+        if not analysis or not analysis.get('subtopics'):
+            raise StageError("Failed to analyze topic or get subtopics.")
+        print_cli(f"   - Confirmed Tone: [italic yellow]{analysis['tone']}[/italic yellow]")
+        print_cli(f"   - Identified Subtopics: {analysis['subtopics']}")
+        return analysis
+
+    async def research_stage(results):
+        print_cli("[cyan]Step 2: Conducting Research...[/cyan]")
+        # Ensure newsdata_api_key is not None before passing
+        if not newsdata_api_key:
+            raise StageError("Newsdata API Key is missing, cannot conduct research.")
+        # Research only needs the topic, so it doesn't wait for the subtopics
+        return await gather_research(topic, [], newsdata_api_key)
+
+    post_stream = None
+    def get_stream(part_count):
+        nonlocal post_stream
+        if post_stream is None and make_stream is not None:
+            post_stream = make_stream(part_count)
+        return post_stream
+
+    async def intro_stage(results):
+        stream = get_stream(len(results['analysis']['subtopics']) + 2) # Introduction, sections, conclusion
+        on_text = (lambda text: stream.append(0, text)) if stream else None
+        return await generate_introduction_async(topic, results['analysis']['tone'], router.for_stage('intro'), on_text)
+
+    async def seo_title_stage(results):
+        # The intro is what the SEO prompt previews, so it doesn't need the full post
+        return await generate_title_and_description_async(topic, "\n".join(results['intro']), router.for_stage('seo'))
+
+    async def content_stage(results):
+        print_cli("[cyan]Step 3: Generating Content...[/cyan]")
+        analysis = results['analysis']
+        timed_out = []
+        markdown_content = await generate_blog_post_async(
+            topic, analysis['subtopics'], analysis['tone'], results['research'], router.for_stage('sections'),
+            max_concurrency=max_concurrency, intro_parts=results['intro'], checkpoint=checkpoint, intro_client=router.for_stage('intro'),
+            stream=get_stream(len(analysis['subtopics']) + 2),
+            time_budget=deadline.stage_timeout('content') if deadline else None, on_timeout=timed_out.append
+        )
+        if len(timed_out) == len(analysis['subtopics']) + 1: # Every section and the conclusion
+            raise StageError("Ran out of time before any section was written.")
+        degraded.extend(timed_out)
+        if not markdown_content or len(markdown_content) < 100: # Basic check
+            raise StageError("Content generation failed or produced very short output.")
+        return markdown_content
+
+    async def seo_stage(results):
+        print_cli("[cyan]Step 4: Optimizing SEO...[/cyan]")
+        metadata = await generate_seo_metadata_async(
+            topic, results['content'], results['research'], router.for_stage('seo'),
+            title_and_description=results['seo_title'], output_dir=output_dir
+        )
+        if not metadata or not metadata.get('slug'):
+            raise StageError("Failed to generate SEO metadata or slug.")
+        metadata['generation_mode'] = 'single' if 'draft' in results else 'multi'
+        metadata['models'] = router.describe()
+        if degraded:
+            metadata['degraded'] = list(degraded)
+        print_cli(f"   - Generated Title: [bold green]'{metadata['title']}'[/bold green]")
+        return metadata
+
+    async def export_stage(results):
+        print_cli("[cyan]Step 5: Exporting Results...[/cyan]")
+        metadata = results['seo']
+        # Timing summary of everything up to export (stages, Gemini calls, retries, cache hits, tokens)
+        run_trace = current_trace()
+        if run_trace:
+            metadata['timings'] = run_trace.summary()
+        return await asyncio.to_thread(export_and_index, results['content'], metadata)
+
+    def export_and_index(markdown_content, metadata):
+        # Claim a slug no other topic is using, so a clashing title can't overwrite another post
+        catalog = get_catalog(output_dir)
+        try:
+            metadata['slug'] = catalog.allocate_slug(metadata['slug'], topic, tone)
+        except sqlite3.Error as e:
+            catalog = None
+            print_cli(f"[yellow]Warning: post catalog unavailable, exporting without collision check: {e}[/yellow]")
+        metadata['topic'], metadata['tone'] = topic, tone
+        # Note existing posts with near-identical content, then make this post findable for later requests
+        near_duplicates = get_near_duplicate_index(output_dir)
+        try:
+            similar_posts = near_duplicates.find_similar_content(markdown_content, exclude_slug=metadata['slug'])
+            if similar_posts:
+                metadata['similar_posts'] = similar_posts[:5]
+        except sqlite3.Error as e:
+            print_cli(f"[yellow]Warning: near-duplicate lookup failed: {e}[/yellow]")
+        md_path, json_path = export_results(markdown_content, metadata, output_dir, metadata['slug'], sink=export_sink)
+        # Reuse reads the exported files back, so only file-backed sinks are indexed for it.
+        # Posts with failed or timed-out parts aren't offered for reuse either.
+        reusable = not metadata.get('degraded') and not has_error_placeholder([markdown_content])
+        if md_path and json_path and reusable and (export_sink is None or export_sink.writes_files):
+            try:
+                near_duplicates.add_post(metadata['slug'], topic, tone, markdown_content, md_path, json_path)
+            except sqlite3.Error as e:
+                print_cli(f"[yellow]Warning: could not index post for near-duplicate reuse: {e}[/yellow]")
+        if catalog is not None:
+            # The catalog serves posts by reading md_path back from disk (and rebuilds
+            # from */metadata.json), so jsonl/sqlite/archive exports only release the slug.
+            try:
+                if md_path and json_path and (export_sink is None or export_sink.writes_files):
+                    catalog.record_post(metadata['slug'], topic, tone, metadata, md_path, json_path)
+                else:
+                    catalog.release_slug(metadata['slug'])
+            except sqlite3.Error as e:
+                print_cli(f"[yellow]Warning: could not update the post catalog: {e}[/yellow]")
+        return md_path, json_path
+
+    # --- Single-request mode: the stages below are local reshapes of one draft ---
+    async def draft_stage(results):
+        print_cli("[cyan]Step 2: Writing the whole post in one request...[/cyan]")
+        try:
+            return await generate_whole_post_async(topic, tone, results['research'], router.for_stage('sections'))
+        except Exception as e:
+            raise StageError(f"Single-request generation failed: {e}")
+
+    async def draft_analysis_stage(results):
+        analysis = draft_analysis(results['draft'], tone)
+        print_cli(f"   - Confirmed Tone: [italic yellow]{analysis['tone']}[/italic yellow]")
+        print_cli(f"   - Sections: {analysis['subtopics']}")
+        return analysis
+
+    async def draft_content_stage(results):
+        markdown_content = draft_markdown(results['draft'])
+        stream = get_stream(1)
+        if stream:
+            stream.finish(0, markdown_content)
+        return markdown_content
+
+    async def draft_seo_title_stage(results):
+        return draft_title_and_description(results['draft'])
+
+    research_is_complete = lambda research: any(research.values())
+    no_research = lambda results: {'news': [], 'keywords': [], 'quotes': []}
+    graph = StageGraph()
+    if generation_mode == 'single':
+        graph.add_stage('research', budgeted('research', checkpointed('research', research_stage, is_complete=research_is_complete), no_research))
+        graph.add_stage('draft', budgeted('draft', checkpointed('draft', draft_stage)), deps=('research',))
+        graph.add_stage('analysis', draft_analysis_stage, deps=('draft',))
+        graph.add_stage('seo_title', draft_seo_title_stage, deps=('draft',))
+        graph.add_stage('content', draft_content_stage, deps=('draft',))
+    else:
+        graph.add_stage('analysis', budgeted('analysis', checkpointed('analysis', analysis_stage), lambda results: fallback_analysis(topic, tone)))
+        graph.add_stage('research', budgeted('research', checkpointed('research', research_stage, is_complete=research_is_complete), no_research))
+        graph.add_stage('intro', budgeted(
+            'intro', checkpointed('intro', intro_stage, is_complete=lambda parts: not has_error_placeholder(parts)),
+            lambda results: [f"{ERROR_PLACEHOLDER} introduction: timed out]*"]
+        ), deps=('analysis',))
+        graph.add_stage('seo_title', budgeted(
+            'seo_title', checkpointed('seo_title', seo_title_stage, is_complete=lambda generated: 'title' in generated and 'meta_description' in generated),
+            lambda results: {} # Default title and description
+        ), deps=('intro',))
+        graph.add_stage('content', content_stage, deps=('analysis', 'research', 'intro'))
+    # SEO metadata is not checkpointed: with seo_title restored it is computed
+    # locally from the final content, so it always matches the assembled post
+    graph.add_stage('seo', seo_stage, deps=('content', 'seo_title'))
+    graph.add_stage('export', export_stage, deps=('seo',))
+    return graph
+
+def _stream_factory(output_dir: str, topic: str, tone: str, run_mode: str, progress_callback=None):
+    """
+    Returns (file_writer, make_stream) for a streaming run: the post is appended
+    to its partial Markdown file (and printed, in CLI mode) in document order,
+    and every piece of text is also reported as a progress event
+    ('content', 'text', {'part', 'text', 'replace'}) on the calling event loop.
+    """
+    loop = asyncio.get_running_loop()
+    file_writer = FileWriter(partial_markdown_path(output_dir, topic, tone))
+    writers = [file_writer] + ([ConsoleWriter(console)] if run_mode == 'cli' else [])
+
+    def report(payload):
+        try:
+            progress_callback('content', 'text', payload)
+        except Exception:
+            pass # Progress reporting must never break the pipeline
+
+    def on_part(index, text, replace):
+        if progress_callback:
+            loop.call_soon_threadsafe(report, {'part': index, 'text': text, 'replace': replace})
+
+    return file_writer, lambda part_count: PostStream(part_count, on_part, writers)
+
+
+def _prepare_section_regeneration(checkpoint: RunCheckpoint, section: str):
+    """Drops one saved section so a resumed run rewrites it; returns an error message or None."""
+    analysis = checkpoint.load('analysis') if checkpoint.exists() else None
+    if not analysis:
+        return f"No checkpointed run for this topic and tone in '{checkpoint.run_dir}'. Generate the post first."
+    match = next((s for s in analysis['subtopics'] if s.strip().lower() == section.strip().lower()), None)
+    if match is None:
+        return f"Section '{section}' not found. Sections: {', '.join(analysis['subtopics'])}"
+    checkpoint.discard_part(section_part_name(match))
+    return None
+
+
+def find_reusable_post(topic: str, tone: str, output_dir: str):
+    """
+    Looks for an exported post on a near-identical topic in the same tone.
+
+    Returns (markdown_content, metadata) with metadata['reused_from'] describing
+    the match, or None. Matches whose files have gone missing are dropped from
+    the index; degraded posts (or ones with error placeholders) are skipped.
+    """
+    try:
+        index = get_near_duplicate_index(output_dir)
+        matches = index.find_similar_topic(topic)
+    except sqlite3.Error as e:
+        console.print(f"[yellow]Warning: near-duplicate lookup failed: {e}[/yellow]")
+        return None
+    for match in matches:
+        if (match['tone'] or "").strip().lower() != tone.strip().lower():
+            continue
+        try:
+            with open(match['md_path'], 'r', encoding='utf-8') as f:
+                markdown_content = f.read()
+            with open(match['json_path'], 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, TypeError, json.JSONDecodeError):
+            index.remove_post(match['slug'])
+            continue
+        if metadata.get('degraded') or has_error_placeholder([markdown_content]):
+            continue
+        metadata['reused_from'] = {'slug': match['slug'], 'topic': match['topic'], 'similarity': match['similarity']}
+        return markdown_content, metadata
+    return None
+
+
+async def run_blog_agent(topic: str, tone: str, output_dir: str, run_mode: str = 'cli', max_concurrency: int = DEFAULT_MAX_CONCURRENCY, use_cache: bool = True, progress_callback=None, gemini_client=None, resume: bool = False, regenerate_section: str = None, checkpoints: bool = True, reuse_similar: bool = True, export_sink=None, generation_mode: str = 'multi', stream: bool = False, stage_models: dict = None, deadline_seconds: float = None):
     """
     Main asynchronous function to run the blog writing agent workflow.
 
@@ -29,7 +341,24 @@ async def run_blog_agent(topic: str, tone: str, output_dir: str, run_mode: str =
         topic (str): The main topic for the blog post.
         tone (str): Desired writing tone.
         output_dir (str): Directory to save the generated files.
-        run_mode (str): 'cli' or 'streamlit'. Controls console output.
+        run_mode (str): 'cli', 'streamlit', 'batch' or 'service'. Controls console output.
+        max_concurrency (int): Max Gemini calls in flight while writing sections (1 = sequential).
+        use_cache (bool): Serve repeated Gemini prompts from the on-disk response cache.
+        progress_callback (callable): Optional fn(stage_name, status, info) called as stages start/finish.
+        gemini_client: Optional pre-built client or ModelRouter (e.g. a stand-in for benchmarks); skips get_model_router.
+        resume (bool): Reuse stage outputs and sections checkpointed by an earlier run of this topic/tone.
+        regenerate_section (str): Rewrite only this section (by subtopic) of a checkpointed post; implies resume.
+        checkpoints (bool): Save stage outputs under <output_dir>/.runs/ as the run progresses.
+        reuse_similar (bool): Return an already exported post on a near-identical topic (same tone) instead of generating.
+        export_sink: Optional utils.export_sinks sink (JSONL, SQLite, archive) used instead of <output_dir>/<slug>/.
+        generation_mode (str): 'multi' (one Gemini call per part) or 'single' (one structured call for the whole
+            post, falling back to 'multi' if the response can't be used). See GENERATION_MODES.
+        stream (bool): Stream the post as it is written: to <output_dir>/.runs/<key>/post.partial.md (removed once
+            exported), to the terminal in CLI mode, and to progress_callback as ('content', 'text', {...}) events.
+        stage_models (dict): Optional {stage: Gemini model} overrides (see utils.model_routing.MODEL_STAGES);
+            other stages use GEMINI_MODEL_<STAGE> or GEMINI_MODEL.
+        deadline_seconds (float): Optional time budget for generating the post. Stages that run past their share
+            of it fall back to defaults or placeholders (listed in metadata['degraded']) instead of delaying the post.
 
     Returns:
         tuple: (markdown_content, metadata) if successful, otherwise (None, None)
@@ -45,106 +374,112 @@ async def run_blog_agent(topic: str, tone: str, output_dir: str, run_mode: str =
 
     print_cli(Panel(f"🚀 Starting Blog Agent for Topic: '[bold cyan]{topic}[/bold cyan]' | Tone: '[italic yellow]{tone}[/italic yellow]' 🚀", title="Blog Agent Initializing", border_style="blue"))
 
-    # --- 0. Load Environment Variables & Initialize Clients ---
-    # Ensure dotenv is loaded (might be loaded by Streamlit app already, but safe to call again)
-    load_dotenv()
-    newsdata_api_key = None
-    gemini_api_key_present = False # Flag to check if Gemini key is potentially available
-
-    # Try Streamlit secrets first
-    try:
-        if hasattr(st, 'secrets'):
-            if "NEWSDATA_API_KEY" in st.secrets:
-                newsdata_api_key = st.secrets["NEWSDATA_API_KEY"]
-            if "GEMINI_API_KEY" in st.secrets:
-                gemini_api_key_present = bool(st.secrets["GEMINI_API_KEY"])
-    except Exception:
-        pass # Fail silently
-
-    # Fallback to environment variables (.env) if not found or not in streamlit context
-    if not newsdata_api_key or not gemini_api_key_present:
-        load_dotenv() # Load .env for local execution
-        if not newsdata_api_key:
-            newsdata_api_key = os.getenv("NEWSDATA_API_KEY")
-        if not gemini_api_key_present:
-             gemini_api_key_present = bool(os.getenv("GEMINI_API_KEY"))
+    # --- Reuse a post on a near-identical topic, if one was already generated ---
+    if reuse_similar and not resume and not regenerate_section:
+        reusable = await asyncio.to_thread(find_reusable_post, topic, tone, output_dir)
+        if reusable:
+            markdown_content, metadata = reusable
+            match = metadata['reused_from']
+            print_cli(Panel(
+                f"♻️  Reusing existing post '[bold magenta]{match['slug']}[/bold magenta]' for topic '[bold cyan]{match['topic']}[/bold cyan]' "
+                f"(similarity {match['similarity']}). Pass --no-reuse to generate a new one.",
+                title="Near-Duplicate Topic", border_style="green"
+            ))
+            return markdown_content, metadata
 
+    # --- 0. Load Environment Variables & Initialize Clients ---
+    # st.secrets first (only when running under Streamlit), then the environment / .env
+    newsdata_api_key = get_secret("NEWSDATA_API_KEY")
+    gemini_api_key_present = bool(get_secret("GEMINI_API_KEY")) # Flag to check if Gemini key is potentially available
 
     # Check if keys are *still* missing after trying both methods
     if not newsdata_api_key or not gemini_api_key_present:
         error_msg = "Error: API Keys (NEWSDATA_API_KEY or GEMINI_API_KEY) not found in Streamlit secrets or .env file."
         print_cli(f"[bold red]{error_msg}[/bold red]")
         if run_mode == 'streamlit':
-            st.error(error_msg) # Show error in Streamlit UI
+            show_streamlit_error(error_msg) # Show error in Streamlit UI
         return None, None # Return None if keys are missing
 
     # Now initialize Gemini client (it will perform its own key check using the updated logic)
-    gemini_client = get_gemini_client()
+    if gemini_client is None:
+        # A regenerated section must not be served the old text from the response cache
+        gemini_client = get_model_router(use_cache=use_cache and not regenerate_section, stage_models=stage_models)
     if not gemini_client:
          error_msg = "Error: Failed to initialize Gemini client. Check API Key source (secrets or .env) and validity."
          print_cli(f"[bold red]{error_msg}[/bold red]")
          if run_mode == 'streamlit':
-             st.error(error_msg)
+             show_streamlit_error(error_msg)
          return None, None
 
-    # --- 1. Understand the Topic ---
-    print_cli("[cyan]Step 1: Analyzing Topic...[/cyan]")
-    analysis = analyze_topic(topic, tone, gemini_client)
-    if not analysis or not analysis.get('subtopics'):
-         error_msg = "Error: Failed to analyze topic or get subtopics."
-         print_cli(f"[bold red]{error_msg}[/bold red]")
-         if run_mode == 'streamlit':
-             st.error(error_msg)
-         return None, None
-    subtopics = analysis['subtopics']
-    confirmed_tone = analysis['tone']
-    print_cli(f"   - Confirmed Tone: [italic yellow]{confirmed_tone}[/italic yellow]")
-    print_cli(f"   - Identified Subtopics: {subtopics}")
-
-    # --- 2. Conduct Research (Async) ---
-    print_cli("[cyan]Step 2: Conducting Research...[/cyan]")
-    # Ensure newsdata_api_key is not None before passing
-    if not newsdata_api_key:
-         st.error("Newsdata API Key is missing, cannot conduct research.")
-         return None, None
-    research_data = await gather_research(topic, subtopics, newsdata_api_key)
-    # Add basic check for research data if needed
-
-    # --- 3. Generate Content ---
-    print_cli("[cyan]Step 3: Generating Content...[/cyan]")
-    markdown_content = generate_blog_post(topic, subtopics, confirmed_tone, research_data, gemini_client)
-    if not markdown_content or len(markdown_content) < 100: # Basic check
-         error_msg = "Error: Content generation failed or produced very short output."
-         print_cli(f"[bold red]{error_msg}[/bold red]")
-         if run_mode == 'streamlit':
-             st.error(error_msg)
-         # Optionally return partial content if desired, otherwise fail
-         return None, None
-
-    # --- 4. SEO Optimization ---
-    print_cli("[cyan]Step 4: Optimizing SEO...[/cyan]")
-    metadata = generate_seo_metadata(topic, markdown_content, research_data, gemini_client)
-    if not metadata or not metadata.get('slug'):
-         error_msg = "Error: Failed to generate SEO metadata or slug."
-         print_cli(f"[bold red]{error_msg}[/bold red]")
-         if run_mode == 'streamlit':
-             st.error(error_msg)
-         return markdown_content, None # Return content even if metadata fails? Or fail completely?
-
-    print_cli(f"   - Generated Title: [bold green]'{metadata['title']}'[/bold green]")
-    # Add other metadata prints for CLI if desired
+    checkpoint = None
+    if checkpoints or resume or regenerate_section:
+        checkpoint = RunCheckpoint(output_dir, topic, tone)
+        if regenerate_section:
+            error_msg = _prepare_section_regeneration(checkpoint, regenerate_section)
+            if error_msg:
+                print_cli(f"[bold red]Error: {error_msg}[/bold red]")
+                if run_mode == 'streamlit':
+                    show_streamlit_error(error_msg)
+                return None, None
+        checkpoint.start(resume=resume or bool(regenerate_section))
 
-    # --- 5. Export and Summarize ---
-    print_cli("[cyan]Step 5: Exporting Results...[/cyan]")
-    md_path, json_path = export_results(markdown_content, metadata, output_dir, metadata['slug'])
+    # --- 1-5. Run the stage graph ---
+    # Each stage starts as soon as its inputs exist: research runs alongside
+    # topic analysis, and the SEO title is requested once the intro is written.
+    if regenerate_section:
+        generation_mode = 'multi' # Only the multi-call path writes (and checkpoints) sections separately
+    stream_file, make_stream = None, None
+    if stream:
+        stream_file, make_stream = _stream_factory(output_dir, topic, tone, run_mode, progress_callback)
+        print_cli(f"   - Streaming the post to [bold magenta]{stream_file.path}[/bold magenta]")
+    deadline = RunDeadline(deadline_seconds) if deadline_seconds else None
+    graph = build_blog_pipeline(topic, tone, output_dir, newsdata_api_key, gemini_client, print_cli, max_concurrency, checkpoint, export_sink, generation_mode, make_stream, deadline)
+    try:
+        with trace('blog_post', topic=topic, tone=tone, generation_mode=generation_mode):
+            try:
+                results = await graph.run(on_event=progress_callback)
+            except StageError as e:
+                if generation_mode != 'single' or 'draft' in graph.results:
+                    raise
+                # No usable structured response: write the post part by part instead (research is reused from the checkpoint)
+                print_cli(f"[yellow]{e} Falling back to the multi-call pipeline.[/yellow]")
+                graph = build_blog_pipeline(topic, tone, output_dir, newsdata_api_key, gemini_client, print_cli, max_concurrency, checkpoint, export_sink, 'multi', make_stream, deadline)
+                results = await graph.run(on_event=progress_callback)
+    except StageError as e:
+        error_msg = f"Error: {e}"
+        print_cli(f"[bold red]{error_msg}[/bold red]")
+        if checkpoint:
+            checkpoint.finish('failed')
+            print_cli("   - Completed stages are checkpointed; re-run with --resume to continue.")
+        if run_mode == 'streamlit':
+            show_streamlit_error(error_msg)
+        # Return content even if only the metadata step failed
+        return graph.results.get('content'), None
+    finally:
+        if stream_file:
+            # The partial file is only kept when the post didn't make it to the export
+            stream_file.close(remove=all(graph.results.get('export') or (None,)))
+    markdown_content = results['content']
+    metadata = results['seo']
+    md_path, json_path = results['export']
+    if checkpoint:
+        checkpoint.finish('complete' if md_path and json_path else 'failed')
+    stage_timings = ", ".join(f"{name}={timing['duration']}" for name, timing in graph.timings.items())
+    print_cli(f"   - Stage timings (s): {stage_timings}")
+    print_cli(f"   - Critical path: {' -> '.join(graph.critical_path())}")
+    for model_name, usage in metadata.get('timings', {}).get('models', {}).items():
+        cost = f", ${usage['cost_usd']:.4f}" if usage['cost_usd'] is not None else ""
+        print_cli(f"   - {model_name}: {usage['calls']} calls, mean {usage['mean_seconds']}s, {usage['prompt_tokens']}+{usage['response_tokens']} tokens{cost}")
 
     # --- Final Summary (CLI Mode Only) ---
     if run_mode == 'cli':
         if md_path and json_path:
+            file_backed = export_sink is None or export_sink.writes_files
+            output_location = os.path.dirname(os.path.abspath(md_path)) if file_backed else os.path.abspath(export_sink.path)
             summary_panel = Panel(
                 f"✅ Blog post generation complete!\n\n"
                 f"   - Topic: [bold cyan]{topic}[/bold cyan]\n"
-                f"   - Output Directory: [bold magenta]{os.path.abspath(output_dir)}/{metadata['slug']}[/bold magenta]\n"
+                f"   - Output: [bold magenta]{output_location}[/bold magenta]\n"
                 f"   - Markdown File: [bold magenta]{md_path}[/bold magenta]\n"
                 f"   - Metadata File: [bold magenta]{json_path}[/bold magenta]",
                 title="Execution Summary",
@@ -160,22 +495,197 @@ async def run_blog_agent(topic: str, tone: str, output_dir: str, run_mode: str =
     else:
          # Export failed, indicate this
          if run_mode == 'streamlit':
-              st.error("Content generated and metadata created, but failed to save files.")
+              show_streamlit_error("Content generated and metadata created, but failed to save files.")
          return markdown_content, metadata # Still return generated data? Or None, None? Let's return data for display.
 
 
+async def run_blog_agent_coalesced(topic: str, tone: str, output_dir: str, run_mode: str = 'cli', max_concurrency: int = DEFAULT_MAX_CONCURRENCY, use_cache: bool = True, progress_callback=None, gemini_client=None, resume: bool = False, reuse_similar: bool = True, export_sink=None, generation_mode: str = 'multi', stream: bool = False, stage_models: dict = None, deadline_seconds: float = None):
+    """
+    run_blog_agent behind the process-wide single-flight coalescer.
+
+    Identical topic+tone requests already running share that run (and its
+    progress events); recently finished ones are served from the shared result
+    LRU. Requests only match if every option that changes the result (mode,
+    streaming, models, deadline, reuse, resume, export target) is the same.
+    With use_cache=False a fresh run is forced, though concurrent identical
+    requests still share it. Same arguments and return value as run_blog_agent.
+    """
+    async def compute(shared_progress_callback):
+        return await run_blog_agent(
+            topic, tone, output_dir, run_mode=run_mode, max_concurrency=max_concurrency, use_cache=use_cache,
+            progress_callback=shared_progress_callback, gemini_client=gemini_client, resume=resume,
+            reuse_similar=reuse_similar, export_sink=export_sink, generation_mode=generation_mode, stream=stream,
+            stage_models=stage_models, deadline_seconds=deadline_seconds
+        )
+
+    return await get_request_coalescer().run(
+        request_key(
+            topic, tone, output_dir, generation_mode=generation_mode, stream=stream, stage_models=stage_models or None,
+            deadline_seconds=deadline_seconds, reuse_similar=reuse_similar, resume=resume,
+            export_path=export_sink.path if export_sink else None
+        ), compute, progress_callback=progress_callback,
+        # Degraded posts (cut short by a deadline) aren't kept for later callers, just as they aren't checkpointed or reused
+        use_cached=use_cache, is_success=lambda result: bool(result[0] and result[1]) and not result[1].get('degraded')
+    )
+
+
+async def run_batch(topics: list, output_dir: str, concurrency: int = 8, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, use_cache: bool = True, summary_path: str = None, gemini_client=None, resume: bool = False, reuse_similar: bool = True, export_sink=None, generation_mode: str = 'multi', stage_models: dict = None, deadline_seconds: float = None):
+    """
+    Runs many blog pipelines concurrently in one event loop.
+
+    Args:
+        topics (list): Rows of {'topic': str, 'tone': str}.
+        output_dir (str): Directory to save the generated files.
+        concurrency (int): Max pipelines running at the same time.
+        max_concurrency (int): Per-post section concurrency, passed to run_blog_agent.
+        use_cache (bool): Serve repeated Gemini prompts from the on-disk response cache.
+        summary_path (str): Where to write the run summary JSON (defaults to output_dir).
+        gemini_client: Optional pre-built client shared by every pipeline in the batch.
+        resume (bool): Continue each topic from its checkpoints (e.g. after an interrupted batch).
+        reuse_similar (bool): Serve topics near-identical to an already exported post from that post.
+        export_sink: Optional sink shared by every post (e.g. one JSONL file or archive for the whole batch).
+            The caller closes it once the batch is done.
+        generation_mode (str): 'multi' or 'single', as for run_blog_agent.
+        stage_models (dict): Optional {stage: Gemini model} overrides, as for run_blog_agent.
+        deadline_seconds (float): Optional per-post time budget, as for run_blog_agent.
+
+    Returns:
+        tuple: (results, summary_file) where results holds one entry per topic.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started_at = datetime.datetime.now()
+    batch_start = time.perf_counter()
+
+    # Rows that would share one coalesced run (every other option is batch-wide) are
+    # scheduled once, so duplicates don't each hold a slot waiting on the same flight.
+    groups = {}
+    for row in topics:
+        groups.setdefault(request_key(row['topic'], row['tone'], output_dir), []).append(row)
+
+    async def run_one(rows):
+        row = rows[0]
+        async with semaphore:
+            start = time.perf_counter()
+            outcome = {'status': 'failed', 'slug': None, 'error': None}
+            try:
+                markdown_content, metadata = await run_blog_agent_coalesced(
+                    row['topic'], row['tone'], output_dir, run_mode='batch',
+                    max_concurrency=max_concurrency, use_cache=use_cache, gemini_client=gemini_client, resume=resume,
+                    reuse_similar=reuse_similar, export_sink=export_sink, generation_mode=generation_mode, stage_models=stage_models,
+                    deadline_seconds=deadline_seconds
+                )
+                if markdown_content and metadata:
+                    outcome['status'] = 'success'
+                    outcome['slug'] = metadata.get('slug')
+                else:
+                    outcome['error'] = "Pipeline returned no content or metadata."
+            except Exception as e:
+                outcome['error'] = str(e)
+            outcome['latency_seconds'] = round(time.perf_counter() - start, 3)
+            duplicates = f", {len(rows) - 1} duplicate rows" if len(rows) > 1 else ""
+            console.print(f"[{'green' if outcome['status'] == 'success' else 'red'}]{outcome['status'].upper()}[/] {row['topic']} ({outcome['latency_seconds']}s{duplicates})")
+            return outcome
+
+    outcomes = dict(zip(groups, await asyncio.gather(*(run_one(rows) for rows in groups.values()))))
+    # One entry per input row, in input order
+    results = [
+        {'topic': row['topic'], 'tone': row['tone'], **outcomes[request_key(row['topic'], row['tone'], output_dir)]}
+        for row in topics
+    ]
+    summary_file = write_batch_summary(results, output_dir, started_at, time.perf_counter() - batch_start, summary_path)
+    return results, summary_file
+
+
+async def run_and_close(coro):
+    """Awaits `coro`, then closes the loop's pooled HTTP session (for one-shot asyncio.run callers)."""
+    try:
+        return await coro
+    finally:
+        await close_http_session()
+
+
 # Keep the CLI execution block
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Autonomous Python Blog Writing Agent - CLI Mode")
-    parser.add_argument("--topic", type=str, required=True, help="The main topic for the blog post.")
-    parser.add_argument("--tone", type=str, default="informative", help="Desired writing tone (e.g., informative, educational, creative, formal).")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--topic", type=str, help="The main topic for the blog post.")
+    source.add_argument("--batch", type=str, help="CSV (topic,tone columns) or JSONL file of topics to generate in one run.")
+    source.add_argument("--reindex", action="store_true", help="Rebuild the tag-ranking index and the post catalog from the posts already in --output-dir.")
+    parser.add_argument("--tone", type=str, default="informative", help="Desired writing tone (e.g., informative, educational, creative, formal). Default tone for batch rows without one.")
     parser.add_argument("--output-dir", type=str, default="output", help="Directory to save the generated files.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk Gemini response cache.")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"Max concurrent Gemini calls when writing sections (default {DEFAULT_MAX_CONCURRENCY}, 1 = sequential).")
+    parser.add_argument("--batch-concurrency", type=int, default=8, help="Max pipelines running at once in batch mode.")
+    parser.add_argument("--metrics-jsonl", type=str, default=None, help="Append one JSON line of per-stage timings/call counts per post to this file.")
+    parser.add_argument("--metrics-prom", type=str, default=None, help="Write cumulative metrics in Prometheus text format to this file.")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoints of an earlier run of the same topic/tone, regenerating only missing or failed parts.")
+    parser.add_argument("--regenerate-section", type=str, default=None, help="With --topic: rewrite only this section (by its heading) of an already generated post.")
+    parser.add_argument("--no-reuse", action="store_true", help="Always generate, even if a post on a near-identical topic already exists in --output-dir.")
+    parser.add_argument("--generation-mode", choices=GENERATION_MODES, default="multi", help="'multi': one Gemini call per part of the post (default). 'single': the whole post, title and description in one structured request.")
+    parser.add_argument("--stream", action="store_true", help="With --topic: print the post as it is written, and append it to <output-dir>/.runs/<key>/post.partial.md until it is exported.")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS, default="dir", help="Where posts are written: per-post directories (default), one JSONL file, one SQLite database, or a tar/zip archive.")
+    parser.add_argument("--export-path", type=str, default=None, help="File for --export-format jsonl/sqlite/tar/zip (default: posts.jsonl, posts.sqlite3 or posts-<timestamp>.tar/.zip in --output-dir). Use .tar.gz for a compressed archive.")
+    parser.add_argument("--model", action="append", default=[], metavar="STAGE=MODEL", help=f"Gemini model for one stage ({', '.join(MODEL_STAGES)}), e.g. --model analysis=gemini-2.0-flash-lite. Repeatable; other stages use GEMINI_MODEL_<STAGE> or GEMINI_MODEL.")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS", help="Time budget per post. Stages that run past their share of it are skipped or use placeholders instead of delaying the post.")
+    parser.add_argument("--summary", type=str, default=None, help="Path for the batch run summary JSON (default: <output-dir>/batch_summary_<timestamp>.json).")
 
     args = parser.parse_args()
+    if args.regenerate_section and not args.topic:
+        parser.error("--regenerate-section requires --topic")
+    if args.stream and not args.topic:
+        parser.error("--stream requires --topic")
+    if args.regenerate_section and args.generation_mode == 'single':
+        parser.error("--regenerate-section rewrites one section with its own request; it can't be combined with --generation-mode single")
+    if args.export_path and args.export_format == 'dir':
+        parser.error("--export-path is for --export-format jsonl/sqlite/tar/zip; per-post directories go in --output-dir")
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline must be a positive number of seconds")
+    try:
+        stage_models = parse_stage_models(args.model)
+    except ValueError as e:
+        parser.error(f"--model: {e}")
+    configure_metrics_export(jsonl_path=args.metrics_jsonl, prometheus_path=args.metrics_prom)
 
     # Run the main async function using asyncio.run for CLI
     try:
-        # Pass run_mode='cli' explicitly
-        asyncio.run(run_blog_agent(args.topic, args.tone, args.output_dir, run_mode='cli'))
+        if args.reindex:
+            indexed = get_tag_index(args.output_dir).rebuild(args.output_dir)
+            console.print(f"[green]Tag index rebuilt from {indexed} posts in '{args.output_dir}'.[/green]")
+            catalogued = get_catalog(args.output_dir).rebuild(args.output_dir)
+            console.print(f"[green]Post catalog rebuilt from {catalogued} posts in '{args.output_dir}'.[/green]")
+        elif args.batch:
+            export_sink = open_export_sink(args.export_format, args.output_dir, args.export_path) if args.export_format != 'dir' else None
+            topics = load_batch_topics(args.batch, default_tone=args.tone)
+            console.print(Panel(f"📚 Batch run: [bold cyan]{len(topics)}[/bold cyan] topics from '{args.batch}' (concurrency {args.batch_concurrency})", title="Blog Agent Batch", border_style="blue"))
+            try:
+                results, summary_file = asyncio.run(run_and_close(run_batch(
+                    topics, args.output_dir, concurrency=args.batch_concurrency,
+                    max_concurrency=args.max_concurrency, use_cache=not args.no_cache, summary_path=args.summary, resume=args.resume,
+                    reuse_similar=not args.no_reuse, export_sink=export_sink, generation_mode=args.generation_mode,
+                    stage_models=stage_models, deadline_seconds=args.deadline
+                )))
+            finally:
+                if export_sink:
+                    export_sink.close() # Writes the last buffered group (and finishes an archive)
+            succeeded = sum(1 for r in results if r['status'] == 'success')
+            console.print(Panel(
+                f"Succeeded: [bold green]{succeeded}[/bold green] | Failed: [bold red]{len(results) - succeeded}[/bold red]\n"
+                f"Summary: [bold magenta]{summary_file}[/bold magenta]",
+                title="Batch Summary",
+                border_style="green" if succeeded == len(results) else "yellow"
+            ))
+        else:
+            export_sink = open_export_sink(args.export_format, args.output_dir, args.export_path) if args.export_format != 'dir' else None
+            # Pass run_mode='cli' explicitly
+            try:
+                asyncio.run(run_and_close(run_blog_agent(
+                    args.topic, args.tone, args.output_dir, run_mode='cli', max_concurrency=args.max_concurrency,
+                    use_cache=not args.no_cache, resume=args.resume, regenerate_section=args.regenerate_section,
+                    reuse_similar=not args.no_reuse, export_sink=export_sink, generation_mode=args.generation_mode,
+                    stream=args.stream, stage_models=stage_models, deadline_seconds=args.deadline
+                )))
+            finally:
+                if export_sink:
+                    export_sink.close()
     except Exception as e:
         console.print(f"[bold red]An unexpected error occurred in the main CLI execution: {e}[/bold red]")
\ No newline at end of file
@@ -0,0 +1,208 @@
+# service.py
+"""
+HTTP/JSON front end for the blog agent.
+
+    python service.py [--host 0.0.0.0] [--port 8080] [--workers 4] [--max-queued 50] [--output-dir output]
+
+Endpoints:
+    POST /jobs                  {"topic": ..., "tone": ..., "generation_mode": "multi"|"single", "stream": bool,
+                                 "deadline_seconds": float, "reuse": bool}
+                                -> 202 job, 429 when the queue is full
+    GET  /jobs                  recent jobs
+    GET  /jobs/{id}             job status and per-stage progress
+    GET  /jobs/{id}/result      Markdown + metadata once done (409 while pending)
+    GET  /jobs/{id}/events      Server-Sent Events stream of stage progress (and 'text' events for streamed jobs)
+    GET  /health                queue depth, worker count and circuit breaker states
+
+Jobs live in this process's memory, so behind a load balancer route each
+job's follow-up requests to the instance that accepted it (sticky sessions,
+or include the instance in the job URL).
+"""
+import os
+import json
+import argparse
+from aiohttp import web
+from rich.console import Console
+
+from main import run_blog_agent_coalesced, GENERATION_MODES
+from utils.api_clients import close_http_session
+from utils.jobs import JobQueue, QueueFullError, DEFAULT_WORKERS, DEFAULT_MAX_QUEUED
+from utils.coalesce import get_request_coalescer
+from utils.circuit_breaker import circuit_breaker_stats
+from utils.tracing import configure_metrics_export
+
+console = Console()
+
+MAX_TOPIC_LENGTH = 300
+SSE_KEEPALIVE_SECONDS = 15
+QUEUE_FULL_RETRY_AFTER_SECONDS = 30
+
+JOB_QUEUE_KEY = web.AppKey("job_queue", JobQueue)
+OUTPUT_DIR_KEY = web.AppKey("output_dir", str)
+
+
+def _json_error(http_status: int, message: str, **extra):
+    return web.json_response({'error': message, **extra}, status=http_status)
+
+def _get_job(request):
+    job = request.app[JOB_QUEUE_KEY].get(request.match_info['job_id'])
+    if job is None:
+        raise web.HTTPNotFound(text=json.dumps({'error': "Unknown job id."}), content_type='application/json')
+    return job
+
+
+# --- Handlers ---
+async def submit_job(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return _json_error(400, "Request body must be JSON.")
+    if not isinstance(body, dict):
+        return _json_error(400, "Request body must be a JSON object.")
+    topic = str(body.get('topic') or "").strip()
+    tone = str(body.get('tone') or "informative").strip()
+    if not topic:
+        return _json_error(400, "'topic' is required.")
+    if len(topic) > MAX_TOPIC_LENGTH:
+        return _json_error(400, f"'topic' must be at most {MAX_TOPIC_LENGTH} characters.")
+    options = {}
+    if 'max_concurrency' in body:
+        try:
+            options['max_concurrency'] = max(1, int(body['max_concurrency']))
+        except (TypeError, ValueError):
+            return _json_error(400, "'max_concurrency' must be an integer.")
+    if 'generation_mode' in body:
+        if body['generation_mode'] not in GENERATION_MODES:
+            return _json_error(400, f"'generation_mode' must be one of: {', '.join(GENERATION_MODES)}.")
+        options['generation_mode'] = body['generation_mode']
+    if 'stream' in body:
+        if not isinstance(body['stream'], bool):
+            return _json_error(400, "'stream' must be true or false.")
+        options['stream'] = body['stream']
+    if 'reuse' in body:
+        if not isinstance(body['reuse'], bool):
+            return _json_error(400, "'reuse' must be true or false.")
+        options['reuse_similar'] = body['reuse']
+    if body.get('deadline_seconds') is not None:
+        try:
+            options['deadline_seconds'] = float(body['deadline_seconds'])
+        except (TypeError, ValueError):
+            return _json_error(400, "'deadline_seconds' must be a number.")
+        if options['deadline_seconds'] <= 0:
+            return _json_error(400, "'deadline_seconds' must be positive.")
+
+    queue = request.app[JOB_QUEUE_KEY]
+    try:
+        job = await queue.submit_async(topic, tone, request.app[OUTPUT_DIR_KEY], **options)
+    except QueueFullError as e:
+        return web.json_response({'error': str(e)}, status=429,
+                                 headers={'Retry-After': str(QUEUE_FULL_RETRY_AFTER_SECONDS)})
+    return web.json_response(job.to_dict(), status=202, headers={'Location': f"/jobs/{job.id}"})
+
+async def list_jobs(request):
+    return web.json_response({'jobs': [job.to_dict() for job in request.app[JOB_QUEUE_KEY].list_jobs()]})
+
+async def job_status(request):
+    return web.json_response(_get_job(request).to_dict())
+
+async def job_result(request):
+    job = _get_job(request)
+    if not job.is_finished:
+        return _json_error(409, "Job has not finished yet.", status=job.status)
+    if job.status != 'done':
+        return _json_error(500, job.error or "Blog post generation failed.", status=job.status,
+                           markdown=job.markdown_content)
+    return web.json_response({'id': job.id, 'status': job.status, 'markdown': job.markdown_content, 'metadata': job.metadata})
+
+async def job_events(request):
+    """Streams the job's stage events as Server-Sent Events, ending with a 'finished' event."""
+    job = _get_job(request)
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # Don't let reverse proxies buffer the stream
+    })
+    await response.prepare(request)
+
+    async def send(event: str, data: dict):
+        await response.write(f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8"))
+
+    sent = 0
+    last_status = None
+    while True:
+        # Everything runs on one loop, so nothing changes between these checks and the wait
+        if job.status != last_status:
+            last_status = job.status
+            await send('status', {'status': job.status})
+        for timestamp, stage, status, info in job.events[sent:]:
+            if status == 'text':
+                await send('text', info) # {'part', 'text', 'replace'}: append to (or replace) that part of the post
+            else:
+                await send('stage', {'stage': stage, 'status': status, 'info': info, 'timestamp': timestamp})
+        sent = len(job.events)
+        if job.is_finished:
+            await send('finished', job.to_dict())
+            break
+        if not await job.wait_for_change(timeout=SSE_KEEPALIVE_SECONDS):
+            await response.write(b": keep-alive\n\n")
+    await response.write_eof()
+    return response
+
+async def health(request):
+    queue = request.app[JOB_QUEUE_KEY]
+    return web.json_response({
+        'status': 'ok',
+        'workers': queue.workers,
+        'queued': queue.queued_count(),
+        'max_queued': queue.max_queued,
+        'result_cache': get_request_coalescer().stats(),
+        'circuits': circuit_breaker_stats(),
+    })
+
+
+# --- App setup ---
+def create_app(output_dir: str = "output", workers: int = DEFAULT_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED, gemini_client=None) -> web.Application:
+    """Builds the aiohttp application; `gemini_client` overrides the default client (e.g. for benchmarks)."""
+    async def run_job(topic, tone, output_dir, progress_callback, **options):
+        # run_mode='service' keeps the pipeline quiet; identical requests share one run
+        return await run_blog_agent_coalesced(topic, tone, output_dir, run_mode='service',
+                                              progress_callback=progress_callback, gemini_client=gemini_client, **options)
+
+    app = web.Application()
+    app[OUTPUT_DIR_KEY] = output_dir
+    app[JOB_QUEUE_KEY] = JobQueue(run_job, workers=workers, max_queued=max_queued)
+
+    async def on_startup(app):
+        await app[JOB_QUEUE_KEY].start()
+
+    async def on_cleanup(app):
+        await app[JOB_QUEUE_KEY].stop()
+        await close_http_session()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.add_routes([
+        web.post('/jobs', submit_job),
+        web.get('/jobs', list_jobs),
+        web.get('/jobs/{job_id}', job_status),
+        web.get('/jobs/{job_id}/result', job_result),
+        web.get('/jobs/{job_id}/events', job_events),
+        web.get('/health', health),
+    ])
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autonomous Python Blog Writing Agent - HTTP service")
+    parser.add_argument("--host", type=str, default=os.getenv("BLOG_AGENT_HOST", "0.0.0.0"), help="Interface to bind.")
+    parser.add_argument("--port", type=int, default=int(os.getenv("BLOG_AGENT_PORT", "8080")), help="Port to listen on.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Pipelines generated at the same time.")
+    parser.add_argument("--max-queued", type=int, default=DEFAULT_MAX_QUEUED, help="Jobs waiting before submissions get 429.")
+    parser.add_argument("--output-dir", type=str, default="output", help="Directory to save the generated files.")
+    parser.add_argument("--metrics-jsonl", type=str, default=None, help="Append one JSON line of per-stage timings/call counts per post to this file.")
+    parser.add_argument("--metrics-prom", type=str, default=None, help="Write cumulative metrics in Prometheus text format to this file.")
+    args = parser.parse_args()
+    configure_metrics_export(jsonl_path=args.metrics_jsonl, prometheus_path=args.metrics_prom)
+
+    console.print(f"[cyan]Blog agent service on http://{args.host}:{args.port} ({args.workers} workers, queue {args.max_queued})[/cyan]")
+    web.run_app(create_app(args.output_dir, args.workers, args.max_queued), host=args.host, port=args.port, print=None)
@@ -1,33 +1,45 @@
 # utils/api_clients.py
 import os
-import google.generativeai as genai
 import requests
 import aiohttp
 import asyncio
 import functools
+import threading
+import weakref
+from collections import OrderedDict
 from rich.console import Console
-import streamlit as st # <--- Add Streamlit import
-from dotenv import load_dotenv # <--- Add dotenv import
+from utils.llm_cache import CachedGeminiModel, get_llm_cache
+from utils.rate_limiter import RateLimitedGeminiModel, call_with_retry, call_with_retry_async
+from utils.circuit_breaker import CircuitOpenError
+from utils.config import get_secret
+from utils.model_routing import ModelRouter, DEFAULT_MODEL, stage_models as resolve_stage_models
 
 console = Console()
 
+# Base URLs can be pointed at local stand-ins (see benchmarks/fake_services.py)
+NEWSDATA_BASE_URL = os.getenv("NEWSDATA_BASE_URL", "https://newsdata.io/api/1")
+DATAMUSE_BASE_URL = os.getenv("DATAMUSE_BASE_URL", "https://api.datamuse.com")
+QUOTABLE_BASE_URL = os.getenv("QUOTABLE_BASE_URL", "https://api.quotable.io")
+
 # --- Gemini Client ---
-def get_gemini_client():
-    """Initializes and returns the Gemini client, checking st.secrets first."""
-    api_key = None
-    # Try Streamlit secrets first (will only work when deployed)
-    try:
-        if hasattr(st, 'secrets') and "GEMINI_API_KEY" in st.secrets:
-             api_key = st.secrets["GEMINI_API_KEY"]
-             # print("Using Gemini key from st.secrets") # Debug print
-    except Exception:
-        pass # Fail silently if st.secrets not available or key missing
+# Built clients are reused for the life of the process (one per key, model and
+# cache setting): genai.configure resets the SDK's transport, so re-running it
+# per post would drop warmed connections.
+_gemini_clients = {}
+_gemini_clients_lock = threading.Lock()
 
-    # If not found via st.secrets, try environment variables (for local .env)
-    if not api_key:
-        # print("Gemini key not found in st.secrets, trying .env") # Debug print
-        load_dotenv() # Load .env file if running locally
-        api_key = os.getenv("GEMINI_API_KEY")
+def get_gemini_client(use_cache: bool = True, model_name: str = None):
+    """
+    Initializes and returns the Gemini client for `model_name` (default
+    GEMINI_MODEL, i.e. gemini-2.0-flash), checking st.secrets first.
+    Calls go through the shared 'gemini' rate limiter and retry policy; with
+    use_cache=True the model is also wrapped in the on-disk LLM response cache
+    (cache hits don't consume rate-limit tokens). Repeated calls with the same
+    key and model return the same client.
+    """
+    model_name = model_name or DEFAULT_MODEL
+    # st.secrets when running under Streamlit, otherwise environment variables (for local .env)
+    api_key = get_secret("GEMINI_API_KEY")
 
     if not api_key:
         console.print("[bold red]Error: GEMINI_API_KEY not found in st.secrets or environment variables.[/bold red]")
@@ -35,28 +47,101 @@ def get_gemini_client():
         # Consider raising an exception here instead of returning None for clarity
         return None
 
+    key = (api_key, use_cache, model_name)
+    with _gemini_clients_lock:
+        if key not in _gemini_clients:
+            client = _build_gemini_client(api_key, use_cache, model_name)
+            if client is None:
+                return None
+            _gemini_clients[key] = client
+        return _gemini_clients[key]
+
+def get_model_router(use_cache: bool = True, stage_models: dict = None):
+    """
+    Returns a ModelRouter with the client for each pipeline stage's model
+    (see utils.model_routing.stage_models), or None if a client can't be built.
+    Stages configured with the same model share its client.
+    """
+    models = resolve_stage_models(stage_models)
+    clients = {}
+    for stage, model_name in models.items():
+        clients[stage] = get_gemini_client(use_cache=use_cache, model_name=model_name)
+        if clients[stage] is None:
+            return None
+    return ModelRouter(get_gemini_client(use_cache=use_cache), clients)
+
+_configured_api_key = None
+
+def _build_gemini_client(api_key: str, use_cache: bool, model_name: str):
+    global _configured_api_key
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        # Imported on first use: the SDK is slow to import and CLI --help / batch
+        # bookkeeping shouldn't pay for it
+        import google.generativeai as genai
+        if api_key != _configured_api_key: # Once per key, so models built later keep the warmed transport
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+        model = RateLimitedGeminiModel(genai.GenerativeModel(model_name))
         # print("Gemini client configured successfully.") # Debug print
+        if use_cache:
+            try:
+                return CachedGeminiModel(model, get_llm_cache())
+            except Exception as e:
+                console.print(f"[yellow]LLM response cache unavailable, continuing without it: {e}[/yellow]")
         return model
     except Exception as e:
         console.print(f"[bold red]Error initializing Gemini client: {e}[/bold red]")
         return None
 
+# --- Shared HTTP Session ---
+# One keep-alive connection pool per event loop, reused by every research call
+# (aiohttp sessions are bound to the loop they were created on).
+_http_sessions = weakref.WeakKeyDictionary()
+
+async def get_http_session():
+    """Returns the long-lived aiohttp session for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=60, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector)
+        _http_sessions[loop] = session
+    return session
+
+async def close_http_session():
+    """Closes the running loop's shared session (call before the loop shuts down)."""
+    session = _http_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+async def _get_json_async(session, provider, url, params=None, timeout=10):
+    """Rate-limited, retried GET returning the decoded JSON body."""
+    async def request():
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    return await call_with_retry_async(provider, request)
+
 # --- NewsData.io Client ---
 async def fetch_news_async(session, api_key, topic):
     """Fetches news related to the topic asynchronously."""
     # Basic URL encoding for the topic
     query = requests.utils.quote(topic)
-    url = f"https://newsdata.io/api/1/news?apikey={api_key}&q={query}&language=en"
-    # Add retry logic here later if needed
-    try:
+    url = f"{NEWSDATA_BASE_URL}/news?apikey={api_key}&q={query}&language=en"
+
+    async def request():
         async with session.get(url, timeout=15) as response: # Added timeout
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-            data = await response.json()
-            # Limit to top 3 relevant articles for context
-            return data.get('results', [])[:3]
+            return await response.json()
+
+    try:
+        # Rate limited and retried on 429/5xx/timeouts, honoring Retry-After
+        data = await call_with_retry_async('newsdata', request)
+        # Limit to top 3 relevant articles for context
+        return data.get('results', [])[:3]
+    except CircuitOpenError as e:
+        console.print(f"[yellow]Skipping news: {e}[/yellow]")
+        return []
     except aiohttp.ClientError as e:
         console.print(f"[yellow]NewsData API request failed: {e}[/yellow]")
         return []
@@ -68,23 +153,33 @@ async def fetch_news_async(session, api_key, topic):
         return []
 
 
+def _get_json(url, timeout=None):
+    """GET `url` with requests and return the decoded JSON body (raises on HTTP errors)."""
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
 # --- Datamuse Client ---
-@functools.lru_cache(maxsize=128) # Cache results for repeated keyword lookups
-def fetch_datamuse_keywords(topic):
-    """Fetches related keywords from Datamuse."""
+@functools.lru_cache(maxsize=128) # Cache results for repeated keyword lookups (failures raise, so they aren't cached)
+def _fetch_datamuse_keywords_cached(topic):
     keywords = set()
-    try:
-        # Means like
-        response_ml = requests.get(f"https://api.datamuse.com/words?ml={topic}&max=10")
-        response_ml.raise_for_status()
-        keywords.update(item['word'] for item in response_ml.json())
+    # Means like
+    response_ml = call_with_retry('datamuse', _get_json, f"{DATAMUSE_BASE_URL}/words?ml={topic}&max=10", timeout=10)
+    keywords.update(item['word'] for item in response_ml)
+
+    # Related triggers (often good for SEO)
+    response_trg = call_with_retry('datamuse', _get_json, f"{DATAMUSE_BASE_URL}/words?rel_trg={topic}&max=10", timeout=10)
+    keywords.update(item['word'] for item in response_trg)
 
-        # Related triggers (often good for SEO)
-        response_trg = requests.get(f"https://api.datamuse.com/words?rel_trg={topic}&max=10")
-        response_trg.raise_for_status()
-        keywords.update(item['word'] for item in response_trg.json())
+    return list(keywords)[:15] # Limit total keywords
 
-        return list(keywords)[:15] # Limit total keywords
+def fetch_datamuse_keywords(topic):
+    """Fetches related keywords from Datamuse."""
+    try:
+        return list(_fetch_datamuse_keywords_cached(topic))
+    except CircuitOpenError as e:
+        console.print(f"[yellow]Skipping keywords: {e}[/yellow]")
+        return []
     except requests.exceptions.RequestException as e:
         console.print(f"[yellow]Datamuse API request failed: {e}[/yellow]")
         return []
@@ -92,6 +187,35 @@ def fetch_datamuse_keywords(topic):
         console.print(f"[yellow]An unexpected error occurred during Datamuse fetch: {e}[/yellow]")
         return []
 
+_datamuse_async_cache = OrderedDict() # Mirrors the lru_cache on the sync client
+_DATAMUSE_CACHE_SIZE = 128
+
+async def fetch_datamuse_keywords_async(session, topic):
+    """Fetches related keywords from Datamuse, running both queries in parallel over the shared session."""
+    if topic in _datamuse_async_cache:
+        _datamuse_async_cache.move_to_end(topic)
+        return list(_datamuse_async_cache[topic])
+
+    url = f"{DATAMUSE_BASE_URL}/words"
+    results = await asyncio.gather(
+        _get_json_async(session, 'datamuse', url, params={'ml': topic, 'max': 10}), # Means like
+        _get_json_async(session, 'datamuse', url, params={'rel_trg': topic, 'max': 10}), # Related triggers
+        return_exceptions=True
+    )
+    keywords = {} # dict keeps insertion order, so the result is stable across runs
+    for result in results:
+        if isinstance(result, Exception):
+            console.print(f"[yellow]Datamuse API request failed: {result}[/yellow]")
+            continue
+        keywords.update((item['word'], None) for item in result if 'word' in item)
+    keywords = list(keywords)[:15] # Limit total keywords
+
+    if not any(isinstance(result, Exception) for result in results):
+        _datamuse_async_cache[topic] = keywords
+        if len(_datamuse_async_cache) > _DATAMUSE_CACHE_SIZE:
+            _datamuse_async_cache.popitem(last=False)
+    return list(keywords)
+
 # --- Quotable.io Client ---
 def fetch_quotable_quotes(topic_keywords):
     """Fetches quotes related to topic keywords."""
@@ -101,14 +225,36 @@ def fetch_quotable_quotes(topic_keywords):
     if not tags:
         return []
     try:
-        response = requests.get(f"https://api.quotable.io/quotes/random?limit=2&tags={tags}", timeout=10)
-        response.raise_for_status()
-        quotes_data = response.json()
+        quotes_data = call_with_retry('quotable', _get_json, f"{QUOTABLE_BASE_URL}/quotes/random?limit=2&tags={tags}", timeout=10)
         quotes = [f"\"{q['content']}\" - {q['author']}" for q in quotes_data]
         return quotes
+    except CircuitOpenError as e:
+        console.print(f"[yellow]Skipping quotes: {e}[/yellow]")
+        return []
     except requests.exceptions.RequestException as e:
         console.print(f"[yellow]Quotable API request failed: {e}[/yellow]")
         return []
     except Exception as e:
         console.print(f"[yellow]An unexpected error occurred during Quotable fetch: {e}[/yellow]")
-        return []
\ No newline at end of file
+        return []
+
+async def fetch_quotable_quotes_async(session, topic_keywords):
+    """Fetches quotes related to topic keywords over the shared session."""
+    tags = "|".join(topic_keywords[:3]) # Search using OR for first 3 keywords
+    if not tags:
+        return []
+    try:
+        quotes_data = await _get_json_async(session, 'quotable', f"{QUOTABLE_BASE_URL}/quotes/random", params={'limit': 2, 'tags': tags})
+        return [f"\"{q['content']}\" - {q['author']}" for q in quotes_data]
+    except CircuitOpenError as e:
+        console.print(f"[yellow]Skipping quotes: {e}[/yellow]")
+        return []
+    except aiohttp.ClientError as e:
+        console.print(f"[yellow]Quotable API request failed: {e}[/yellow]")
+        return []
+    except asyncio.TimeoutError:
+        console.print("[yellow]Quotable API request timed out.[/yellow]")
+        return []
+    except Exception as e:
+        console.print(f"[yellow]An unexpected error occurred during Quotable fetch: {e}[/yellow]")
+        return []
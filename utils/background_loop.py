@@ -0,0 +1,85 @@
+# utils/background_loop.py
+import asyncio
+import threading
+import contextvars
+from utils.api_clients import close_http_session
+
+
+class BackgroundEventLoop:
+    """
+    An asyncio event loop running forever on a daemon thread.
+
+    Long-lived hosts (the Streamlit app) submit coroutines to it instead of
+    calling asyncio.run per request, so loop-bound resources such as the pooled
+    aiohttp session and its keep-alive connections survive between runs.
+    """
+
+    def __init__(self, name: str = "blog-agent-loop"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    @property
+    def is_running(self) -> bool:
+        return self.loop is not None and self.loop.is_running()
+
+    def submit(self, coro):
+        """Schedules `coro` on the loop; returns a concurrent.futures.Future usable from any thread."""
+        if not self.is_running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Runs `coro` on the loop and blocks the calling thread until it finishes."""
+        return self.submit(coro).result(timeout=timeout)
+
+    def stop(self):
+        """Closes the loop's HTTP session and stops the loop."""
+        if not self.is_running:
+            return
+        try:
+            self.run(close_http_session(), timeout=10)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=10)
+
+
+_shared_loop = BackgroundEventLoop(name="blog-agent-sync-bridge")
+
+def run_sync(coro, timeout: float = None):
+    """
+    Runs an async agent from synchronous code and returns its result.
+
+    The coroutine runs on one process-wide background loop (started on first
+    use), so loop-bound clients such as the Gemini SDK's async transport keep
+    working across calls, and it sees the caller's context (tracing spans).
+    Must not be called from a thread that is running an event loop: await the
+    coroutine there instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("run_sync() would block the running event loop; await the async variant instead.")
+    context = contextvars.copy_context()
+    async def in_caller_context():
+        return await context.run(asyncio.ensure_future, coro) # The task copies the caller's context
+    return _shared_loop.run(in_caller_context(), timeout=timeout)
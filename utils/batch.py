@@ -0,0 +1,71 @@
+# utils/batch.py
+import csv
+import json
+import datetime
+from pathlib import Path
+from rich.console import Console
+
+console = Console()
+
+def load_batch_topics(path: str, default_tone: str = "informative") -> list:
+    """
+    Reads batch rows from a CSV (header with 'topic' and optional 'tone' columns)
+    or JSONL file (one {"topic": ..., "tone": ...} object per line).
+    Rows without a topic are skipped.
+    """
+    file_path = Path(path)
+    rows = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.suffix.lower() in ('.jsonl', '.ndjson'):
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    console.print(f"[yellow]Skipping invalid JSON on line {line_number} of {path}: {e}[/yellow]")
+        else:
+            rows = list(csv.DictReader(f))
+
+    topics = []
+    for row in rows:
+        topic = (row.get('topic') or "").strip()
+        if not topic:
+            continue
+        tone = (row.get('tone') or "").strip() or default_tone
+        topics.append({'topic': topic, 'tone': tone})
+    return topics
+
+def write_batch_summary(results: list, output_dir: str, started_at: datetime.datetime, wall_time_seconds: float, summary_path: str = None) -> str:
+    """
+    Writes the per-run summary (counts, latency stats and one entry per topic) as JSON.
+    Returns the path written.
+    """
+    latencies = sorted(r['latency_seconds'] for r in results)
+    succeeded = [r for r in results if r['status'] == 'success']
+
+    def percentile(p):
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+        return round(latencies[index], 3)
+
+    summary = {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'wall_time_seconds': round(wall_time_seconds, 3),
+        'total': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'throughput_posts_per_minute': round(len(succeeded) / wall_time_seconds * 60, 2) if wall_time_seconds else None,
+        'latency_seconds': {'p50': percentile(50), 'p95': percentile(95), 'max': latencies[-1] if latencies else None},
+        'results': results,
+    }
+
+    if not summary_path:
+        summary_path = Path(output_dir) / f"batch_summary_{started_at.strftime('%Y%m%d_%H%M%S')}.json"
+    summary_path = Path(summary_path)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=4)
+    return str(summary_path)
@@ -0,0 +1,217 @@
+# utils/catalog.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from rich.console import Console
+
+console = Console()
+
+INDEX_DIRNAME = ".index" # Under the output directory, next to the tag and near-duplicate indexes
+CATALOG_FILENAME = "catalog.sqlite3"
+RESERVATION_TIMEOUT_SECONDS = 3600 # Reserved slugs whose export never finished are freed after this
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class PostCatalog:
+    """
+    SQLite catalog of exported posts: one row per slug plus a tag table.
+
+    Export reserves a slug before writing files and records the post once they
+    exist, each in its own transaction, so listing, tag/topic/date lookups and
+    collision checks never walk the output directory. A slug belongs to one
+    topic+tone; a different topic whose title slugifies the same way gets
+    '<slug>-2', '<slug>-3', ... instead of overwriting it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS posts ("
+                " slug TEXT PRIMARY KEY, topic TEXT, topic_key TEXT, tone TEXT, title TEXT, meta_description TEXT,"
+                " status TEXT NOT NULL, md_path TEXT, json_path TEXT, reading_time_minutes INTEGER,"
+                " readability_score REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_topic_key ON posts(topic_key, tone)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, slug TEXT NOT NULL, PRIMARY KEY (tag, slug)) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tags_slug ON tags(slug)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None) # Explicit transactions below
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Writes ---
+    def allocate_slug(self, base_slug: str, topic: str, tone: str) -> str:
+        """
+        Reserves a slug for a post about topic+tone and returns it.
+
+        The same topic+tone gets its existing slug back (regenerating a post
+        replaces it); anything else gets the first free '<base>', '<base>-2', ...
+        """
+        base_slug = base_slug or "blog-post"
+        topic_key, tone_key = _normalize(topic), _normalize(tone)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE") # Serializes allocation across processes too
+                rows = conn.execute(
+                    "SELECT slug, topic_key, tone, status, updated_at FROM posts WHERE slug = ? OR slug LIKE ? ESCAPE '\\'",
+                    (base_slug, base_slug.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + "-%")
+                ).fetchall()
+                taken = {}
+                for row in rows:
+                    stale = row['status'] == 'reserved' and now - row['updated_at'] > RESERVATION_TIMEOUT_SECONDS
+                    if not stale:
+                        taken[row['slug']] = row
+                slug, suffix = base_slug, 1
+                while slug in taken:
+                    owner = taken[slug]
+                    if owner['topic_key'] == topic_key and _normalize(owner['tone']) == tone_key:
+                        break # Our own earlier post
+                    suffix += 1
+                    slug = f"{base_slug}-{suffix}"
+                if slug not in taken:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO posts (slug, topic, topic_key, tone, status, created_at, updated_at)"
+                        " VALUES (?, ?, ?, ?, 'reserved', ?, ?)",
+                        (slug, topic, topic_key, tone, now, now)
+                    )
+                conn.execute("COMMIT")
+                return slug
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def release_slug(self, slug: str):
+        """Frees a reservation whose export failed (exported posts are left alone)."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM posts WHERE slug = ? AND status = 'reserved'", (slug,))
+
+    def record_post(self, slug: str, topic: str, tone: str, metadata: dict, md_path: str, json_path: str, created_at: float = None):
+        """Records (or replaces) an exported post and its tags in one transaction."""
+        now = time.time()
+        readability = metadata.get('readability_score')
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                existing = conn.execute("SELECT created_at, status FROM posts WHERE slug = ?", (slug,)).fetchone()
+                if created_at is None:
+                    created_at = existing['created_at'] if existing and existing['status'] == 'exported' else now
+                conn.execute(
+                    "INSERT OR REPLACE INTO posts (slug, topic, topic_key, tone, title, meta_description, status, md_path, json_path,"
+                    " reading_time_minutes, readability_score, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'exported', ?, ?, ?, ?, ?, ?)",
+                    (slug, topic, _normalize(topic), tone, metadata.get('title'), metadata.get('meta_description'), md_path, json_path,
+                     metadata.get('reading_time_minutes'), readability if isinstance(readability, (int, float)) else None,
+                     created_at, now)
+                )
+                conn.execute("DELETE FROM tags WHERE slug = ?", (slug,))
+                conn.executemany("INSERT OR IGNORE INTO tags (tag, slug) VALUES (?, ?)",
+                                 ((_normalize(tag), slug) for tag in metadata.get('tags', []) if tag))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def remove_post(self, slug: str):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM tags WHERE slug = ?", (slug,))
+            conn.execute("DELETE FROM posts WHERE slug = ?", (slug,))
+
+    # --- Lookups (exported posts only) ---
+    def _posts(self, where: str = "", params: tuple = (), limit: int = 50, offset: int = 0) -> list:
+        query = f"SELECT * FROM posts WHERE status = 'exported' {where} ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        with self._connect() as conn:
+            posts = [dict(row) for row in conn.execute(query, params + (limit, offset))]
+            for post in posts:
+                post['tags'] = [row[0] for row in conn.execute("SELECT tag FROM tags WHERE slug = ? ORDER BY tag", (post['slug'],))]
+        for post in posts:
+            post.pop('topic_key', None)
+        return posts
+
+    def get(self, slug: str):
+        posts = self._posts("AND slug = ?", (slug,), limit=1)
+        return posts[0] if posts else None
+
+    def list_posts(self, since: float = None, until: float = None, limit: int = 50, offset: int = 0) -> list:
+        """Most recent first; `since`/`until` are Unix timestamps bounding created_at."""
+        where, params = "", ()
+        if since is not None:
+            where, params = where + " AND created_at >= ?", params + (since,)
+        if until is not None:
+            where, params = where + " AND created_at < ?", params + (until,)
+        return self._posts(where, params, limit, offset)
+
+    def find_by_tag(self, tag: str, limit: int = 50) -> list:
+        return self._posts("AND slug IN (SELECT slug FROM tags WHERE tag = ?)", (_normalize(tag),), limit)
+
+    def find_by_topic(self, query: str, limit: int = 50) -> list:
+        """Posts whose topic contains `query` (case- and whitespace-insensitive)."""
+        pattern = "%" + _normalize(query).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + "%"
+        return self._posts("AND topic_key LIKE ? ESCAPE '\\'", (pattern,), limit)
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """Topic substring or exact tag matches, most recent first."""
+        pattern = "%" + _normalize(query).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + "%"
+        return self._posts(
+            "AND (topic_key LIKE ? ESCAPE '\\' OR slug IN (SELECT slug FROM tags WHERE tag = ?))",
+            (pattern, _normalize(query)), limit
+        )
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM posts WHERE status = 'exported'").fetchone()[0]
+
+    def rebuild(self, output_dir: str) -> int:
+        """Re-catalogs every exported post (<output_dir>/<slug>/metadata.json) from scratch; returns the number found."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM tags")
+            conn.execute("DELETE FROM posts")
+        recorded = 0
+        for json_path in sorted(Path(output_dir).glob("*/metadata.json")):
+            slug = json_path.parent.name
+            md_path = json_path.parent / f"{slug}.md"
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                console.print(f"[yellow]Skipping '{json_path}': {e}[/yellow]")
+                continue
+            if not md_path.exists():
+                continue
+            # Posts exported before topics were stored fall back to their title
+            topic = metadata.get('topic') or metadata.get('title') or slug
+            self.record_post(slug, topic, metadata.get('tone'), metadata, str(md_path), str(json_path),
+                             created_at=metadata.get('created_at') or json_path.stat().st_mtime)
+            recorded += 1
+        return recorded
+
+
+_shared_catalogs = {}
+_shared_catalogs_lock = threading.Lock()
+
+def get_catalog(output_dir: str) -> PostCatalog:
+    """Returns the process-wide catalog of posts exported to `output_dir`."""
+    path = os.path.join(output_dir, INDEX_DIRNAME, CATALOG_FILENAME)
+    with _shared_catalogs_lock:
+        if path not in _shared_catalogs:
+            _shared_catalogs[path] = PostCatalog(path)
+        return _shared_catalogs[path]
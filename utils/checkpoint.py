@@ -0,0 +1,132 @@
+# utils/checkpoint.py
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from rich.console import Console
+
+console = Console()
+
+RUNS_DIRNAME = ".runs" # Under the output directory
+
+
+def run_key(topic: str, tone: str) -> str:
+    """Directory name for a topic/tone pair: readable prefix plus a hash of the normalized pair."""
+    normalized_topic = " ".join(topic.lower().split())
+    normalized_tone = tone.strip().lower()
+    digest = hashlib.sha1(f"{normalized_topic}\n{normalized_tone}".encode("utf-8")).hexdigest()[:8]
+    readable = re.sub(r'[^a-z0-9]+', '-', f"{normalized_topic} {normalized_tone}").strip('-')[:60]
+    return f"{readable}-{digest}"
+
+def _part_filename(name: str) -> str:
+    readable = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')[:40]
+    return f"{readable}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}.json"
+
+def _write_json_atomic(path: Path, value):
+    """Writes JSON via a temp file + rename, so a crash never leaves a half-written checkpoint."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RunCheckpoint:
+    """
+    On-disk checkpoints of one blog run, in <output_dir>/.runs/<topic-tone-key>/.
+
+    Stage outputs (analysis, research, intro, seo_title) are stored as
+    <stage>.json and post parts (introduction, each section, conclusion) under
+    parts/, so an interrupted or partially failed run can pick up where it
+    stopped. Checkpoint errors are reported and otherwise ignored: they never
+    fail a run.
+    """
+
+    def __init__(self, output_dir: str, topic: str, tone: str):
+        self.topic = topic
+        self.tone = tone
+        self.run_dir = Path(output_dir) / RUNS_DIRNAME / run_key(topic, tone)
+        self.parts_dir = self.run_dir / "parts"
+
+    def exists(self) -> bool:
+        return (self.run_dir / "run.json").exists()
+
+    def start(self, resume: bool = False):
+        """Prepares the run directory; without `resume` any earlier checkpoints for this topic/tone are dropped."""
+        try:
+            if not resume and self.run_dir.exists():
+                shutil.rmtree(self.run_dir)
+            self.parts_dir.mkdir(parents=True, exist_ok=True)
+            self._write_manifest('running')
+        except OSError as e:
+            console.print(f"[yellow]Warning: could not prepare checkpoint directory '{self.run_dir}': {e}[/yellow]")
+        return self
+
+    def finish(self, status: str):
+        """Records the outcome ('complete' or 'failed') in run.json."""
+        try:
+            self._write_manifest(status)
+        except OSError as e:
+            console.print(f"[yellow]Warning: could not update checkpoint manifest: {e}[/yellow]")
+
+    def _write_manifest(self, status: str):
+        manifest_path = self.run_dir / "run.json"
+        manifest = self._read(manifest_path) or {'topic': self.topic, 'tone': self.tone, 'created_at': time.time()}
+        manifest.update({'status': status, 'updated_at': time.time()})
+        _write_json_atomic(manifest_path, manifest)
+
+    @staticmethod
+    def _read(path: Path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            console.print(f"[yellow]Warning: ignoring unreadable checkpoint '{path}': {e}[/yellow]")
+            return None
+
+    def _save(self, path: Path, value):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write_json_atomic(path, value)
+        except (OSError, TypeError) as e:
+            console.print(f"[yellow]Warning: could not write checkpoint '{path}': {e}[/yellow]")
+
+    def _discard(self, path: Path):
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            console.print(f"[yellow]Warning: could not remove checkpoint '{path}': {e}[/yellow]")
+
+    # --- Stage outputs ---
+    def load(self, stage: str):
+        return self._read(self.run_dir / f"{stage}.json")
+
+    def save(self, stage: str, value):
+        self._save(self.run_dir / f"{stage}.json", value)
+
+    def discard(self, stage: str):
+        self._discard(self.run_dir / f"{stage}.json")
+
+    # --- Post parts (lists of Markdown chunks) ---
+    def load_part(self, name: str):
+        saved = self._read(self.parts_dir / _part_filename(name))
+        return saved['chunks'] if saved else None
+
+    def save_part(self, name: str, chunks: list):
+        self._save(self.parts_dir / _part_filename(name), {'name': name, 'chunks': chunks})
+
+    def discard_part(self, name: str):
+        self._discard(self.parts_dir / _part_filename(name))
+
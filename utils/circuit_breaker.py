@@ -0,0 +1,128 @@
+# utils/circuit_breaker.py
+import os
+import time
+import threading
+from rich.console import Console
+from utils.tracing import register_gauges
+
+console = Console()
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2} # blog_agent_circuit_state gauge
+
+# Consecutive failed attempts (timeouts, dropped connections, 5xx) that open a
+# provider's circuit, and seconds it stays open before one probe request is let
+# through. Per provider: e.g. NEWSDATA_CIRCUIT_FAILURES=3, QUOTABLE_CIRCUIT_RESET_SECONDS=60.
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} is unavailable (circuit open, next probe in {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker shared by every caller of one provider.
+
+    Closed: calls go through; `failure_threshold` consecutive failures open it.
+    Callers report any response from the provider (including 429 and other
+    4xx errors) as a success, so only back-to-back outages are counted.
+    Open: calls fail fast with CircuitOpenError for `reset_timeout` seconds.
+    Half-open: one probe call goes through. Its success closes the circuit,
+    its failure opens it again. A probe that never reports back (e.g. it was
+    cancelled) is replaced after another `reset_timeout`.
+    """
+
+    def __init__(self, provider: str, failure_threshold: int = CIRCUIT_FAILURES, reset_timeout: float = CIRCUIT_RESET_SECONDS):
+        self.provider = provider
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self.short_circuited = 0
+        self.changed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            waited = time.monotonic() - self.changed_at
+            if waited >= self.reset_timeout:
+                self._set_state(HALF_OPEN) # This caller is the probe
+                console.print(f"[yellow]{self.provider} circuit half-open; probing.[/yellow]")
+                return
+            self.short_circuited += 1
+            raise CircuitOpenError(self.provider, self.reset_timeout - waited)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+                console.print(f"[green]{self.provider} circuit closed; the provider is answering again.[/green]")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._set_state(OPEN)
+                self.opened_count += 1
+                console.print(f"[yellow]{self.provider} circuit open after {self.failures} failures; "
+                              f"failing fast for {self.reset_timeout:.0f}s.[/yellow]")
+
+    def _set_state(self, state: str):
+        self.state = state
+        self.changed_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures,
+                    'opened': self.opened_count, 'short_circuited': self.short_circuited}
+
+
+_breakers = {}
+_breaker_settings = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Returns the process-wide circuit breaker for `provider`."""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider, **{
+                'failure_threshold': int(os.getenv(f"{provider.upper()}_CIRCUIT_FAILURES", CIRCUIT_FAILURES)),
+                'reset_timeout': float(os.getenv(f"{provider.upper()}_CIRCUIT_RESET_SECONDS", CIRCUIT_RESET_SECONDS)),
+                **_breaker_settings,
+            })
+        return _breakers[provider]
+
+def circuit_breaker_stats() -> dict:
+    with _breakers_lock:
+        return {provider: breaker.stats() for provider, breaker in _breakers.items()}
+
+def circuit_breaker_gauges() -> dict:
+    """Current breaker state as Prometheus samples ({(metric, labels): value})."""
+    gauges = {}
+    for provider, stats in circuit_breaker_stats().items():
+        labels = (('provider', provider),)
+        gauges[('blog_agent_circuit_state', labels)] = STATE_VALUES[stats['state']]
+        gauges[('blog_agent_circuit_opened_total', labels)] = stats['opened']
+        gauges[('blog_agent_circuit_short_circuited_total', labels)] = stats['short_circuited']
+    return gauges
+
+register_gauges(circuit_breaker_gauges) # Breaker state is process-wide, so it is sampled rather than summed
+
+def reset_circuit_breakers(**settings):
+    """Forgets every breaker's state; new ones take `settings` (e.g. a huge failure_threshold never opens them)."""
+    global _breaker_settings
+    with _breakers_lock:
+        _breakers.clear()
+        _breaker_settings = settings
@@ -0,0 +1,166 @@
+# utils/coalesce.py
+import os
+import copy
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from rich.console import Console
+
+console = Console()
+
+RESULT_CACHE_SIZE = int(os.getenv("BLOG_AGENT_RESULT_CACHE_SIZE", "64"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("BLOG_AGENT_RESULT_CACHE_TTL_MINUTES", "60")) * 60
+
+
+def request_key(topic: str, tone: str, output_dir: str, **options) -> tuple:
+    """
+    Identity of a generation request: case/whitespace-insensitive topic, tone
+    and target directory, plus every option that changes the result (e.g.
+    generation_mode, stream, stage_models), so requests that differ in any of
+    them neither share a flight nor each other's cached result.
+    """
+    def freeze(value):
+        return tuple(sorted(value.items())) if isinstance(value, dict) else value
+    return (" ".join(topic.lower().split()), tone.strip().lower(), os.path.abspath(output_dir),
+            tuple(sorted((name, freeze(value)) for name, value in options.items())))
+
+
+class _Flight:
+    """One in-flight computation plus the progress listeners attached to it."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.task = None
+        self.listeners = []
+        self.events = [] # Replayed to listeners that join late
+
+    @staticmethod
+    def _notify(listener, event):
+        try:
+            listener(*event)
+        except Exception as e:
+            console.print(f"[yellow]Warning: progress listener failed: {e}[/yellow]")
+
+    def emit(self, stage, status, info=None):
+        self.events.append((stage, status, info))
+        for listener in list(self.listeners):
+            self._notify(listener, (stage, status, info))
+
+    def subscribe(self, listener):
+        if listener is None:
+            return
+        for event in self.events:
+            self._notify(listener, event)
+        self.listeners.append(listener)
+
+
+class RequestCoalescer:
+    """
+    Single-flight front for blog generations.
+
+    Concurrent requests with the same key share one computation (and its
+    progress events); finished results are kept in a bounded LRU shared by all
+    callers in the process, so Streamlit sessions and batch rows asking for the
+    same topic and tone cost one set of API calls. Failed runs are not cached.
+    """
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, ttl_seconds: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._results = OrderedDict() # key -> (stored_at, result)
+        self._inflight = {} # key -> _Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.joins = 0
+        self.misses = 0
+
+    def get_cached(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return copy.deepcopy(result) # Callers may mutate the metadata dict
+
+    def _store(self, key, result):
+        with self._lock:
+            self._results[key] = (time.time(), copy.deepcopy(result))
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drops one cached result, or all of them when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._results), 'inflight': len(self._inflight),
+                    'hits': self.hits, 'joins': self.joins, 'misses': self.misses}
+
+    async def run(self, key, coro_factory, progress_callback=None, use_cached: bool = True, is_success=bool):
+        """
+        Returns the result for `key`, computing it with `coro_factory(progress_callback)` at most once at a time.
+
+        `coro_factory` receives a progress callback that fans stage events out to
+        every caller sharing the flight. `is_success(result)` decides whether a
+        result is worth caching.
+        """
+        if use_cached:
+            cached = self.get_cached(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._inflight.get(key)
+            # Futures are bound to their loop; only share within the same one
+            if flight is not None and flight.loop is loop:
+                self.joins += 1
+            else:
+                flight = _Flight(loop)
+                self._inflight[key] = flight
+                self.misses += 1
+                flight.task = loop.create_task(self._compute(key, flight, coro_factory, is_success))
+        flight.subscribe(progress_callback)
+        try:
+            # Shielded so one caller giving up does not cancel the others' result
+            result = await asyncio.shield(flight.task)
+        finally:
+            if progress_callback in flight.listeners:
+                flight.listeners.remove(progress_callback)
+        return copy.deepcopy(result)
+
+    async def _compute(self, key, flight, coro_factory, is_success):
+        try:
+            result = await coro_factory(flight.emit)
+            if is_success(result):
+                self._store(key, result)
+            return result
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Returns the process-wide coalescer."""
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = RequestCoalescer()
+        return _coalescer
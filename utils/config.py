@@ -0,0 +1,46 @@
+# utils/config.py
+import os
+import sys
+from dotenv import load_dotenv
+
+def get_streamlit():
+    """
+    Returns the streamlit module if this process already imported it (i.e. we
+    are running inside the Streamlit app), otherwise None. Never imports it, so
+    CLI and batch runs don't pay Streamlit's import cost.
+    """
+    return sys.modules.get('streamlit')
+
+_dotenv_loaded = False
+
+def get_secret(name: str):
+    """Looks up a key in st.secrets (when running under Streamlit), then the environment / .env."""
+    st = get_streamlit()
+    if st is not None:
+        try:
+            if name in st.secrets:
+                return st.secrets[name]
+        except Exception:
+            pass # Fail silently if st.secrets not available or key missing
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv() # Load .env file if running locally (once per process)
+        _dotenv_loaded = True
+    return os.getenv(name)
+
+def show_streamlit_error(message: str):
+    """
+    Shows `message` with st.error when called from a Streamlit script thread;
+    no-op otherwise (e.g. CLI runs, or pipelines on the app's background loop,
+    whose errors the app reports itself).
+    """
+    st = get_streamlit()
+    if st is None:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx(suppress_warning=True) is None:
+            return
+    except ImportError:
+        pass
+    st.error(message)
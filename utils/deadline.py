@@ -0,0 +1,33 @@
+# utils/deadline.py
+import time
+
+# When each stage must be done, as a share of the run's deadline. Research runs
+# alongside analysis and the intro; the last 15% is kept for SEO and export.
+# Time a stage doesn't use carries over to the stages after it. A slow
+# single-request draft gives up halfway, leaving time for the multi-call fallback.
+STAGE_FINISH_BY = {
+    'analysis': 0.2,
+    'research': 0.4,
+    'intro': 0.4,
+    'draft': 0.5,
+    'seo_title': 0.85,
+    'content': 0.85,
+}
+
+
+class RunDeadline:
+    """An overall time budget for one run, spread across its stages by STAGE_FINISH_BY."""
+
+    def __init__(self, seconds: float, finish_by: dict = None):
+        if seconds <= 0:
+            raise ValueError("A deadline must be a positive number of seconds.")
+        self.seconds = seconds
+        self.finish_by = finish_by or STAGE_FINISH_BY
+        self.start = time.monotonic()
+
+    def remaining(self) -> float:
+        return max(0.0, self.start + self.seconds - time.monotonic())
+
+    def stage_timeout(self, stage: str) -> float:
+        """Seconds `stage` may still take (its finish-by point, or the end of the run for unlisted stages)."""
+        return max(0.0, self.start + self.seconds * self.finish_by.get(stage, 1.0) - time.monotonic())
@@ -0,0 +1,256 @@
+# utils/export_sinks.py
+"""
+Where exported posts are written.
+
+    DirectorySink  <output_dir>/<slug>/<slug>.md + metadata.json (the default layout)
+    JsonlSink      one JSON line per post in a single file
+    SQLiteSink     one row per post in a single database
+    ArchiveSink    streaming .tar / .tar.gz / .zip archive
+
+Every sink takes write(slug, markdown_content, metadata) and returns
+(markdown_ref, metadata_ref): file paths for DirectorySink,
+'<path>#<slug>/markdown' and '<path>#<slug>/metadata' for the bulk sinks. DirectorySink writes each post atomically. The bulk sinks
+buffer posts and flush every `flush_every` posts (and on close), so a batch of
+1,000 posts becomes a handful of large sequential writes instead of thousands
+of small files. A crash loses the unflushed buffer. SQLite groups are single
+transactions and archives only appear at `path` once closed, but a crash in
+the middle of a JSONL group's write can leave a truncated last line, which
+readers should skip. Sinks are thread-safe; use them as context managers so the last group is
+flushed.
+"""
+import io
+import os
+import json
+import time
+import sqlite3
+import tarfile
+import zipfile
+import tempfile
+import datetime
+import threading
+from pathlib import Path
+
+DEFAULT_FLUSH_EVERY = int(os.getenv("EXPORT_FLUSH_EVERY", "100"))
+EXPORT_FORMATS = ('dir', 'jsonl', 'sqlite', 'tar', 'zip')
+
+
+class ExportSink:
+    """Base class: buffers (slug, markdown, metadata) records and writes them in groups via _write_group."""
+
+    writes_files = False # True if write() returns paths that can be opened as plain files
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.path = str(path)
+        self.flush_every = max(1, flush_every)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._closed = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _ref(self, slug: str, part: str):
+        return f"{self.path}#{slug}/{part}"
+
+    def write(self, slug: str, markdown_content: str, metadata: dict):
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Export sink '{self.path}' is closed.")
+            self._buffer.append((slug, markdown_content, dict(metadata)))
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+        return self._ref(slug, 'markdown'), self._ref(slug, 'metadata')
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        group, self._buffer = self._buffer, []
+        self._write_group(group)
+
+    def _write_group(self, group: list):
+        raise NotImplementedError
+
+    def _finalize(self):
+        """Releases resources after the final flush."""
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._flush_locked()
+            finally:
+                self._closed = True
+                self._finalize()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DirectorySink(ExportSink):
+    """
+    The original per-post directory layout, written atomically.
+
+    Both files are written to a temporary directory next to the target and
+    fsynced. A new post's directory is then renamed into place in one step. A
+    re-exported post has its files swapped in with os.replace, Markdown first.
+    Either way, readers never see a truncated file.
+    """
+
+    writes_files = True
+
+    def __init__(self, output_dir: str):
+        super().__init__(output_dir, flush_every=1)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(self, slug: str, markdown_content: str, metadata: dict):
+        post_dir = self.output_dir / slug
+        md_path, json_path = post_dir / f"{slug}.md", post_dir / "metadata.json"
+        staging = Path(tempfile.mkdtemp(prefix=f".{slug}.", dir=self.output_dir))
+        try:
+            _write_synced(staging / md_path.name, markdown_content)
+            _write_synced(staging / json_path.name, json.dumps(metadata, indent=4))
+            try:
+                os.rename(staging, post_dir) # Whole post appears at once
+            except OSError: # Already exported: swap the files in
+                post_dir.mkdir(parents=True, exist_ok=True)
+                os.replace(staging / md_path.name, md_path)
+                os.replace(staging / json_path.name, json_path)
+        finally:
+            if staging.exists():
+                for leftover in staging.iterdir():
+                    leftover.unlink()
+                staging.rmdir()
+        return str(md_path), str(json_path)
+
+    def _write_group(self, group: list):
+        pass # write() is unbuffered
+
+
+class JsonlSink(ExportSink):
+    """Appends {'slug', 'markdown', 'metadata'} lines; each group is one write plus one fsync."""
+
+    def _write_group(self, group: list):
+        payload = "".join(
+            json.dumps({'slug': slug, 'markdown': markdown_content, 'metadata': metadata}, ensure_ascii=False) + "\n"
+            for slug, markdown_content, metadata in group
+        )
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class SQLiteSink(ExportSink):
+    """Upserts posts into a `posts` table; each group is one transaction."""
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        super().__init__(path, flush_every)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS posts ("
+                " slug TEXT PRIMARY KEY, markdown TEXT NOT NULL, metadata TEXT NOT NULL, exported_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _write_group(self, group: list):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO posts (slug, markdown, metadata, exported_at) VALUES (?, ?, ?, ?)",
+                ((slug, markdown_content, json.dumps(metadata), now) for slug, markdown_content, metadata in group)
+            )
+
+
+class ArchiveSink(ExportSink):
+    """
+    Streams posts into a tar (.tar, .tar.gz/.tgz) or .zip archive as <slug>/<slug>.md and <slug>/metadata.json.
+
+    The archive is written to '<path>.partial' and renamed on close, so an
+    interrupted batch never leaves a truncated archive at `path`. Members are
+    streamed and can't be replaced, so writing a slug a second time raises
+    ValueError instead of adding a duplicate copy.
+    """
+
+    def __init__(self, path: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        super().__init__(path, flush_every)
+        self._slugs = set()
+        self._partial_path = self.path + ".partial"
+        self._file = open(self._partial_path, 'wb')
+        if self.path.endswith('.zip'):
+            self._archive = zipfile.ZipFile(self._file, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            compressed = self.path.endswith(('.tar.gz', '.tgz'))
+            self._archive = tarfile.open(fileobj=self._file, mode='w|gz' if compressed else 'w|')
+
+    def write(self, slug: str, markdown_content: str, metadata: dict):
+        with self._lock:
+            if slug in self._slugs:
+                raise ValueError(f"'{slug}' is already in archive '{self.path}'; an archive holds one copy per post.")
+            self._slugs.add(slug)
+        return super().write(slug, markdown_content, metadata)
+
+    def _add_member(self, name: str, text: str, mtime: float):
+        data = text.encode('utf-8')
+        if isinstance(self._archive, zipfile.ZipFile):
+            info = zipfile.ZipInfo(name, date_time=time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def _write_group(self, group: list):
+        now = time.time()
+        for slug, markdown_content, metadata in group:
+            self._add_member(f"{slug}/{slug}.md", markdown_content, now)
+            self._add_member(f"{slug}/metadata.json", json.dumps(metadata, indent=4), now)
+        self._file.flush()
+
+    def _finalize(self):
+        self._archive.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._partial_path, self.path)
+
+
+def _write_synced(path: Path, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def open_export_sink(export_format: str, output_dir: str, path: str = None, flush_every: int = DEFAULT_FLUSH_EVERY) -> ExportSink:
+    """
+    Creates the sink for --export-format. Without `path`, bulk sinks write to
+    <output_dir>/posts.jsonl, <output_dir>/posts.sqlite3 or
+    <output_dir>/posts-<timestamp>.tar / .zip.
+    """
+    if export_format == 'dir':
+        return DirectorySink(path or output_dir)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+    if path is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        default_names = {'jsonl': "posts.jsonl", 'sqlite': "posts.sqlite3", 'tar': f"posts-{stamp}.tar", 'zip': f"posts-{stamp}.zip"}
+        path = os.path.join(output_dir, default_names[export_format])
+    if export_format == 'jsonl':
+        return JsonlSink(path, flush_every)
+    if export_format == 'sqlite':
+        return SQLiteSink(path, flush_every)
+    return ArchiveSink(path, flush_every)
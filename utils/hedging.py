@@ -0,0 +1,137 @@
+# utils/hedging.py
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from utils.tracing import set_span_attribute
+
+# A request still unanswered after this percentile of recent latencies gets a
+# duplicate; the first answer wins. 0 disables hedging.
+HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+# Until enough latencies are known, hedge after this many seconds (0: don't hedge yet)
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("GEMINI_HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+HEDGE_MIN_SAMPLES = 10
+HEDGE_WINDOW = 200 # Most recent latencies the percentile is taken over
+HEDGE_MAX_EXTRA_RATIO = float(os.getenv("GEMINI_HEDGE_MAX_EXTRA_RATIO", "0.1")) # At most ~10% extra requests
+
+
+class Hedger:
+    """
+    Hedged requests for one kind of call (e.g. one model's streamed requests).
+
+    run(request_factory) starts a request and, if it hasn't answered after the
+    hedge delay (HEDGE_PERCENTILE of the recent latencies), starts a duplicate.
+    The first successful answer is returned and the other request cancelled;
+    if one fails, the other is still awaited. Duplicates are capped at
+    HEDGE_MAX_EXTRA_RATIO of all requests so an overloaded backend isn't
+    handed twice the load.
+    """
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, default_delay: float = HEDGE_DEFAULT_DELAY_SECONDS,
+                 min_samples: int = HEDGE_MIN_SAMPLES, max_extra_ratio: float = HEDGE_MAX_EXTRA_RATIO):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.max_extra_ratio = max_extra_ratio
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=HEDGE_WINDOW)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Seconds to wait before hedging, or None to not hedge."""
+        if self.percentile <= 0:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.default_delay or None
+            ordered = sorted(self._latencies)
+        return ordered[max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1)]
+
+    def _record(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_extra_ratio * self.requests + 1: # +1: the first straggler may always hedge
+                return False
+            self.hedges += 1
+            return True
+
+    async def run(self, request_factory):
+        with self._lock:
+            self.requests += 1
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(request_factory())
+        tasks = [primary]
+        try:
+            delay = self.delay()
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+            if primary.done() or delay is None or not self._may_hedge():
+                result = await primary
+                self._record(time.perf_counter() - started)
+                return result
+            set_span_attribute('hedges', 1, increment=True)
+            tasks.append(asyncio.ensure_future(request_factory()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                        set_span_attribute('hedge_wins', 1, increment=True)
+                    # The straggler's latency is censored at this point; recording the
+                    # answer time keeps the percentile close to what callers see
+                    self._record(time.perf_counter() - started)
+                    for other in done - {task}:
+                        if other.exception() is None:
+                            _discard(other.result())
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'requests': self.requests, 'hedges': self.hedges, 'hedge_wins': self.hedge_wins, 'samples': len(self._latencies)}
+
+
+def _discard(result):
+    """Closes a losing streamed response that finished at the same moment as the winner."""
+    aclose = getattr(result, 'aclose', None)
+    if aclose is not None:
+        asyncio.ensure_future(aclose())
+
+
+_hedgers = {}
+_hedger_settings = {}
+_hedgers_lock = threading.Lock()
+
+def get_hedger(key) -> Hedger:
+    """Returns the process-wide hedger for `key` (e.g. (model name, streamed))."""
+    with _hedgers_lock:
+        if key not in _hedgers:
+            _hedgers[key] = Hedger(**_hedger_settings)
+        return _hedgers[key]
+
+def reset_hedgers(**settings):
+    """Forgets every hedger and its latencies; new ones take `settings` (e.g. percentile=0 turns hedging off)."""
+    global _hedger_settings
+    with _hedgers_lock:
+        _hedgers.clear()
+        _hedger_settings = settings
+
+def hedging_stats() -> dict:
+    with _hedgers_lock:
+        return {" ".join(map(str, key)): hedger.stats() for key, hedger in _hedgers.items()}
@@ -0,0 +1,199 @@
+# utils/jobs.py
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from rich.console import Console
+from utils.streaming import assemble_parts
+
+console = Console()
+
+DEFAULT_WORKERS = int(os.getenv("BLOG_AGENT_WORKERS", "4"))
+DEFAULT_MAX_QUEUED = int(os.getenv("BLOG_AGENT_MAX_QUEUED", "50"))
+DEFAULT_MAX_JOBS_KEPT = 500 # Finished jobs remembered for polling before the oldest are dropped
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when the backlog is at capacity."""
+
+
+class Job:
+    """One queued blog generation and its progress. Mutated only on the queue's event loop."""
+
+    def __init__(self, topic: str, tone: str, output_dir: str, options: dict = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.topic = topic
+        self.tone = tone
+        self.output_dir = output_dir
+        self.options = options or {}
+        self.status = 'queued' # queued -> running -> done | failed
+        self.stages = {} # stage name -> 'started' | 'completed' | 'failed'
+        self.events = [] # (timestamp, stage, status, info) in arrival order
+        self.partial_parts = {} # Streamed text so far, by part index (introduction, sections, conclusion)
+        self.markdown_content = None
+        self.metadata = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._waiters = set() # asyncio.Events set on every change, for streaming watchers
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    @property
+    def partial_markdown(self) -> str:
+        """The post as streamed so far (runs with stream=True), in document order."""
+        return assemble_parts(dict(self.partial_parts)) # Copied: read from other threads while the loop appends
+
+    def record_event(self, stage: str, status: str, info=None):
+        if status == 'text':
+            # Streamed text ({'part', 'text', 'replace'}): kept for watchers, but not a stage status
+            previous = "" if info['replace'] else self.partial_parts.get(info['part'], "")
+            self.partial_parts[info['part']] = previous + info['text']
+        else:
+            self.stages[stage] = status
+        self.events.append((time.time(), stage, status, info if not isinstance(info, Exception) else str(info)))
+        if status == 'failed' and isinstance(info, Exception):
+            self.error = f"{stage}: {info}"
+        self.notify()
+
+    def notify(self):
+        for waiter in self._waiters:
+            waiter.set()
+
+    async def wait_for_change(self, timeout: float = None) -> bool:
+        """Waits (on the queue's loop) until the job records an event or changes status; False on timeout."""
+        waiter = asyncio.Event()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters.discard(waiter)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'tone': self.tone,
+            'status': self.status,
+            'stages': dict(self.stages),
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'slug': (self.metadata or {}).get('slug'),
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of blog generations served by a fixed pool of asyncio workers.
+
+    `runner(topic, tone, output_dir, progress_callback, **options)` must be a
+    coroutine function returning (markdown_content, metadata). The queue lives
+    on one event loop (e.g. a BackgroundEventLoop); `submit` and `get` are safe
+    to call from other threads such as Streamlit script runs.
+    """
+
+    def __init__(self, runner, workers: int = DEFAULT_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED, max_jobs_kept: int = DEFAULT_MAX_JOBS_KEPT):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_jobs_kept = max_jobs_kept
+        self.loop = None
+        self._queue = None
+        self._worker_tasks = []
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def start(self):
+        """Starts the worker pool on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        return self
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def _enqueue(self, job: Job) -> Job:
+        """Runs on the queue's loop; raises QueueFullError when at capacity."""
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} waiting). Try again shortly.")
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        return job
+
+    async def submit_async(self, topic: str, tone: str, output_dir: str, **options) -> Job:
+        return self._enqueue(Job(topic, tone, output_dir, options))
+
+    def submit(self, topic: str, tone: str, output_dir: str, **options) -> Job:
+        """Thread-safe submit for callers outside the queue's event loop."""
+        async def enqueue():
+            return self._enqueue(Job(topic, tone, output_dir, options))
+        return asyncio.run_coroutine_threadsafe(enqueue(), self.loop).result(timeout=10)
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def queued_count(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _trim(self):
+        # Drop the oldest finished jobs once we remember too many
+        excess = len(self._jobs) - self.max_jobs_kept
+        for job_id in [j.id for j in self._jobs.values() if j.is_finished][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Job):
+        job.status = 'running'
+        job.started_at = time.time()
+        job.notify()
+        try:
+            markdown_content, metadata = await self.runner(
+                job.topic, job.tone, job.output_dir, job.record_event, **job.options
+            )
+            job.markdown_content = markdown_content
+            job.metadata = metadata
+            if markdown_content and metadata:
+                job.status = 'done'
+            else:
+                job.status = 'failed'
+                job.error = job.error or "Blog post generation failed. Check logs or API keys."
+        except asyncio.CancelledError:
+            job.status = 'failed'
+            job.error = "Job was cancelled."
+            raise
+        except Exception as e:
+            console.print(f"[bold red]Job {job.id} failed: {e}[/bold red]")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.notify()
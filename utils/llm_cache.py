@@ -0,0 +1,253 @@
+# utils/llm_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from rich.console import Console
+from utils.tracing import set_span_attribute
+
+console = Console()
+
+# Defaults can be overridden through the environment so CLI runs and the
+# Streamlit app share the same cache file.
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+DEFAULT_MAX_SIZE_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+DEFAULT_TTL_SECONDS = int(float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600) # One week
+
+
+class CachedResponse:
+    """Minimal stand-in for a Gemini response that was served from the cache."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.from_cache = True
+
+
+class LLMResponseCache:
+    """
+    Content-addressed, SQLite-backed store of LLM responses.
+
+    Entries are keyed on a hash of (model name, prompt, generation parameters),
+    expire after `ttl_seconds` and are evicted least-recently-used first once
+    the stored text exceeds `max_size_bytes`. Hit/miss counters live in the
+    same database so they are shared by every process using the file.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self):
+        # A short-lived connection per operation keeps the cache safe to use
+        # from worker threads and from several processes at once.
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(model_name: str, prompt, params: dict = None) -> str:
+        payload = json.dumps(
+            {'model': model_name, 'prompt': prompt, 'params': params or {}},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _bump(self, conn, name: str):
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key: str):
+        """Returns the cached response text for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._bump(conn, 'misses')
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._bump(conn, 'hits')
+            return row[0]
+
+    def set(self, key: str, response_text: str, model_name: str = None):
+        now = time.time()
+        size = len(response_text.encode('utf-8'))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response_text, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now: float):
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+            if total <= self.max_size_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES ('evictions', ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+            (evicted, evicted)
+        )
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+            'entries': entries,
+            'size_bytes': size,
+        }
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM stats")
+
+
+class CachedGeminiModel:
+    """
+    Wraps a Gemini GenerativeModel so that identical requests are answered
+    from an LLMResponseCache. Anything other than generate_content is passed
+    straight through to the wrapped model.
+    """
+
+    def __init__(self, model, cache: LLMResponseCache):
+        self._model = model
+        self.cache = cache
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self._model, 'model_name', 'unknown')
+
+    def _cache_key(self, prompt, kwargs: dict) -> str:
+        params = {
+            'generation_config': kwargs.get('generation_config', getattr(self._model, '_generation_config', None)),
+            'safety_settings': kwargs.get('safety_settings', getattr(self._model, '_safety_settings', None)),
+        }
+        return LLMResponseCache.make_key(self.model_name, prompt, params)
+
+    def generate_content(self, prompt, **kwargs):
+        if kwargs.get('stream'):
+            return self._generate_streamed(prompt, kwargs)
+
+        key = self._cache_key(prompt, kwargs)
+        try:
+            cached_text = self.cache.get(key)
+        except sqlite3.Error as e:
+            console.print(f"[yellow]LLM cache lookup failed, calling the model directly: {e}[/yellow]")
+            cached_text = None
+        if cached_text is not None:
+            set_span_attribute('cache_hits', 1, increment=True)
+            return CachedResponse(cached_text)
+
+        response = self._model.generate_content(prompt, **kwargs)
+        try:
+            self.cache.set(key, response.text, self.model_name)
+        except (sqlite3.Error, ValueError) as e:
+            # ValueError: response has no text (e.g. blocked); just don't cache it
+            console.print(f"[yellow]Could not store response in LLM cache: {e}[/yellow]")
+        return response
+
+    def _generate_streamed(self, prompt, kwargs: dict):
+        """Streams like the model; a cache hit is one chunk, and a fully received stream is stored for next time."""
+        key = self._cache_key(prompt, kwargs) # Same key as the unstreamed request
+        try:
+            cached_text = self.cache.get(key)
+        except sqlite3.Error as e:
+            console.print(f"[yellow]LLM cache lookup failed, calling the model directly: {e}[/yellow]")
+            cached_text = None
+        if cached_text is not None:
+            set_span_attribute('cache_hits', 1, increment=True)
+            return iter([CachedResponse(cached_text)])
+        return self._store_stream(key, self._model.generate_content(prompt, **kwargs))
+
+    def _store_stream(self, key: str, chunks):
+        texts = []
+        for chunk in chunks:
+            texts.append(chunk.text)
+            yield chunk
+        try:
+            self.cache.set(key, "".join(texts), self.model_name)
+        except (sqlite3.Error, ValueError) as e:
+            console.print(f"[yellow]Could not store response in LLM cache: {e}[/yellow]")
+
+    async def generate_content_async(self, prompt, **kwargs):
+        """Non-blocking generate_content; the SQLite lookups and writes run in a worker thread."""
+        key = self._cache_key(prompt, kwargs)
+        try:
+            cached_text = await asyncio.to_thread(self.cache.get, key)
+        except sqlite3.Error as e:
+            console.print(f"[yellow]LLM cache lookup failed, calling the model directly: {e}[/yellow]")
+            cached_text = None
+        if cached_text is not None:
+            set_span_attribute('cache_hits', 1, increment=True)
+            if kwargs.get('stream'):
+                return _single_chunk_async(CachedResponse(cached_text))
+            return CachedResponse(cached_text)
+
+        response = await self._model.generate_content_async(prompt, **kwargs)
+        if kwargs.get('stream'):
+            return self._store_stream_async(key, response)
+        await self._store_async(key, response)
+        return response
+
+    async def _store_async(self, key: str, response):
+        try:
+            await asyncio.to_thread(self.cache.set, key, response.text, self.model_name)
+        except (sqlite3.Error, ValueError) as e:
+            console.print(f"[yellow]Could not store response in LLM cache: {e}[/yellow]")
+
+    async def _store_stream_async(self, key: str, chunks):
+        texts = []
+        async for chunk in chunks:
+            texts.append(chunk.text)
+            yield chunk
+        await self._store_async(key, CachedResponse("".join(texts)))
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+async def _single_chunk_async(chunk):
+    yield chunk
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+def get_llm_cache(path: str = DEFAULT_CACHE_PATH) -> LLMResponseCache:
+    """Returns the process-wide cache instance for `path`, creating it on first use."""
+    with _shared_caches_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = LLMResponseCache(path)
+        return _shared_caches[path]
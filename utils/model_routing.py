@@ -0,0 +1,93 @@
+# utils/model_routing.py
+import os
+import json
+from rich.console import Console
+from utils.tracing import register_cost_function
+
+console = Console()
+
+# Pipeline stages that can use their own Gemini model:
+#   analysis  - topic analysis (subtopics and tone)
+#   intro     - introduction and conclusion
+#   sections  - body sections (and the whole post in single-request mode)
+#   seo       - SEO title and meta description
+MODEL_STAGES = ('analysis', 'intro', 'sections', 'seo')
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# USD per 1M (prompt, response) tokens, from the public Gemini API price list.
+# Add or override entries with GEMINI_MODEL_PRICES='{"model": [input, output]}'.
+MODEL_PRICES = {
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-2.0-flash-lite': (0.075, 0.30),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-flash-8b': (0.0375, 0.15),
+    'gemini-1.5-pro': (1.25, 5.00),
+    'gemini-2.5-flash': (0.30, 2.50),
+    'gemini-2.5-flash-lite': (0.10, 0.40),
+    'gemini-2.5-pro': (1.25, 10.00),
+}
+try:
+    MODEL_PRICES.update({name: tuple(prices) for name, prices in json.loads(os.getenv("GEMINI_MODEL_PRICES", "{}")).items()})
+except (ValueError, TypeError, AttributeError) as e:
+    console.print(f"[yellow]Ignoring invalid GEMINI_MODEL_PRICES: {e}[/yellow]")
+
+
+def _base_model_name(model_name: str) -> str:
+    return (model_name or "").split("/")[-1] # 'models/gemini-2.0-flash' -> 'gemini-2.0-flash'
+
+def token_cost(model_name: str, prompt_tokens: int, response_tokens: int):
+    """USD cost of a model's token usage, or None if the model has no known price."""
+    prices = MODEL_PRICES.get(_base_model_name(model_name))
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + response_tokens * prices[1]) / 1_000_000
+
+register_cost_function(token_cost) # Trace summaries price model calls with MODEL_PRICES
+
+def stage_models(overrides: dict = None) -> dict:
+    """
+    The model for every stage: `overrides`, then GEMINI_MODEL_<STAGE>
+    (e.g. GEMINI_MODEL_ANALYSIS=gemini-2.0-flash-lite), then GEMINI_MODEL.
+    """
+    overrides = overrides or {}
+    unknown = set(overrides) - set(MODEL_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {', '.join(sorted(unknown))}. Choose from: {', '.join(MODEL_STAGES)}")
+    return {
+        stage: overrides.get(stage) or os.getenv(f"GEMINI_MODEL_{stage.upper()}") or DEFAULT_MODEL
+        for stage in MODEL_STAGES
+    }
+
+def parse_stage_models(specs: list) -> dict:
+    """Parses CLI 'stage=model' pairs (e.g. ['analysis=gemini-2.0-flash-lite']); raises ValueError on bad input."""
+    overrides = {}
+    for spec in specs or []:
+        stage, separator, model_name = spec.partition("=")
+        if not separator or not stage.strip() or not model_name.strip():
+            raise ValueError(f"Expected STAGE=MODEL, got '{spec}'.")
+        overrides[stage.strip()] = model_name.strip()
+    stage_models(overrides) # Validates the stage names
+    return overrides
+
+
+class ModelRouter:
+    """
+    The Gemini client for each pipeline stage (see MODEL_STAGES).
+
+    Stages without their own client use `default`. Stages that share a model
+    share one client instance (and its connections, rate limiter and cache).
+    """
+
+    def __init__(self, default, clients: dict = None):
+        self.default = default
+        self.clients = dict(clients or {})
+
+    def for_stage(self, stage: str):
+        return self.clients.get(stage) or self.default
+
+    def describe(self) -> dict:
+        """{stage: model name}, as recorded in metadata.json."""
+        return {stage: getattr(self.for_stage(stage), 'model_name', 'unknown') for stage in MODEL_STAGES}
+
+    def __bool__(self):
+        return bool(self.default)
@@ -0,0 +1,182 @@
+# utils/near_duplicates.py
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from rich.console import Console
+
+console = Console()
+
+INDEX_DIRNAME = ".index" # Under the output directory, next to the tag index
+INDEX_FILENAME = "near_duplicates.sqlite3"
+
+NUM_PERM = 64
+BANDS = 16 # 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a bucket
+ROWS_PER_BAND = NUM_PERM // BANDS
+TOPIC_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_TOPIC_THRESHOLD", "0.7"))
+CONTENT_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_CONTENT_THRESHOLD", "0.5"))
+CONTENT_SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1) # Fixed seed: signatures must be comparable across processes and runs
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'into', 'is', 'it', 'its',
+    'of', 'on', 'or', 'the', 'to', 'vs', 'what', 'why', 'with', 'your', 'you', 'guide', 'introduction',
+}
+
+
+def topic_tokens(topic: str) -> set:
+    """Order-insensitive topic words: lowercased, without stopwords, possessives or plural 's'."""
+    tokens = set()
+    for token in re.findall(r"\w+", topic.lower()):
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.add(token)
+    return tokens
+
+def content_shingles(text: str, size: int = CONTENT_SHINGLE_SIZE) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash(shingles: set) -> list:
+    """MinHash signature (NUM_PERM values) of a shingle set."""
+    hashes = [_hash(shingle) for shingle in shingles]
+    if not hashes:
+        return [_MERSENNE_PRIME] * NUM_PERM
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def band_keys(signature: list) -> list:
+    return [
+        hashlib.blake2b(repr(signature[i:i + ROWS_PER_BAND]).encode("ascii"), digest_size=8).hexdigest()
+        for i in range(0, NUM_PERM, ROWS_PER_BAND)
+    ]
+
+def estimated_similarity(signature_a: list, signature_b: list) -> float:
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERM
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of exported posts, by topic and by content.
+
+    Each post gets a topic signature (over its normalized topic words) and a
+    content signature (over word 5-grams), split into LSH bands stored in
+    SQLite. A lookup only compares against posts sharing at least one band, so
+    it stays fast on large catalogs. Topic candidates are confirmed with the
+    exact Jaccard similarity of the stored word sets.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS posts ("
+                " slug TEXT PRIMARY KEY, topic TEXT NOT NULL, tone TEXT, topic_tokens TEXT NOT NULL,"
+                " topic_signature TEXT NOT NULL, content_signature TEXT NOT NULL,"
+                " md_path TEXT, json_path TEXT, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " kind TEXT NOT NULL, band INTEGER NOT NULL, bucket TEXT NOT NULL, slug TEXT NOT NULL,"
+                " PRIMARY KEY (kind, band, bucket, slug)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_slug ON bands(slug)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add_post(self, slug: str, topic: str, tone: str, content: str, md_path: str = None, json_path: str = None):
+        """Indexes (or re-indexes) one exported post."""
+        tokens = topic_tokens(topic)
+        topic_signature = minhash(tokens)
+        content_signature = minhash(content_shingles(content))
+        rows = [('topic', band, bucket, slug) for band, bucket in enumerate(band_keys(topic_signature))]
+        rows += [('content', band, bucket, slug) for band, bucket in enumerate(band_keys(content_signature))]
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM bands WHERE slug = ?", (slug,))
+            conn.execute(
+                "INSERT OR REPLACE INTO posts (slug, topic, tone, topic_tokens, topic_signature, content_signature, md_path, json_path, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (slug, topic, tone, json.dumps(sorted(tokens)), json.dumps(topic_signature),
+                 json.dumps(content_signature), md_path, json_path, time.time())
+            )
+            conn.executemany("INSERT OR IGNORE INTO bands (kind, band, bucket, slug) VALUES (?, ?, ?, ?)", rows)
+
+    def remove_post(self, slug: str):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM bands WHERE slug = ?", (slug,))
+            conn.execute("DELETE FROM posts WHERE slug = ?", (slug,))
+
+    def _candidates(self, conn, kind: str, signature: list) -> list:
+        clauses = " OR ".join("(band = ? AND bucket = ?)" for _ in range(BANDS))
+        params = [value for band, bucket in enumerate(band_keys(signature)) for value in (band, bucket)]
+        slugs = [row[0] for row in conn.execute(f"SELECT DISTINCT slug FROM bands WHERE kind = ? AND ({clauses})", [kind] + params)]
+        if not slugs:
+            return []
+        placeholders = ",".join("?" * len(slugs))
+        return conn.execute(
+            f"SELECT slug, topic, tone, topic_tokens, topic_signature, content_signature, md_path, json_path"
+            f" FROM posts WHERE slug IN ({placeholders})", slugs
+        ).fetchall()
+
+    def find_similar_topic(self, topic: str, threshold: float = TOPIC_THRESHOLD) -> list:
+        """Posts whose topic word sets have Jaccard similarity >= threshold, best first."""
+        tokens = topic_tokens(topic)
+        if not tokens:
+            return []
+        with self._connect() as conn:
+            rows = self._candidates(conn, 'topic', minhash(tokens))
+        matches = []
+        for slug, other_topic, tone, other_tokens, _, _, md_path, json_path in rows:
+            similarity = jaccard(tokens, set(json.loads(other_tokens)))
+            if similarity >= threshold:
+                matches.append({'slug': slug, 'topic': other_topic, 'tone': tone, 'similarity': round(similarity, 3),
+                                'md_path': md_path, 'json_path': json_path})
+        return sorted(matches, key=lambda match: -match['similarity'])
+
+    def find_similar_content(self, content: str, threshold: float = CONTENT_THRESHOLD, exclude_slug: str = None) -> list:
+        """Posts whose content MinHash similarity (estimated Jaccard of word 5-grams) is >= threshold, best first."""
+        signature = minhash(content_shingles(content))
+        with self._connect() as conn:
+            rows = self._candidates(conn, 'content', signature)
+        matches = []
+        for slug, other_topic, _, _, _, other_signature, _, _ in rows:
+            if slug == exclude_slug:
+                continue
+            similarity = estimated_similarity(signature, json.loads(other_signature))
+            if similarity >= threshold:
+                matches.append({'slug': slug, 'topic': other_topic, 'similarity': round(similarity, 3)})
+        return sorted(matches, key=lambda match: -match['similarity'])
+
+
+_shared_indexes = {}
+_shared_indexes_lock = threading.Lock()
+
+def get_near_duplicate_index(output_dir: str) -> NearDuplicateIndex:
+    """Returns the process-wide near-duplicate index for posts exported to `output_dir`."""
+    path = os.path.join(output_dir, INDEX_DIRNAME, INDEX_FILENAME)
+    with _shared_indexes_lock:
+        if path not in _shared_indexes:
+            _shared_indexes[path] = NearDuplicateIndex(path)
+        return _shared_indexes[path]
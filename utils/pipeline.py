@@ -0,0 +1,101 @@
+# utils/pipeline.py
+import asyncio
+import time
+from utils.tracing import span
+
+
+class StageError(Exception):
+    """Raised by a stage to abort the pipeline with a user-facing message."""
+
+
+class StageGraph:
+    """
+    Minimal async dependency-graph scheduler.
+
+    Each stage is an async callable that receives the dict of results produced
+    so far and returns its own result. A stage starts as soon as all of its
+    dependencies have finished, so independent stages overlap. If a stage
+    raises, every stage depending on it is cancelled and the first error is
+    re-raised from run().
+    """
+
+    def __init__(self):
+        self.stages = {} # name -> (func, deps), in insertion order
+        self.timings = {} # name -> {'start': s, 'end': s, 'duration': s} relative to run start
+        self.results = {} # name -> result of the last run (kept even if a later stage fails)
+
+    def add_stage(self, name: str, func, deps=()):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (func, tuple(deps))
+        return self
+
+    def describe(self) -> list:
+        """Returns the graph as a list of {'name', 'deps'} in declaration order."""
+        return [{'name': name, 'deps': list(deps)} for name, (_, deps) in self.stages.items()]
+
+    def critical_path(self) -> list:
+        """Returns the chain of stages that determined the end-to-end time of the last run."""
+        if not self.timings:
+            return []
+        path = []
+        name = max(self.timings, key=lambda n: self.timings[n]['end'])
+        while name:
+            path.append(name)
+            deps = [d for d in self.stages[name][1] if d in self.timings]
+            name = max(deps, key=lambda d: self.timings[d]['end']) if deps else None
+        return list(reversed(path))
+
+    async def run(self, on_event=None) -> dict:
+        """
+        Executes every stage and returns {stage_name: result}.
+        `on_event(stage_name, status, info)` is called with status 'started',
+        'completed' or 'failed' (info holds elapsed seconds or the error).
+        """
+        results = self.results = {}
+        tasks = {}
+        self.timings = {}
+        run_start = time.perf_counter()
+
+        def notify(name, status, info=None):
+            if on_event:
+                try:
+                    on_event(name, status, info)
+                except Exception:
+                    pass # Progress reporting must never break the pipeline
+
+        async def run_stage(name, func, deps):
+            if deps:
+                await asyncio.gather(*(tasks[dep] for dep in deps))
+            start = time.perf_counter()
+            notify(name, 'started')
+            try:
+                with span(f"stage:{name}"):
+                    result = await func(results)
+            except Exception as e:
+                notify(name, 'failed', e)
+                raise
+            finally:
+                end = time.perf_counter()
+                self.timings[name] = {
+                    'start': round(start - run_start, 4),
+                    'end': round(end - run_start, 4),
+                    'duration': round(end - start, 4),
+                }
+            results[name] = result
+            notify(name, 'completed', self.timings[name]['duration'])
+            return result
+
+        # Stages are declared after their deps, so every dep task exists first
+        for name, (func, deps) in self.stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, func, deps))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            # Let cancelled tasks finish unwinding before returning
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return results
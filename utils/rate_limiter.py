@@ -0,0 +1,297 @@
+# utils/rate_limiter.py
+import os
+import time
+import random
+import asyncio
+import threading
+import email.utils
+from rich.console import Console
+from utils.tracing import span, set_span_attribute, record_token_usage, record_model_call
+from utils.hedging import get_hedger
+from utils.circuit_breaker import get_circuit_breaker, CircuitOpenError, OPEN
+
+console = Console()
+
+# Requests per minute and burst size per provider. Set these to the quota of
+# your plan (e.g. GEMINI_RATE_LIMIT_RPM=2000) so throughput sits at the ceiling.
+PROVIDER_LIMITS = {
+    'gemini': (float(os.getenv("GEMINI_RATE_LIMIT_RPM", "60")), int(os.getenv("GEMINI_RATE_LIMIT_BURST", "10"))),
+    'newsdata': (float(os.getenv("NEWSDATA_RATE_LIMIT_RPM", "30")), int(os.getenv("NEWSDATA_RATE_LIMIT_BURST", "5"))),
+    'datamuse': (float(os.getenv("DATAMUSE_RATE_LIMIT_RPM", "600")), int(os.getenv("DATAMUSE_RATE_LIMIT_BURST", "20"))),
+    'quotable': (float(os.getenv("QUOTABLE_RATE_LIMIT_RPM", "180")), int(os.getenv("QUOTABLE_RATE_LIMIT_BURST", "10"))),
+}
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Per attempt: a Gemini request (or a stream's first chunk) taking longer is retried
+GEMINI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("GEMINI_REQUEST_TIMEOUT_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("API_MAX_ATTEMPTS", "4"))
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every caller of one provider.
+
+    A caller reserves a token immediately and is told how long to wait for it,
+    so concurrent callers queue up at the configured rate instead of bursting
+    and backing off together. `pause()` blocks the whole bucket, e.g. after a
+    Retry-After header.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes one token and returns the number of seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """Returns the process-wide token bucket for `provider`."""
+    with _buckets_lock:
+        if provider not in _buckets:
+            rate_per_minute, burst = PROVIDER_LIMITS.get(provider, (60.0, 5))
+            _buckets[provider] = TokenBucket(rate_per_minute, burst)
+        return _buckets[provider]
+
+
+# --- Retry helpers ---
+def _parse_retry_after(value) -> float:
+    """Parses a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _error_details(exc):
+    """Extracts (status_code, retry_after_seconds) from aiohttp, requests and Google API errors."""
+    status = getattr(exc, 'status', None) # aiohttp.ClientResponseError
+    headers = getattr(exc, 'headers', None)
+    response = getattr(exc, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None) # requests.HTTPError
+        headers = getattr(response, 'headers', None) or headers
+    if status is None and isinstance(getattr(exc, 'code', None), int):
+        status = exc.code # google.api_core.exceptions.GoogleAPICallError
+    retry_after = None
+    if headers:
+        try:
+            retry_after = _parse_retry_after(headers.get('Retry-After'))
+        except AttributeError:
+            pass
+    return status, retry_after
+
+def _is_retryable(exc, status) -> bool:
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # No status: retry transport-level failures (timeouts, dropped connections)
+    return isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)) or type(exc).__name__ in (
+        'ServerDisconnectedError', 'ClientConnectionError', 'ClientConnectorError', 'ClientOSError',
+        'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout',
+        'ServiceUnavailable', 'DeadlineExceeded', 'ResourceExhausted', 'InternalServerError',
+    )
+
+def _is_outage(exc) -> bool:
+    """Whether a failed attempt counts against the provider's circuit breaker (throttling and 4xx don't)."""
+    status, _ = _error_details(exc)
+    return status != 429 and _is_retryable(exc, status)
+
+def _record_error(breaker, exc):
+    """An outage counts toward opening the circuit; any other error (429, 4xx) means
+    the provider answered, so it ends the run of consecutive failures like a success."""
+    if _is_outage(exc):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+def _before_attempt(breaker):
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        set_span_attribute('short_circuited', 1, increment=True)
+        raise
+
+def _backoff_delay(provider: str, exc, attempt: int):
+    """Returns the delay before the next attempt, or None if `exc` should not be retried."""
+    status, retry_after = _error_details(exc)
+    if not _is_retryable(exc, status):
+        return None
+    if retry_after is not None:
+        # Everyone sharing this provider waits, not just the caller that got the 429
+        get_rate_limiter(provider).pause(retry_after)
+        return retry_after + random.uniform(0, BASE_BACKOFF_SECONDS)
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt))
+
+def call_with_retry(provider: str, func, *args, max_attempts: int = MAX_ATTEMPTS, **kwargs):
+    """
+    Calls `func` under the provider's rate limit, retrying throttled/transient failures.
+    Raises CircuitOpenError without calling `func` while the provider's circuit is open.
+    """
+    limiter = get_rate_limiter(provider)
+    breaker = get_circuit_breaker(provider)
+    with span(f"{provider}.call"):
+        for attempt in range(max_attempts):
+            _before_attempt(breaker)
+            limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+                breaker.record_success()
+                return result
+            except Exception as e:
+                _record_error(breaker, e)
+                delay = _backoff_delay(provider, e, attempt)
+                if delay is None or attempt == max_attempts - 1 or breaker.state == OPEN: # No point waiting to retry into an open circuit
+                    raise
+                console.print(f"[yellow]{provider} call failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 2}/{max_attempts})[/yellow]")
+                set_span_attribute('retries', 1, increment=True)
+                time.sleep(delay)
+
+async def call_with_retry_async(provider: str, coro_factory, max_attempts: int = MAX_ATTEMPTS):
+    """Async variant of call_with_retry; `coro_factory` must return a fresh coroutine per attempt."""
+    limiter = get_rate_limiter(provider)
+    breaker = get_circuit_breaker(provider)
+    with span(f"{provider}.call"):
+        for attempt in range(max_attempts):
+            _before_attempt(breaker)
+            await limiter.acquire_async()
+            try:
+                result = await coro_factory()
+                breaker.record_success()
+                return result
+            except Exception as e:
+                _record_error(breaker, e)
+                delay = _backoff_delay(provider, e, attempt)
+                if delay is None or attempt == max_attempts - 1 or breaker.state == OPEN:
+                    raise
+                console.print(f"[yellow]{provider} call failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 2}/{max_attempts})[/yellow]")
+                set_span_attribute('retries', 1, increment=True)
+                await asyncio.sleep(delay)
+
+
+def _record_stream_usage(chunks, model_name: str, started: float):
+    last_chunk = None
+    for chunk in chunks:
+        last_chunk = chunk
+        yield chunk
+    if last_chunk is not None:
+        record_token_usage(last_chunk)
+    record_model_call(model_name, time.perf_counter() - started, last_chunk)
+
+
+async def _record_stream_usage_async(chunks, model_name: str, started: float):
+    last_chunk = None
+    async for chunk in chunks:
+        last_chunk = chunk
+        yield chunk
+    if last_chunk is not None:
+        record_token_usage(last_chunk)
+    record_model_call(model_name, time.perf_counter() - started, last_chunk)
+
+
+async def _iterate_in_thread(chunks):
+    """Async iteration over a blocking iterator, one next() per worker-thread hop."""
+    iterator = iter(chunks)
+    done = object()
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+class RateLimitedGeminiModel:
+    """Wraps a Gemini GenerativeModel so generate_content(_async) goes through the shared 'gemini' limiter and retry policy."""
+
+    def __init__(self, model, provider: str = 'gemini'):
+        self._model = model
+        self.provider = provider
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self._model, 'model_name', 'unknown')
+
+    def generate_content(self, prompt, hedge: bool = False, **kwargs):
+        # hedge is accepted for parity with generate_content_async; blocking calls aren't hedged
+        started = None
+        def call():
+            nonlocal started
+            started = time.perf_counter() # Latency is measured for the attempt that succeeds
+            response = self._model.generate_content(prompt, **kwargs)
+            if not kwargs.get('stream'):
+                record_token_usage(response) # Attributed to the '<provider>.call' span
+                record_model_call(self.model_name, time.perf_counter() - started, response)
+            return response
+        # A streamed response is retried only until it starts; usage arrives with its last chunk
+        response = call_with_retry(self.provider, call)
+        return _record_stream_usage(response, self.model_name, started) if kwargs.get('stream') else response
+
+    async def generate_content_async(self, prompt, hedge: bool = False, **kwargs):
+        """
+        Non-blocking generate_content: waits for rate-limit tokens and retries without holding a thread.
+        Each attempt times out after GEMINI_REQUEST_TIMEOUT_SECONDS (for a stream: until its first chunk).
+        With hedge=True a straggling request is duplicated (utils.hedging) and the first answer wins.
+        """
+        stream = bool(kwargs.get('stream'))
+        async def request():
+            started = None
+            async def call():
+                nonlocal started
+                started = time.perf_counter()
+                if hasattr(self._model, 'generate_content_async'):
+                    pending = self._model.generate_content_async(prompt, **kwargs)
+                else: # A model without an async API still mustn't block the loop
+                    pending = asyncio.to_thread(self._model.generate_content, prompt, **kwargs)
+                response = await asyncio.wait_for(pending, GEMINI_REQUEST_TIMEOUT_SECONDS)
+                if not stream:
+                    record_token_usage(response)
+                    record_model_call(self.model_name, time.perf_counter() - started, response)
+                return response
+            response = await call_with_retry_async(self.provider, call)
+            if not stream:
+                return response
+            if not hasattr(response, '__aiter__'): # Sync chunk iterator from the to_thread fallback
+                response = _iterate_in_thread(response)
+            return _record_stream_usage_async(response, self.model_name, started)
+        if hedge:
+            return await get_hedger((self.model_name, 'stream' if stream else 'request')).run(request)
+        return await request()
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
@@ -0,0 +1,156 @@
+# utils/streaming.py
+import os
+import threading
+from pathlib import Path
+from utils.checkpoint import RUNS_DIRNAME, run_key
+
+PARTIAL_FILENAME = "post.partial.md"
+
+
+def partial_markdown_path(output_dir: str, topic: str, tone: str) -> Path:
+    """Where a streaming run appends its Markdown as it is written: <output_dir>/.runs/<topic-tone-key>/post.partial.md."""
+    return Path(output_dir) / RUNS_DIRNAME / run_key(topic, tone) / PARTIAL_FILENAME
+
+
+class PostStream:
+    """
+    Assembles a post from parts (introduction, sections, conclusion) written concurrently, as their text arrives.
+
+    Writers call append(index, text) with each new piece of a part and
+    finish(index, final_text) with the part's final text, which replaces what
+    was streamed if it differs (e.g. a failed section's error placeholder).
+    Parts are joined with "\\n", so the finished stream equals the post
+    generate_blog_post returns.
+
+    Two kinds of listeners:
+      * on_part(index, text, replace): every piece as it arrives, in any part order
+        (for UIs that show all sections filling in at once).
+      * ordered writers (write(text), restart(text)): only the document-order
+        prefix, e.g. a terminal or an append-only file. Later parts are held
+        back until the ones before them finish. If text already written had
+        to be replaced, restart() gets the prefix before that part, and the
+        replacement follows through write().
+
+    Thread-safe: listeners are called under one lock, in order.
+    """
+
+    def __init__(self, part_count: int, on_part=None, writers=()):
+        self.part_count = part_count
+        self.on_part = on_part
+        self.writers = list(writers)
+        self._parts = [""] * part_count
+        self._finished = [False] * part_count
+        self._head = 0 # First part not yet fully written in order
+        self._head_written = 0 # Characters of the head part already written
+        self._ordered = [] # Everything given to the ordered writers so far
+        self._lock = threading.Lock()
+
+    def text(self) -> str:
+        """Everything received so far, in document order (parts still being written included)."""
+        with self._lock:
+            return "\n".join(part for part in self._parts if part)
+
+    def append(self, index: int, text: str):
+        if not text:
+            return
+        with self._lock:
+            if self._finished[index]:
+                return
+            self._parts[index] += text
+            self._notify(index, text, False)
+            self._advance()
+
+    def finish(self, index: int, final_text: str):
+        with self._lock:
+            if self._finished[index]:
+                return
+            streamed = self._parts[index]
+            self._finished[index] = True
+            if final_text.startswith(streamed):
+                self._parts[index] = final_text
+                self._notify(index, final_text[len(streamed):], False)
+            else:
+                self._parts[index] = final_text
+                self._notify(index, final_text, True)
+                if index == self._head and self._head_written:
+                    # The ordered output already holds a prefix of the replaced text: rewrite it
+                    del self._ordered[len(self._ordered) - 1]
+                    self._head_written = 0
+                    ordered_text = "".join(self._ordered)
+                    for writer in self.writers:
+                        writer.restart(ordered_text)
+            self._advance()
+
+    def _notify(self, index: int, text: str, replace: bool):
+        if self.on_part and (text or replace):
+            self.on_part(index, text, replace)
+
+    def _emit(self, text: str):
+        if not text:
+            return
+        self._ordered.append(text)
+        for writer in self.writers:
+            writer.write(text)
+
+    def _advance(self):
+        while self._head < self.part_count:
+            part = self._parts[self._head]
+            if len(part) > self._head_written:
+                if self._head_written:
+                    self._ordered[-1] += part[self._head_written:] # Keep one entry per part, for restart()
+                    for writer in self.writers:
+                        writer.write(part[self._head_written:])
+                else:
+                    self._emit(part)
+                self._head_written = len(part)
+            if not self._finished[self._head]:
+                return
+            self._head += 1
+            self._head_written = 0
+            if self._head < self.part_count:
+                self._emit("\n") # Separator between parts, as in "\n".join(parts)
+
+
+class FileWriter:
+    """Ordered writer that appends to a Markdown file (flushed per write, so `tail -f` follows along)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def write(self, text: str):
+        self._file.write(text)
+        self._file.flush()
+
+    def restart(self, text: str):
+        self._file.seek(0)
+        self._file.truncate()
+        self.write(text)
+
+    def close(self, remove: bool = False):
+        self._file.close()
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class ConsoleWriter:
+    """Ordered writer that prints the post to a rich Console as it streams."""
+
+    def __init__(self, console):
+        self.console = console
+
+    def write(self, text: str):
+        self.console.out(text, end="", highlight=False)
+
+    def restart(self, text: str):
+        # Earlier output can't be unprinted; the replacement part follows via write()
+        self.console.print("\n[yellow]--- the part above was replaced: ---[/yellow]")
+
+
+def assemble_parts(parts: dict) -> str:
+    """Rebuilds the streamed post from {part index: text} (as collected from on_part events)."""
+    return "\n".join(parts[index] for index in sorted(parts) if parts[index])
@@ -0,0 +1,193 @@
+# utils/tag_index.py
+import os
+import re
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from collections import Counter
+from rich.console import Console
+
+console = Console()
+
+INDEX_DIRNAME = ".index" # Under the output directory
+INDEX_FILENAME = "tags.sqlite3"
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN.findall(text.lower())
+
+def term_counts(tokens: list) -> Counter:
+    """Unigram and bigram counts; bigrams are stored as 'word1 word2'."""
+    counts = Counter(tokens)
+    counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return counts
+
+def phrase_terms(phrase: str) -> list:
+    """Index terms that together stand for `phrase`: the word itself, or its bigrams."""
+    tokens = tokenize(phrase)
+    if len(tokens) <= 1:
+        return tokens
+    return [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class TagIndex:
+    """
+    SQLite-backed inverted index of exported posts, used for TF-IDF tag ranking.
+
+    Stores per-post unigram/bigram postings plus a document-frequency table
+    that is adjusted incrementally when a post is added or replaced, so
+    looking up the IDF of a handful of candidate tags never rescans the
+    corpus. Follows LLMResponseCache: WAL mode and a short-lived connection
+    per operation, safe across threads and processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS docs (slug TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL, slug TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (slug, term)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS df (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL") # Durable enough in WAL mode, and avoids an fsync per post
+        return conn
+
+    def _remove(self, conn, slug: str):
+        terms = [row[0] for row in conn.execute("SELECT term FROM postings WHERE slug = ?", (slug,))]
+        if not terms:
+            return
+        conn.executemany("UPDATE df SET df = df - 1 WHERE term = ?", ((term,) for term in terms))
+        conn.execute("DELETE FROM df WHERE df <= 0")
+        conn.execute("DELETE FROM postings WHERE slug = ?", (slug,))
+        conn.execute("DELETE FROM docs WHERE slug = ?", (slug,))
+
+    def _add(self, conn, slug: str, text: str):
+        tokens = tokenize(text)
+        counts = sorted(term_counts(tokens).items()) # Key order keeps B-tree writes local
+        self._remove(conn, slug)
+        conn.execute("INSERT INTO docs (slug, length) VALUES (?, ?)", (slug, len(tokens)))
+        conn.executemany("INSERT INTO postings (term, slug, tf) VALUES (?, ?, ?)",
+                         ((term, slug, tf) for term, tf in counts))
+        conn.executemany(
+            "INSERT INTO df (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+            ((term,) for term, _ in counts)
+        )
+
+    def add_document(self, slug: str, text: str):
+        """Indexes (or re-indexes) one post; only its own terms are touched."""
+        with self._lock, self._connect() as conn:
+            self._add(conn, slug, text)
+
+    def add_documents(self, documents, batch_size: int = 500) -> int:
+        """Indexes many (slug, text) pairs, committing every `batch_size` posts; returns the number indexed."""
+        indexed = 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                for slug, text in documents:
+                    self._add(conn, slug, text)
+                    indexed += 1
+                    if indexed % batch_size == 0:
+                        conn.commit()
+                conn.commit()
+            finally:
+                conn.close()
+        return indexed
+
+    def remove_document(self, slug: str):
+        with self._lock, self._connect() as conn:
+            self._remove(conn, slug)
+
+    def document_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def document_frequencies(self, terms) -> dict:
+        terms = list(set(terms))
+        if not terms:
+            return {}
+        with self._connect() as conn:
+            frequencies = {}
+            for start in range(0, len(terms), 500): # Stay under SQLite's bound-parameter limit
+                chunk = terms[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                frequencies.update(conn.execute(f"SELECT term, df FROM df WHERE term IN ({placeholders})", chunk).fetchall())
+            return frequencies
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM df")
+            conn.execute("DELETE FROM docs")
+
+    def rebuild(self, output_dir: str) -> int:
+        """Re-indexes every exported post (<output_dir>/<slug>/<slug>.md) from scratch; returns the number indexed."""
+        def exported_posts():
+            for md_path in sorted(Path(output_dir).glob("*/*.md")):
+                if md_path.stem != md_path.parent.name:
+                    continue
+                try:
+                    yield md_path.stem, md_path.read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError) as e:
+                    console.print(f"[yellow]Skipping '{md_path}': {e}[/yellow]")
+
+        self.clear()
+        return self.add_documents(exported_posts())
+
+
+def rank_tags(candidates: list, text: str, index: TagIndex = None, limit: int = 15) -> list:
+    """
+    Orders candidate tags by TF-IDF of their terms in `text` against the indexed corpus.
+
+    TF is sublinear (1 + log tf) over the tag's word, or its least frequent
+    bigram for phrases; IDF is smoothed, log((N + 1) / (df + 1)) + 1. Without
+    an index, or with an empty one, this is plain TF ranking. Ties keep the
+    candidates' original order (e.g. Datamuse relevance).
+    """
+    counts = term_counts(tokenize(text))
+    candidate_terms = {tag: phrase_terms(tag) for tag in candidates}
+    document_count, frequencies = 0, {}
+    if index is not None:
+        try:
+            document_count = index.document_count()
+            frequencies = index.document_frequencies(term for terms in candidate_terms.values() for term in terms)
+        except sqlite3.Error as e:
+            console.print(f"[yellow]Tag index unavailable, ranking by term frequency only: {e}[/yellow]")
+
+    def score(tag):
+        terms = candidate_terms[tag]
+        if not terms:
+            return 0.0
+        tf = min(counts.get(term, 0) for term in terms)
+        if tf == 0:
+            return 0.0
+        df = min(frequencies.get(term, 0) for term in terms) # A phrase is no more common than its rarest bigram
+        return (1 + math.log(tf)) * (math.log((document_count + 1) / (df + 1)) + 1)
+
+    scored = [(score(tag), position, tag) for position, tag in enumerate(candidates)]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [tag for _, _, tag in scored[:limit]]
+
+
+_shared_indexes = {}
+_shared_indexes_lock = threading.Lock()
+
+def get_tag_index(output_dir: str) -> TagIndex:
+    """Returns the process-wide index for posts exported to `output_dir`."""
+    path = os.path.join(output_dir, INDEX_DIRNAME, INDEX_FILENAME)
+    with _shared_indexes_lock:
+        if path not in _shared_indexes:
+            _shared_indexes[path] = TagIndex(path)
+        return _shared_indexes[path]
@@ -0,0 +1,111 @@
+# utils/text_analytics.py
+"""
+Word, sentence and syllable statistics plus readability indices in one pass.
+
+Results match textstat (en_US, default rounding) for the indices computed
+here, but the text is tokenized once and every metric is derived from those
+counts, instead of each textstat function re-tokenizing and re-counting
+syllables. Syllables come from the CMU dictionary with a pyphen fallback,
+like textstat, behind a process-wide per-word cache.
+"""
+import re
+import math
+import threading
+from functools import lru_cache
+
+WORDS_PER_MINUTE = 200 # Reading speed for reading_time_minutes
+SYLLABLE_CACHE_SIZE = 65536
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s")
+_SENTENCE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+
+_dictionaries = None
+_dictionaries_lock = threading.Lock()
+
+
+def _get_dictionaries():
+    """Loads the CMU pronouncing dictionary and the en_US hyphenator on first use (~1 s)."""
+    global _dictionaries
+    if _dictionaries is None:
+        with _dictionaries_lock:
+            if _dictionaries is None:
+                import cmudict # Deferred: large dictionaries, only needed for SEO metrics
+                from pyphen import Pyphen
+                _dictionaries = (cmudict.dict(), Pyphen(lang="en_US"))
+    return _dictionaries
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def count_syllables(word: str) -> int:
+    """Syllables in one lowercase, punctuation-free word (CMU dict vowel stresses, else pyphen hyphenation points + 1)."""
+    cmu_dict, hyphenator = _get_dictionaries()
+    pronunciations = cmu_dict.get(word)
+    if pronunciations:
+        return sum(1 for phone in pronunciations[0] if phone[-1].isdigit())
+    return len(hyphenator.positions(word)) + 1
+
+def _round(number: float, points: int = 0) -> float:
+    """textstat's half-away-from-zero rounding, applied at the same steps so results agree exactly."""
+    p = 10 ** points
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+def _ratio(numerator: float, denominator: float, points: int) -> float:
+    return _round(numerator / denominator, points) if denominator else 0.0
+
+
+def analyze_text(text: str) -> dict:
+    """
+    Returns counts, reading time and readability indices for `text`.
+
+    Keys: word_count, sentence_count, syllable_count, char_count, letter_count,
+    polysyllable_count, reading_time_minutes, flesch_reading_ease,
+    flesch_kincaid_grade, smog_index, coleman_liau_index,
+    automated_readability_index.
+    """
+    # --- Word pass: every per-word count comes from this one tokenization ---
+    words = _PUNCTUATION.sub("", text).split()
+    word_count = len(words)
+    syllable_count = 0
+    polysyllable_count = 0
+    letter_count = 0
+    for word in words:
+        syllables = count_syllables(word.lower())
+        syllable_count += syllables
+        if syllables >= 3:
+            polysyllable_count += 1
+        letter_count += len(word)
+    char_count = len(text) - len(_WHITESPACE.findall(text))
+
+    # --- Sentence pass: fragments of two words or fewer don't count as sentences ---
+    sentences = _SENTENCE.findall(text)
+    short_fragments = sum(1 for sentence in sentences if len(_PUNCTUATION.sub("", sentence).split()) <= 2)
+    sentence_count = max(1, len(sentences) - short_fragments)
+
+    # --- Indices (textstat's formulas and intermediate rounding) ---
+    avg_sentence_length = _ratio(word_count, sentence_count, 1)
+    avg_syllables_per_word = _ratio(syllable_count, word_count, 1)
+    letters_per_100_words = _round(_ratio(letter_count, word_count, 2) * 100, 2)
+    sentences_per_100_words = _round(_ratio(sentence_count, word_count, 2) * 100, 2)
+
+    if word_count:
+        automated_readability_index = _round(
+            4.71 * _round(char_count / word_count, 2) + 0.5 * _round(word_count / sentence_count, 2) - 21.43, 1
+        )
+    else:
+        automated_readability_index = 0.0
+    smog_index = _round(1.043 * (30 * (polysyllable_count / sentence_count)) ** .5 + 3.1291, 1) if sentence_count >= 3 else 0.0
+
+    return {
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'syllable_count': syllable_count,
+        'char_count': char_count,
+        'letter_count': letter_count,
+        'polysyllable_count': polysyllable_count,
+        'reading_time_minutes': round(word_count / WORDS_PER_MINUTE),
+        'flesch_reading_ease': _round(206.835 - 1.015 * avg_sentence_length - 84.6 * avg_syllables_per_word, 2),
+        'flesch_kincaid_grade': _round(0.39 * avg_sentence_length + 11.8 * avg_syllables_per_word - 15.59, 1),
+        'smog_index': smog_index,
+        'coleman_liau_index': _round(0.058 * letters_per_100_words - 0.296 * sentences_per_100_words - 15.8, 2),
+        'automated_readability_index': automated_readability_index,
+    }
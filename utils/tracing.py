@@ -0,0 +1,258 @@
+# utils/tracing.py
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from rich.console import Console
+
+console = Console()
+
+# The active trace and span follow the code through awaits, asyncio tasks and
+# asyncio.to_thread (which copy the context). Thread pools need
+# contextvars.copy_context().run to carry them over.
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+# Optional exports, also settable via configure_metrics_export()
+_metrics_config = {
+    'jsonl_path': os.getenv("BLOG_AGENT_METRICS_JSONL"),
+    'prometheus_path': os.getenv("BLOG_AGENT_METRICS_PROM"),
+}
+# cost(model_name, prompt_tokens, response_tokens) -> USD or None, set by register_cost_function()
+_cost_function = None
+# Callables returning process-wide Prometheus samples {(metric, labels): value}, see register_gauges()
+_gauge_providers = []
+
+
+class Span:
+    __slots__ = ('name', 'parent', 'start', 'end', 'attributes')
+
+    def __init__(self, name: str, parent, attributes: dict):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Trace:
+    """Collects the spans of one pipeline run. Safe to append to from worker threads."""
+
+    def __init__(self, name: str, attributes: dict = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.spans = []
+        self.start = time.perf_counter()
+        self.end = None
+        self.models = {} # model name -> calls, seconds and tokens of the requests it answered
+        self._lock = threading.Lock()
+
+    def _add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def _add_model_call(self, model_name: str, seconds: float, prompt_tokens: int, response_tokens: int):
+        with self._lock:
+            entry = self.models.setdefault(model_name, {'calls': 0, 'total_seconds': 0.0, 'prompt_tokens': 0, 'response_tokens': 0})
+            entry['calls'] += 1
+            entry['total_seconds'] += seconds
+            entry['prompt_tokens'] += prompt_tokens
+            entry['response_tokens'] += response_tokens
+
+    def summary(self) -> dict:
+        """Aggregates the spans into a JSON-serializable timing summary."""
+        with self._lock:
+            spans = list(self.spans)
+            model_calls = {name: dict(entry) for name, entry in self.models.items()}
+        per_name = {}
+        stages = {}
+        llm = {'calls': 0, 'cache_hits': 0, 'retries': 0, 'prompt_tokens': 0, 'response_tokens': 0}
+        short_circuited = {} # Per provider: calls refused by an open circuit breaker
+        for span in spans:
+            if span.end is None:
+                continue
+            entry = per_name.setdefault(span.name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            entry['count'] += 1
+            entry['total_seconds'] += span.duration
+            entry['max_seconds'] = max(entry['max_seconds'], span.duration)
+            if span.name.startswith("stage:"):
+                stages[span.name[len("stage:"):]] = round(span.duration, 4)
+            attrs = span.attributes
+            if span.name == 'gemini.call':
+                llm['calls'] += 1
+            llm['cache_hits'] += attrs.get('cache_hits', 0)
+            llm['retries'] += attrs.get('retries', 0)
+            llm['prompt_tokens'] += attrs.get('prompt_tokens', 0)
+            llm['response_tokens'] += attrs.get('response_tokens', 0)
+            if attrs.get('short_circuited') and span.name.endswith(".call"):
+                provider = span.name[:-len(".call")]
+                short_circuited[provider] = short_circuited.get(provider, 0) + attrs['short_circuited']
+        for entry in per_name.values():
+            entry['total_seconds'] = round(entry['total_seconds'], 4)
+            entry['max_seconds'] = round(entry['max_seconds'], 4)
+        # Per model: request latency (first byte to last chunk for streams) and token cost
+        llm['cost_usd'] = 0.0
+        for model_name, entry in model_calls.items():
+            entry['mean_seconds'] = round(entry['total_seconds'] / entry['calls'], 4)
+            entry['total_seconds'] = round(entry['total_seconds'], 4)
+            entry['cost_usd'] = _cost_function(model_name, entry['prompt_tokens'], entry['response_tokens']) if _cost_function else None
+            if entry['cost_usd'] is not None:
+                llm['cost_usd'] += entry['cost_usd']
+                entry['cost_usd'] = round(entry['cost_usd'], 6)
+        llm['cost_usd'] = round(llm['cost_usd'], 6)
+        return {
+            'total_seconds': round((self.end or time.perf_counter()) - self.start, 4),
+            'stages': stages,
+            'spans': per_name,
+            'llm': llm,
+            'models': model_calls,
+            'short_circuited': short_circuited,
+        }
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times a block as a child of the current span. A no-op (yields None) when
+    no trace is active, so instrumented code costs next to nothing outside runs.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        trace._add(current)
+
+def set_span_attribute(key: str, value, increment: bool = False):
+    """Sets (or with increment=True, adds to) an attribute of the current span, if any."""
+    current = _current_span.get()
+    if current is None:
+        return
+    if increment:
+        current.attributes[key] = current.attributes.get(key, 0) + value
+    else:
+        current.attributes[key] = value
+
+def record_token_usage(response):
+    """Copies Gemini usage_metadata token counts onto the current span."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    set_span_attribute('prompt_tokens', getattr(usage, 'prompt_token_count', 0) or 0, increment=True)
+    set_span_attribute('response_tokens', getattr(usage, 'candidates_token_count', 0) or 0, increment=True)
+
+def record_model_call(model_name: str, seconds: float, response=None):
+    """Adds one answered request (its latency and usage_metadata tokens) to the current trace's per-model totals."""
+    current = _current_trace.get()
+    if current is None:
+        return
+    usage = getattr(response, 'usage_metadata', None)
+    current._add_model_call(
+        model_name, seconds,
+        getattr(usage, 'prompt_token_count', 0) or 0, getattr(usage, 'candidates_token_count', 0) or 0
+    )
+
+def register_cost_function(cost):
+    """Sets how per-model token usage is priced in summaries (utils.model_routing registers token_cost)."""
+    global _cost_function
+    _cost_function = cost
+
+def register_gauges(provider):
+    """Adds a source of sampled (not summed) Prometheus values, e.g. circuit breaker states."""
+    _gauge_providers.append(provider)
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Starts a trace for one run; exports metrics (if configured) when it ends."""
+    new_trace = Trace(name, attributes)
+    trace_token = _current_trace.set(new_trace)
+    span_token = _current_span.set(None)
+    try:
+        yield new_trace
+    finally:
+        new_trace.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _export_metrics(new_trace)
+
+
+# --- Metrics export ---
+_prometheus_lock = threading.Lock()
+_prometheus_totals = {}
+
+def configure_metrics_export(jsonl_path: str = None, prometheus_path: str = None):
+    """Enables appending one JSON line per run and/or rewriting a Prometheus text-format file."""
+    if jsonl_path is not None:
+        _metrics_config['jsonl_path'] = jsonl_path
+    if prometheus_path is not None:
+        _metrics_config['prometheus_path'] = prometheus_path
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _export_metrics(finished: Trace):
+    jsonl_path = _metrics_config['jsonl_path']
+    prometheus_path = _metrics_config['prometheus_path']
+    if not jsonl_path and not prometheus_path:
+        return
+    try:
+        summary = finished.summary()
+        if jsonl_path:
+            line = json.dumps({'trace': finished.name, 'timestamp': time.time(), **finished.attributes, **summary}, default=str)
+            with open(jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        if prometheus_path:
+            _write_prometheus(summary, prometheus_path)
+    except Exception as e:
+        console.print(f"[yellow]Could not export metrics: {e}[/yellow]")
+
+def _write_prometheus(summary: dict, path: str):
+    """Accumulates process-wide totals and rewrites `path` atomically (node_exporter textfile style)."""
+    with _prometheus_lock:
+        totals = _prometheus_totals
+        totals[('blog_agent_runs_total', ())] = totals.get(('blog_agent_runs_total', ()), 0) + 1
+        totals[('blog_agent_run_seconds_sum', ())] = totals.get(('blog_agent_run_seconds_sum', ()), 0) + summary['total_seconds']
+        for stage, seconds in summary['stages'].items():
+            for metric, value in (('blog_agent_stage_seconds_sum', seconds), ('blog_agent_stage_seconds_count', 1)):
+                key = (metric, (('stage', stage),))
+                totals[key] = totals.get(key, 0) + value
+        for field, value in summary['llm'].items():
+            key = (f"blog_agent_llm_{field}_total", ())
+            totals[key] = totals.get(key, 0) + value
+        for model_name, entry in summary.get('models', {}).items():
+            for field in ('calls', 'prompt_tokens', 'response_tokens', 'cost_usd'):
+                if entry.get(field) is not None:
+                    key = (f"blog_agent_model_{field}_total", (('model', model_name),))
+                    totals[key] = totals.get(key, 0) + entry[field]
+            key = ('blog_agent_model_seconds_sum', (('model', model_name),))
+            totals[key] = totals.get(key, 0) + entry['total_seconds']
+
+        samples = dict(totals)
+        for provider in _gauge_providers:
+            samples.update(provider())
+        lines = []
+        for (metric, labels), value in sorted(samples.items()):
+            label_text = "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}" if labels else ""
+            lines.append(f"{metric}{label_text} {value}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)